@@ -1,7 +1,18 @@
 from django.contrib import admin
-from .models import UserProfile
+from .models import UserProfile, OutgoingEmail, Settings
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'is_seller', 'phone')
-    list_filter = ('is_seller',)
\ No newline at end of file
+    list_filter = ('is_seller',)
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order', 'kind', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    list_select_related = ('order',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+@admin.register(Settings)
+class SettingsAdmin(admin.ModelAdmin):
+    list_display = ('site_name', 'contact_email', 'contact_phone')
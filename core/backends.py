@@ -0,0 +1,20 @@
+# core/backends.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class ProfileBackend(ModelBackend):
+    """
+    ModelBackend that loads the user together with their UserProfile
+
+    AuthenticationMiddleware resolves request.user through get_user(), so
+    with this backend a request costs one joined query for both, and
+    request.user.profile (the seller flag, the navbar) never queries again.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = get_user_model()._default_manager.select_related('profile').get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
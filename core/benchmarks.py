@@ -0,0 +1,360 @@
+# core/benchmarks.py
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.db.models import Count, F, Sum
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from orders.models import Order, OrderItem
+from products.models import AVAILABLE, Product
+from .models import UserProfile
+from .replicas import copy_sqlite_database
+
+BENCHMARK_SELLER = 'benchmark-seller'
+BENCHMARK_CUSTOMER = 'benchmark-customer'
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def get_benchmark_user(username, is_seller=False):
+    """Return (creating it if needed) the user benchmarks log in as"""
+    user, created = User.objects.get_or_create(username=username, defaults={
+        'email': f'{username}@example.com',
+        'first_name': 'Benchmark',
+    })
+    UserProfile.objects.get_or_create(user=user, defaults={
+        'is_seller': is_seller,
+        'phone': '081234567890',
+        'address': 'Jl. Benchmark No. 1',
+    })
+    return user
+
+
+def place_order_data():
+    """POST data for place_order buying one unit of the first available product"""
+    product = Product.objects.filter(AVAILABLE).order_by('id').first()
+    if product is None:
+        raise ValueError('No available products to order; run seed_data first')
+    return {
+        'full_name': 'Benchmark Customer',
+        'email': 'benchmark@example.com',
+        'phone': '081234567890',
+        'address': 'Jl. Benchmark No. 1',
+        'payment_method': 'cash',
+        'order_items': json.dumps({str(product.id): {'id': product.id, 'quantity': 1}}),
+    }
+
+
+def get_scenarios():
+    """
+    The views benchmarked by the benchmark command
+
+    Each scenario is a dict with name, method, url, user ('anonymous',
+    'customer' or 'seller') and, for POSTs, a data() callable returning
+    the form data for one request.
+    """
+    return [
+        {'name': 'product_list', 'method': 'get', 'url': reverse('product_list'), 'user': 'anonymous'},
+        {'name': 'product_list_filtered', 'method': 'get', 'user': 'anonymous',
+         'url': reverse('product_list') + '?min_price=20000&max_price=80000&sort=-price'},
+        {'name': 'place_order', 'method': 'post', 'url': reverse('place_order'), 'user': 'customer',
+         'data': place_order_data},
+        {'name': 'dashboard', 'method': 'get', 'url': reverse('dashboard'), 'user': 'seller'},
+        {'name': 'order_list', 'method': 'get', 'url': reverse('dashboard_orders'), 'user': 'seller'},
+        {'name': 'order_list_delivered', 'method': 'get', 'user': 'seller',
+         'url': reverse('dashboard_orders') + '?status=delivered'},
+        {'name': 'sales_data', 'method': 'get', 'url': reverse('sales_data') + '?period=year', 'user': 'seller'},
+        {'name': 'export_customers', 'method': 'get', 'url': reverse('export_customers') + '?format=csv',
+         'user': 'seller'},
+    ]
+
+
+def get_clients():
+    """Test clients for each kind of user in get_scenarios()"""
+    clients = {'anonymous': Client()}
+    for kind, username, is_seller in (('customer', BENCHMARK_CUSTOMER, False), ('seller', BENCHMARK_SELLER, True)):
+        clients[kind] = Client()
+        clients[kind].force_login(get_benchmark_user(username, is_seller))
+    return clients
+
+
+def time_request(client, scenario):
+    """
+    Make one request, reading streamed responses to the end
+
+    Returns:
+        (milliseconds, number of queries)
+    """
+    data = scenario['data']() if 'data' in scenario else None
+    # Count queries on every database, so reports read from the replica
+    # (see core.replicas) don't look cheaper than those read from default
+    with ExitStack() as stack:
+        captured = [
+            stack.enter_context(CaptureQueriesContext(wrapper))
+            for wrapper in {id(connections[alias]): connections[alias] for alias in connections}.values()
+        ]
+        started = time.perf_counter()
+        response = getattr(client, scenario['method'])(scenario['url'], data)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        elapsed = time.perf_counter() - started
+
+    if response.status_code >= 400:
+        raise RuntimeError(f"{scenario['name']}: {scenario['url']} returned {response.status_code}")
+    return elapsed * 1000, sum(len(queries) for queries in captured)
+
+
+def run_scenario(client, scenario, iterations=20, warmup=3):
+    """
+    Time a scenario and summarize it
+
+    Returns:
+        dict with p50_ms, p95_ms, max_ms and queries (median per request)
+    """
+    for _ in range(warmup):
+        time_request(client, scenario)
+
+    timings, query_counts = [], []
+    for _ in range(iterations):
+        elapsed, queries = time_request(client, scenario)
+        timings.append(elapsed)
+        query_counts.append(queries)
+
+    return {
+        'p50_ms': round(percentile(timings, 0.5), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'max_ms': round(max(timings), 2),
+        'queries': percentile(query_counts, 0.5),
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2):
+    """
+    Compare benchmark results with a saved baseline
+
+    Args:
+        results: {scenario name: run_scenario() result}
+        baseline: the same structure, as saved earlier
+        tolerance: p95 growth (0.2 = 20%) still accepted
+
+    Returns:
+        list of (name, p95 change as a fraction or None, query change,
+        regressed) tuples
+    """
+    rows = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            rows.append((name, None, None, False))
+            continue
+        change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0
+        query_change = result['queries'] - before['queries']
+        rows.append((name, change, query_change, change > tolerance or query_change > 0))
+    return rows
+
+
+def get_concurrency_scenarios():
+    """
+    The async views (catalogue pages and cart AJAX endpoints) compared
+    between WSGI and ASGI by the benchmark_asgi command, all anonymous
+    """
+    product = Product.objects.filter(AVAILABLE).order_by('id').first()
+    if product is None:
+        raise ValueError('No available products; run seed_data first')
+    return [
+        {'name': 'product_list', 'method': 'get', 'url': reverse('product_list')},
+        {'name': 'product_list_filtered', 'method': 'get',
+         'url': reverse('product_list') + '?min_price=20000&max_price=80000&sort=-price'},
+        {'name': 'product_detail', 'method': 'get', 'url': reverse('product_detail', args=[product.slug])},
+        {'name': 'add_to_cart', 'method': 'post', 'url': reverse('add_to_cart', args=[product.id]),
+         'data': lambda: {'quantity': 1}},
+    ]
+
+
+def _summarize(timings, elapsed):
+    return {
+        'requests_per_second': round(len(timings) / elapsed, 1),
+        'p50_ms': round(percentile(timings, 0.5), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+    }
+
+
+def run_wsgi_concurrent(scenario, concurrency=20, requests=400):
+    """
+    Send requests through the WSGI handler from a pool of threads, the way a
+    threaded WSGI server would
+
+    Returns:
+        dict with requests_per_second, p50_ms and p95_ms
+    """
+    local = threading.local()
+
+    def one_request(_):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        data = scenario['data']() if 'data' in scenario else None
+        started = time.perf_counter()
+        response = getattr(local.client, scenario['method'])(scenario['url'], data)
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f"{scenario['name']}: {scenario['url']} returned {response.status_code}")
+        return elapsed * 1000
+
+    def close_connection(_):
+        close_old_connections()
+        connection.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        started = time.perf_counter()
+        timings = list(executor.map(one_request, range(requests)))
+        elapsed = time.perf_counter() - started
+        # Each thread opened its own database connection
+        list(executor.map(close_connection, range(concurrency)))
+    return _summarize(timings, elapsed)
+
+
+def run_asgi_concurrent(scenario, concurrency=20, requests=400):
+    """
+    Send requests through the ASGI handler from concurrent tasks on one
+    event loop, the way an ASGI server would
+
+    Returns:
+        dict with requests_per_second, p50_ms and p95_ms
+    """
+    async def worker(client, count, timings):
+        for _ in range(count):
+            data = scenario['data']() if 'data' in scenario else None
+            started = time.perf_counter()
+            response = await getattr(client, scenario['method'])(scenario['url'], data)
+            timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{scenario['name']}: {scenario['url']} returned {response.status_code}")
+
+    async def main():
+        timings = []
+        counts = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(AsyncClient(), count, timings) for count in counts))
+        return timings, time.perf_counter() - started
+
+    timings, elapsed = asyncio.run(main())
+    return _summarize(timings, elapsed)
+
+
+# The database settings before this project tuned SQLite, for comparison
+UNTUNED_SQLITE_OPTIONS = {'init_command': 'PRAGMA journal_mode=DELETE'}
+
+
+def add_database_alias(alias, name, options=None, conn_max_age=0):
+    """Register another connection to a SQLite file with the given OPTIONS"""
+    default = settings.DATABASES['default']
+    connections.settings[alias] = connections.configure_settings({
+        'default': default,
+        alias: {
+            **default,
+            'NAME': name,
+            'OPTIONS': options if options is not None else default.get('OPTIONS', {}),
+            'CONN_MAX_AGE': conn_max_age,
+        },
+    })[alias]
+
+
+def _write_order(alias, rng, product_ids, user_id):
+    """Checkout-shaped write: read the product, then take stock and insert"""
+    product_id = rng.choice(product_ids)
+    with transaction.atomic(using=alias):
+        price = Product.objects.using(alias).values_list('price', flat=True).get(pk=product_id)
+        Product.objects.using(alias).filter(pk=product_id).update(stock=F('stock') - 1)
+        # bulk_create skips the signals, which would write to the default
+        # database
+        order, = Order.objects.using(alias).bulk_create([Order(
+            user_id=user_id, full_name='Benchmark', email='benchmark@example.com',
+            phone='081234567890', address='Jl. Benchmark No. 1', total_amount=price,
+            item_count=1, total_quantity=1,
+        )])
+        OrderItem.objects.using(alias).bulk_create([
+            OrderItem(order=order, product_id=product_id, quantity=1, price=price),
+        ])
+
+
+def _read_dashboard(alias, rng, product_ids, user_id):
+    """Dashboard-shaped read: totals by status and the latest orders"""
+    list(Order.objects.using(alias).values('status').annotate(count=Count('id'), total=Sum('total_amount')))
+    list(Order.objects.using(alias).order_by('-created_at')[:20])
+
+
+def run_sqlite_concurrency(alias, writers=4, readers=8, duration=5.0, seed=42):
+    """
+    Run checkout-like writers and dashboard-like readers against a database
+    alias for a while, each in its own thread with its own connection
+
+    Returns:
+        dict with writes_per_second, reads_per_second, p95 latencies and the
+        number of operations that failed with "database is locked"
+    """
+    product_ids = list(Product.objects.using(alias).filter(stock__gt=1000).values_list('id', flat=True)[:50])
+    user_id = User.objects.using(alias).values_list('id', flat=True).first()
+    if not product_ids or user_id is None:
+        raise ValueError('Not enough data to benchmark; run seed_data first')
+
+    results = {'write': [], 'read': []}
+    errors = {'write': 0, 'read': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def work(kind, operation, index):
+        rng = random.Random(seed + index)
+        timings, failed = [], 0
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    operation(alias, rng, product_ids, user_id)
+                except OperationalError:
+                    failed += 1
+                    continue
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connections[alias].close()
+        with lock:
+            results[kind].extend(timings)
+            errors[kind] += failed
+
+    threads = [
+        threading.Thread(target=work, args=('write', _write_order, i)) for i in range(writers)
+    ] + [
+        threading.Thread(target=work, args=('read', _read_dashboard, writers + i)) for i in range(readers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'writes_per_second': round(len(results['write']) / elapsed, 1),
+        'reads_per_second': round(len(results['read']) / elapsed, 1),
+        'write_p95_ms': round(percentile(results['write'], 0.95) or 0, 2),
+        'read_p95_ms': round(percentile(results['read'], 0.95) or 0, 2),
+        'write_errors': errors['write'],
+        'read_errors': errors['read'],
+    }
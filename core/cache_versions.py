@@ -0,0 +1,42 @@
+# core/cache_versions.py
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def get_cache_version(key):
+    """
+    Return the version number stored under key in the shared cache
+
+    Versions are part of cache keys: bumping one makes every entry cached
+    under the old number unreachable, in every process, without deleting
+    anything.
+    """
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock rather than 1 so entries cached under a version
+        # that was evicted can never be served again
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_cache_version(key):
+    """get_cache_version() for async code"""
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_cache_version(key):
+    """Increment the version under key once the current transaction commits"""
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+    transaction.on_commit(bump)
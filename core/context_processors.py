@@ -0,0 +1,7 @@
+# core/context_processors.py
+from .site_settings import get_site_settings
+
+
+def site_settings(request):
+    """Make the Settings singleton available to every template as site_settings"""
+    return {'site_settings': get_site_settings()}
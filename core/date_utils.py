@@ -0,0 +1,16 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+
+
+def start_of_day(day):
+    """
+    Return the aware datetime a local date starts at
+    
+    Filtering created_at on [start_of_day(d), start_of_day(d + 1 day)) gives
+    the same rows as created_at__date=d but can use the created_at indexes.
+    
+    Args:
+        day: date object
+    """
+    return timezone.make_aware(datetime.combine(day, time.min))
@@ -0,0 +1,40 @@
+# core/decorators.py
+from functools import wraps
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect
+
+from .models import UserProfile
+
+
+def is_seller(request):
+    """
+    Return whether the logged in user is a seller, remembered for the rest
+    of the request
+
+    Users without a profile are treated as customers instead of erroring.
+    """
+    if not hasattr(request, '_is_seller'):
+        try:
+            request._is_seller = request.user.is_authenticated and request.user.profile.is_seller
+        except UserProfile.DoesNotExist:
+            request._is_seller = False
+    return request._is_seller
+
+
+def seller_required(view):
+    """
+    Only let logged in sellers through; others are sent home with a message
+
+    Implies login_required.
+    """
+    @login_required
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not is_seller(request):
+            messages.error(request, "You don't have permission to access the dashboard")
+            return redirect('home')
+        return view(request, *args, **kwargs)
+
+    return wrapper
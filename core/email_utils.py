@@ -1,8 +1,19 @@
 from django.conf import settings
+from django.db.models import Count, Q
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
+from datetime import timedelta
+import uuid
 from orders.models import Order
+from .models import OutgoingEmail
+
+# Seconds to wait before the first retry; doubled on every further attempt
+EMAIL_RETRY_BACKOFF = getattr(settings, 'EMAIL_RETRY_BACKOFF', 60)
+EMAIL_MAX_ATTEMPTS = getattr(settings, 'EMAIL_MAX_ATTEMPTS', 5)
+# Seconds a worker has to send the emails it claimed before they are due again
+EMAIL_CLAIM_TIMEOUT = getattr(settings, 'EMAIL_CLAIM_TIMEOUT', 5 * 60)
 
 def send_order_confirmation_email(order):
     """
@@ -127,3 +138,112 @@ def send_order_delivered_email(order):
     )
     
     return True
+
+
+ORDER_EMAIL_SENDERS = {
+    'confirmation': send_order_confirmation_email,
+    'status_update': send_order_status_update_email,
+    'shipped': send_order_shipped_email,
+    'delivered': send_order_delivered_email,
+}
+
+
+def status_email_kind(status):
+    """Return the kind of email telling a customer their order moved to status"""
+    return {'shipped': 'shipped', 'delivered': 'delivered'}.get(status, 'status_update')
+
+
+def queue_order_emails(orders, kind):
+    """Put the same email for several orders in the outbox in one query"""
+    return OutgoingEmail.objects.bulk_create([OutgoingEmail(order=order, kind=kind) for order in orders])
+
+
+def queue_order_email(order, kind):
+    """
+    Put an order email in the outbox instead of sending it inline
+    
+    Args:
+        order: Order object
+        kind: one of OutgoingEmail.KIND_CHOICES
+    """
+    return OutgoingEmail.objects.create(order=order, kind=kind)
+
+
+def claim_queued_emails(batch_size=50, timeout=EMAIL_CLAIM_TIMEOUT):
+    """
+    Mark a batch of due emails as being sent by this caller
+    
+    The claim is one conditional UPDATE, so concurrent workers never get
+    the same email. Emails whose claim ran out (the worker died while
+    sending) are due again.
+    
+    Returns:
+        token identifying the claimed emails
+    """
+    now = timezone.now()
+    due = OutgoingEmail.objects.filter(
+        Q(status='pending') | Q(status='sending'), next_attempt_at__lte=now,
+    )
+    token = uuid.uuid4().hex
+    due.filter(
+        pk__in=due.order_by('next_attempt_at', 'id').values('pk')[:batch_size],
+    ).update(status='sending', claim_token=token, next_attempt_at=now + timedelta(seconds=timeout))
+    return token
+
+
+def deliver_queued_emails(batch_size=50, max_attempts=EMAIL_MAX_ATTEMPTS):
+    """
+    Send one batch of due emails from the outbox
+    
+    Emails are claimed first (see claim_queued_emails), so several
+    send_queued_emails workers can run at once. Failed emails are retried
+    with exponential backoff and marked as failed after max_attempts.
+    
+    Args:
+        batch_size: maximum number of emails to send
+        max_attempts: attempts before an email is given up on
+    
+    Returns:
+        (sent, failed) counts for the batch
+    """
+    token = claim_queued_emails(batch_size)
+    batch = list(
+        OutgoingEmail.objects.filter(status='sending', claim_token=token)
+        .select_related('order')
+        .prefetch_related('order__items__product')
+        .order_by('next_attempt_at', 'id')
+    )
+    
+    sent = failed = 0
+    for email in batch:
+        email.attempts += 1
+        email.claim_token = ''
+        try:
+            ORDER_EMAIL_SENDERS[email.kind](email.order)
+        except Exception as e:
+            failed += 1
+            email.last_error = str(e)
+            if email.attempts >= max_attempts:
+                email.status = 'failed'
+            else:
+                email.status = 'pending'
+                delay = EMAIL_RETRY_BACKOFF * 2 ** (email.attempts - 1)
+                email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        else:
+            sent += 1
+            email.status = 'sent'
+            email.sent_at = timezone.now()
+            email.last_error = ''
+    
+    OutgoingEmail.objects.bulk_update(
+        batch, ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at', 'claim_token']
+    )
+    return sent, failed
+
+
+def get_outbox_depth():
+    """Return the number of outbox emails per status"""
+    counts = dict.fromkeys(dict(OutgoingEmail.STATUS_CHOICES), 0)
+    for row in OutgoingEmail.objects.values('status').annotate(total=Count('id')):
+        counts[row['status']] = row['total']
+    return counts
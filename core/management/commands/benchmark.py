@@ -0,0 +1,82 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import compare_to_baseline, get_clients, get_scenarios, run_scenario
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the key views with the test client against the current database '
+        '(seed it with seed_data first) and compare with a saved baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*',
+                            help='Only run these scenarios (default: all)')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--save-baseline', metavar='PATH',
+                            help='Write the results to this JSON file')
+        parser.add_argument('--baseline', metavar='PATH',
+                            help='Compare the results with this JSON file')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='p95 growth over the baseline still accepted (default 0.2 = 20%%)')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error when a scenario regressed')
+
+    def handle(self, *args, **options):
+        scenarios = get_scenarios()
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - {scenario['name'] for scenario in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in scenarios if scenario['name'] in options['scenarios']]
+
+        self.stdout.write('Note: place_order creates real orders in this database')
+        clients = get_clients()
+
+        results = {}
+        self.stdout.write(f"{'scenario':<24}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'queries':>9}")
+        for scenario in scenarios:
+            try:
+                result = run_scenario(clients[scenario['user']], scenario, options['iterations'], options['warmup'])
+            except (RuntimeError, ValueError) as e:
+                raise CommandError(str(e))
+            results[scenario['name']] = result
+            self.stdout.write(
+                f"{scenario['name']:<24}{result['p50_ms']:>10}{result['p95_ms']:>10}"
+                f"{result['max_ms']:>10}{result['queries']:>9}"
+            )
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved baseline to {options['save_baseline']}")
+
+        if options['baseline']:
+            self.compare(results, options)
+
+    def compare(self, results, options):
+        try:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read baseline {options['baseline']}: {e}")
+
+        self.stdout.write(f"\nCompared with {options['baseline']}:")
+        regressed = []
+        for name, change, query_change, is_regression in compare_to_baseline(
+                results, baseline, options['tolerance']):
+            if change is None:
+                self.stdout.write(f'{name:<24} not in baseline')
+                continue
+            line = f'{name:<24}p95 {change:+.0%}  queries {query_change:+d}'
+            if is_regression:
+                regressed.append(name)
+                self.stdout.write(self.style.ERROR(f'{line}  REGRESSED'))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+
+        if regressed and options['fail_on_regression']:
+            raise CommandError(f"Regressed: {', '.join(regressed)}")
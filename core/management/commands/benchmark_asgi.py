@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import get_concurrency_scenarios, run_asgi_concurrent, run_wsgi_concurrent
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the throughput of the async views under concurrent requests '
+        'through the WSGI and ASGI handlers on this machine'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*',
+                            help='Only run these scenarios (default: all)')
+        parser.add_argument('--concurrency', type=int, default=20,
+                            help='Requests in flight at once (threads for WSGI, tasks for ASGI)')
+        parser.add_argument('--requests', type=int, default=400,
+                            help='Requests per scenario and handler')
+        parser.add_argument('--warmup', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            scenarios = get_concurrency_scenarios()
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - {scenario['name'] for scenario in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in scenarios if scenario['name'] in options['scenarios']]
+
+        self.stdout.write(
+            f"{options['requests']} requests per run, {options['concurrency']} concurrent\n"
+            f"{'scenario':<24}{'handler':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+        )
+        for scenario in scenarios:
+            for handler, run in (('wsgi', run_wsgi_concurrent), ('asgi', run_asgi_concurrent)):
+                try:
+                    # Fill the caches so both handlers are measured warm
+                    run(scenario, options['concurrency'], options['warmup'])
+                    result = run(scenario, options['concurrency'], options['requests'])
+                except RuntimeError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(
+                    f"{scenario['name']:<24}{handler:>8}{result['requests_per_second']:>10}"
+                    f"{result['p50_ms']:>10}{result['p95_ms']:>10}"
+                )
@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import UNTUNED_SQLITE_OPTIONS, add_database_alias, run_sqlite_concurrency
+from core.replicas import copy_sqlite_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent reader/writer throughput on copies of the database '
+        'with SQLite left at its defaults and with the settings in DATABASES'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4,
+                            help='Threads placing checkout-like orders')
+        parser.add_argument('--readers', type=int, default=8,
+                            help='Threads running dashboard-like queries')
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='Seconds each profile runs for')
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES['default']
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('This benchmark compares SQLite settings only')
+
+        profiles = {
+            'untuned': UNTUNED_SQLITE_OPTIONS,
+            'tuned': database.get('OPTIONS', {}),
+        }
+        self.stdout.write(
+            f"{options['writers']} writers, {options['readers']} readers, {options['duration']}s each\n"
+            f"{'profile':<10}{'writes/s':>10}{'reads/s':>10}{'write p95':>11}{'read p95':>10}"
+            f"{'write err':>11}{'read err':>10}"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for profile, db_options in profiles.items():
+                # Each profile starts from its own copy, so the real database
+                # is never written to
+                name = os.path.join(directory, f'{profile}.sqlite3')
+                copy_sqlite_database(str(database['NAME']), name)
+                alias = f'benchmark_{profile}'
+                add_database_alias(alias, name, db_options)
+                try:
+                    result = run_sqlite_concurrency(
+                        alias, options['writers'], options['readers'], options['duration'],
+                    )
+                except ValueError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(
+                    f"{profile:<10}{result['writes_per_second']:>10}{result['reads_per_second']:>10}"
+                    f"{result['write_p95_ms']:>11}{result['read_p95_ms']:>10}"
+                    f"{result['write_errors']:>11}{result['read_errors']:>10}"
+                )
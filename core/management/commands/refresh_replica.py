@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.replicas import REPLICA_ALIAS, refresh_sqlite_replica
+
+
+class Command(BaseCommand):
+    help = 'Refresh the local SQLite read replica from the default database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep refreshing every this many seconds (default: once)')
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS is None or REPLICA_ALIAS not in settings.DATABASES:
+            raise CommandError('DATABASE_REPLICA is not set to a configured database')
+        if settings.DATABASES[REPLICA_ALIAS]['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Only the local SQLite stand-in can be refreshed this way')
+
+        while True:
+            started = time.perf_counter()
+            refresh_sqlite_replica()
+            self.stdout.write(f'Refreshed {REPLICA_ALIAS} in {time.perf_counter() - started:.2f}s')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
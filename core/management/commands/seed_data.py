@@ -0,0 +1,214 @@
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import UserProfile
+from core.page_cache import invalidate_cached_pages
+from dashboard.kpis import invalidate_dashboard_kpis
+from dashboard.rollups import rebuild_sales_data
+from orders.models import Order, OrderItem
+from products.catalog import bump_catalog_version
+from products.models import Category, Product
+from products.search import rebuild_search_index
+
+SEED_PREFIX = 'seed-'
+
+CATEGORY_NAMES = [
+    'Martabak Manis', 'Martabak Telur', 'Martabak Tipis Kering', 'Martabak Mini',
+    'Terang Bulan', 'Martabak Pandan', 'Martabak Red Velvet', 'Minuman',
+]
+FLAVOURS = [
+    'Coklat', 'Keju', 'Kacang', 'Susu', 'Pandan', 'Ketan Hitam', 'Green Tea',
+    'Oreo', 'Nutella', 'Ovomaltine', 'Pisang', 'Jagung', 'Wijen', 'Durian',
+    'Daging Sapi', 'Ayam', 'Bebek', 'Sosis', 'Tuna', 'Jamur',
+]
+FIRST_NAMES = [
+    'Budi', 'Siti', 'Agus', 'Dewi', 'Rina', 'Andi', 'Putri', 'Eko', 'Wati',
+    'Joko', 'Ayu', 'Bayu', 'Indah', 'Rizky', 'Nur', 'Fajar', 'Sari', 'Dian',
+]
+LAST_NAMES = [
+    'Santoso', 'Wijaya', 'Pratama', 'Lestari', 'Hidayat', 'Saputra',
+    'Kusuma', 'Nugroho', 'Setiawan', 'Rahmawati', 'Gunawan', 'Permata',
+]
+
+# Share of seeded orders in each status
+STATUS_WEIGHTS = {'delivered': 70, 'processing': 10, 'pending': 10, 'cancelled': 10}
+
+# Orders whose created_at is set per UPDATE; each row is a WHEN of a CASE,
+# so large batches get slow
+CREATED_AT_BATCH_SIZE = 500
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate categories, products, customers and a history of orders for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed; the same seed and sizes give the same data')
+        parser.add_argument('--categories', type=int, default=len(CATEGORY_NAMES))
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--customers', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread the orders over this many days')
+        parser.add_argument('--end-date', type=parse_date, default=None,
+                            help='Last day with orders (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--max-items', type=int, default=4,
+                            help='Most distinct products per order')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['max_items'] < 1:
+            raise CommandError('--max-items must be at least 1')
+        if options['orders'] and not (options['products'] and options['customers']):
+            raise CommandError('Orders need at least one product and one customer')
+        if options['products'] and not options['categories']:
+            raise CommandError('Products need at least one category')
+
+        if User.objects.filter(username__startswith=SEED_PREFIX).exists():
+            raise CommandError(
+                'The database already has seeded data; start from an empty one '
+                '(e.g. python manage.py flush) to seed again'
+            )
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        with transaction.atomic():
+            categories = self.create_categories(options['categories'])
+            products = self.create_products(categories, options['products'])
+            customers = self.create_customers(options['customers'])
+            self.create_orders(
+                customers, products, options['orders'], options['days'],
+                options['end_date'] or timezone.localdate(), options['max_items'],
+            )
+
+            days, product_days = rebuild_sales_data()
+            self.stdout.write(f'Rebuilt {days} SalesData and {product_days} ProductSalesData row(s)')
+            self.stdout.write(f'Indexed {rebuild_search_index()} product(s) for search')
+
+            # bulk_create skips the signals that normally invalidate these
+            bump_catalog_version()
+            invalidate_cached_pages()
+            invalidate_dashboard_kpis()
+
+    def create_categories(self, count):
+        categories = []
+        for i in range(count):
+            name = CATEGORY_NAMES[i % len(CATEGORY_NAMES)]
+            if i >= len(CATEGORY_NAMES):
+                name += f' {i // len(CATEGORY_NAMES) + 1}'
+            categories.append(Category(name=name, slug=f'{SEED_PREFIX}category-{i}'))
+        categories = Category.objects.bulk_create(categories)
+        self.stdout.write(f'Created {len(categories)} categories')
+        return categories
+
+    def create_products(self, categories, count):
+        rng = self.rng
+        products = []
+        for i in range(count):
+            flavours = rng.sample(FLAVOURS, rng.randint(1, 3))
+            category = rng.choice(categories)
+            products.append(Product(
+                name=f"{category.name} {' '.join(flavours)}",
+                slug=f'{SEED_PREFIX}product-{i}',
+                description=f"{category.name} dengan {', '.join(flavours).lower()}.",
+                price=Decimal(rng.randrange(15000, 120001, 500)),
+                # Enough stock that benchmarks placing orders don't run out
+                stock=rng.randint(1000, 5000),
+                image='products/seed.jpg',
+                category=category,
+            ))
+        products = Product.objects.bulk_create(products, batch_size=self.batch_size)
+        self.stdout.write(f'Created {len(products)} products')
+        return products
+
+    def create_customers(self, count):
+        rng = self.rng
+        # Seeded customers can't log in with a password; benchmarks use
+        # force_login
+        password = make_password(None)
+        users = []
+        for i in range(count):
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            users.append(User(
+                username=f'{SEED_PREFIX}customer-{i}',
+                first_name=first_name,
+                last_name=last_name,
+                email=f'customer{i}@example.com',
+                password=password,
+            ))
+        users = User.objects.bulk_create(users, batch_size=self.batch_size)
+        UserProfile.objects.bulk_create([
+            UserProfile(
+                user=user,
+                phone=f'08{rng.randrange(10**9, 10**10)}',
+                address=f'Jl. Martabak No. {rng.randint(1, 200)}, Jakarta',
+            )
+            for user in users
+        ], batch_size=self.batch_size)
+        self.stdout.write(f'Created {len(users)} customers')
+        return users
+
+    def create_orders(self, customers, products, count, days, end_date, max_items):
+        rng = self.rng
+        statuses, weights = zip(*STATUS_WEIGHTS.items())
+        first_day = end_date - timedelta(days=days - 1)
+        tz = timezone.get_current_timezone()
+
+        created = 0
+        while created < count:
+            size = min(self.batch_size, count - created)
+            orders, lines, dates = [], [], []
+            for _ in range(size):
+                customer = rng.choice(customers)
+                day = first_day + timedelta(days=rng.randrange(days))
+                dates.append(timezone.make_aware(
+                    datetime.combine(day, time(rng.randint(10, 21), rng.randrange(60), rng.randrange(60))),
+                    tz,
+                ))
+                items = [
+                    (product, rng.randint(1, 3))
+                    for product in rng.sample(products, rng.randint(1, min(max_items, len(products))))
+                ]
+                lines.append(items)
+                orders.append(Order(
+                    user=customer,
+                    full_name=customer.get_full_name(),
+                    email=customer.email,
+                    phone='081234567890',
+                    address='Jl. Martabak No. 1, Jakarta',
+                    total_amount=sum(product.price * quantity for product, quantity in items),
+                    status=rng.choices(statuses, weights)[0],
+                    item_count=len(items),
+                    total_quantity=sum(quantity for _, quantity in items),
+                    customer_name=customer.username,
+                ))
+
+            orders = Order.objects.bulk_create(orders)
+            # created_at is auto_now_add, so the history is spread out
+            # afterwards rather than by changing the shared model field
+            for order, created_at in zip(orders, dates):
+                order.created_at = created_at
+            Order.objects.bulk_update(orders, ['created_at'], batch_size=CREATED_AT_BATCH_SIZE)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=quantity, price=product.price)
+                for order, items in zip(orders, lines)
+                for product, quantity in items
+            ], batch_size=self.batch_size)
+
+            created += size
+            self.stdout.write(f'Created {created}/{count} orders')
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.email_utils import EMAIL_MAX_ATTEMPTS, deliver_queued_emails, get_outbox_depth
+
+
+class Command(BaseCommand):
+    help = 'Send order emails waiting in the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Number of emails to send per batch')
+        parser.add_argument('--max-attempts', type=int, default=EMAIL_MAX_ATTEMPTS,
+                            help='Attempts before an email is marked as failed')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to sleep between polls when the outbox is empty')
+        parser.add_argument('--status', action='store_true',
+                            help='Only print the outbox depth and exit')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.print_depth()
+            return
+
+        while True:
+            sent, failed = deliver_queued_emails(options['batch_size'], options['max_attempts'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} email(s), {failed} failed')
+                continue
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.print_depth()
+
+    def print_depth(self):
+        depth = get_outbox_depth()
+        self.stdout.write(', '.join(f'{status}: {total}' for status, total in depth.items()))
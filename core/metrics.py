@@ -0,0 +1,133 @@
+# core/metrics.py
+import re
+import threading
+from bisect import bisect_left
+
+# Upper bounds of the histogram buckets; the last bucket is open ended
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Suspected N+1 statements kept per view, most frequent first
+MAX_SUSPECTS = 10
+
+NUMBER = re.compile(r'\b\d+(\.\d+)?\b')
+STRING = re.compile(r"'(?:[^']|'')*'")
+IN_LIST = re.compile(r'\bIN \((?:\?, )*\?\)')
+
+
+def fingerprint(sql):
+    """Reduce a statement to its shape by replacing literals with ?"""
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    return IN_LIST.sub('IN (...)', sql)
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+class Histogram:
+    """Counts per fixed bucket, so memory doesn't grow with traffic"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of values"""
+        if not self.total:
+            return None
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= fraction * self.total:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def as_dict(self):
+        labels = [f'<={bound}' for bound in self.bounds] + [f'>{self.bounds[-1]}']
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'count': self.total,
+            'mean': round(self.sum / self.total, 2) if self.total else None,
+            'p50': _round(self.percentile(0.5)),
+            'p95': _round(self.percentile(0.95)),
+            'max': round(self.max, 2),
+        }
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.sql_ms = Histogram(LATENCY_BUCKETS_MS)
+        # fingerprint -> {'sql', 'requests', 'max_repeats'}
+        self.suspects = {}
+
+    def add_suspect(self, shape, repeats):
+        suspect = self.suspects.get(shape)
+        if suspect is None:
+            if len(self.suspects) >= MAX_SUSPECTS:
+                # Make room by forgetting the rarest one
+                rarest = min(self.suspects, key=lambda key: self.suspects[key]['requests'])
+                del self.suspects[rarest]
+            suspect = self.suspects[shape] = {'sql': shape[:500], 'requests': 0, 'max_repeats': 0}
+        suspect['requests'] += 1
+        suspect['max_repeats'] = max(suspect['max_repeats'], repeats)
+
+    def as_dict(self):
+        return {
+            'latency_ms': self.latency_ms.as_dict(),
+            'queries': self.queries.as_dict(),
+            'sql_ms': self.sql_ms.as_dict(),
+            'n_plus_one': sorted(self.suspects.values(), key=lambda s: -s['requests']),
+        }
+
+
+_lock = threading.Lock()
+_views = {}
+
+
+def record_request(view_name, latency_ms, query_count, sql_ms, repeated):
+    """
+    Add one request to the in-process metrics of its view
+
+    Args:
+        view_name: URL name of the view
+        latency_ms: time spent handling the request
+        query_count: SQL statements executed
+        sql_ms: time spent in those statements
+        repeated: dict of {fingerprint: times run} for statements flagged
+            as N+1 suspects
+    """
+    with _lock:
+        metrics = _views.get(view_name)
+        if metrics is None:
+            metrics = _views[view_name] = ViewMetrics()
+        metrics.latency_ms.add(latency_ms)
+        metrics.queries.add(query_count)
+        metrics.sql_ms.add(sql_ms)
+        for shape, repeats in repeated.items():
+            metrics.add_suspect(shape, repeats)
+
+
+def get_metrics():
+    """Return {view name: metrics dict} for this process, busiest view first"""
+    with _lock:
+        views = {name: metrics.as_dict() for name, metrics in _views.items()}
+    return dict(sorted(views.items(), key=lambda item: -item[1]['latency_ms']['count']))
+
+
+def reset_metrics():
+    with _lock:
+        _views.clear()
@@ -0,0 +1,100 @@
+# core/middleware.py
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import fingerprint, record_request
+from .replicas import REPLICA_ALIAS, SAFE_METHODS, pin_to_primary
+
+# The same statement shape running this many times in one request is
+# reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = getattr(settings, 'REQUEST_METRICS_N_PLUS_ONE_THRESHOLD', 5)
+
+
+class QueryMetricsMiddleware:
+    """
+    Record latency, SQL query count, SQL time and repeated statements per
+    URL name, see core.metrics
+
+    Opt-in with REQUEST_METRICS = True; it adds a little work to every
+    query, so it is off otherwise. Queries run while a streaming response
+    is being sent are not counted. It is sync only: with it enabled, async
+    views run in a thread under ASGI.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        shapes = Counter()
+        sql_time = 0.0
+
+        def observe(execute, sql, params, many, context):
+            nonlocal sql_time
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                sql_time += time.perf_counter() - started
+                shapes[fingerprint(sql)] += 1
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(observe))
+            response = self.get_response(request)
+        latency = time.perf_counter() - started
+
+        match = request.resolver_match
+        view_name = match.view_name if match else '<unresolved>'
+        record_request(
+            view_name,
+            latency_ms=latency * 1000,
+            query_count=sum(shapes.values()),
+            sql_ms=sql_time * 1000,
+            repeated={shape: count for shape, count in shapes.items() if count >= N_PLUS_ONE_THRESHOLD},
+        )
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Keep logged in users who just sent a POST (or another method that can
+    write) reading from the primary for DATABASE_REPLICA_MAX_STALENESS
+    seconds, so e.g. a seller updating an order's status sees it in the
+    order list straight away
+
+    Only used when DATABASE_REPLICA is set, see core.replicas. Supports
+    async so the async views stay async under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if REPLICA_ALIAS is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and request.user.is_authenticated:
+            pin_to_primary(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method not in SAFE_METHODS and (await request.auser()).is_authenticated:
+            await sync_to_async(pin_to_primary)(request)
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 00:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_outgoingemail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('is_seller', False)), fields=['user'], name='core_profile_customer_idx'),
+        ),
+    ]
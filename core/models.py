@@ -8,12 +8,19 @@ class UserProfile(models.Model):
     address = models.TextField(blank=True, null=True)
     is_seller = models.BooleanField(default=False)
     
+    class Meta:
+        indexes = [
+            # Customer lists and counts only ever look at non-sellers
+            models.Index(fields=['user'], condition=models.Q(is_seller=False), name='core_profile_customer_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.username}'s profile"
 
 from django.conf import settings
 from django.db import models
 from django.apps import apps
+from django.utils import timezone
 
 class Settings(models.Model):
     site_name = models.CharField(max_length=100, default="Martabak MSME")
@@ -31,3 +38,41 @@ class Settings(models.Model):
     def get_settings(cls):
         obj, created = cls.objects.get_or_create(pk=1)
         return obj
+
+
+class OutgoingEmail(models.Model):
+    """Order email waiting in the outbox for the send_queued_emails worker"""
+    KIND_CHOICES = (
+        ('confirmation', 'Order Confirmation'),
+        ('status_update', 'Order Status Update'),
+        ('shipped', 'Order Shipped'),
+        ('delivered', 'Order Delivered'),
+    )
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        # Claimed by a worker; next_attempt_at is when the claim runs out
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    order = models.ForeignKey('orders.Order', on_delete=models.CASCADE, related_name='emails')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    # Identifies the deliver_queued_emails() call sending the email
+    claim_token = models.CharField(max_length=32, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='core_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for order {self.order_id} ({self.status})"
@@ -0,0 +1,60 @@
+# core/page_cache.py
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from core.cache_versions import bump_cache_version, get_cache_version
+
+# Seconds a cached page may be served; changes to what the pages show
+# don't wait for this, they bump the page cache version instead
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 10 * 60)
+
+PAGE_CACHE_VERSION_KEY = 'core:pages:version'
+
+# Rendered in place of the visitor's CSRF token so a cached page can be
+# shared; the real token is put back for every response
+CSRF_PLACEHOLDER = 'csrf-token-placeholder'
+
+
+def invalidate_cached_pages():
+    """Drop every cached page once the current transaction commits"""
+    bump_cache_version(PAGE_CACHE_VERSION_KEY)
+
+
+def _fill_csrf_token(request, content):
+    if CSRF_PLACEHOLDER in content:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+    return content
+
+
+def cache_public_page(view):
+    """
+    Cache the whole page a view renders for anonymous visitors
+
+    The view must accept an extra_context keyword and pass it on to the
+    template. Only plain GET/HEAD requests without a query string from
+    anonymous users are cached, since the navigation bar differs for
+    logged in users. Call invalidate_cached_pages() when something the
+    pages show changes.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (request.method not in ('GET', 'HEAD') or request.GET
+                or request.user.is_authenticated):
+            return view(request, *args, **kwargs)
+
+        key = f'page:{get_cache_version(PAGE_CACHE_VERSION_KEY)}:{request.path}'
+        content = cache.get(key)
+        if content is None:
+            response = view(request, *args, extra_context={'csrf_token': CSRF_PLACEHOLDER}, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            content = response.content.decode(response.charset)
+            cache.set(key, content, PAGE_CACHE_TIMEOUT)
+
+        return HttpResponse(_fill_csrf_token(request, content))
+
+    return wrapper
@@ -0,0 +1,105 @@
+# core/pagination.py
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 25
+
+
+def encode_cursor(obj, direction):
+    """Encode an object's (created_at, id) position as an opaque URL-safe cursor"""
+    raw = f"{direction}|{obj.created_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor made by encode_cursor()
+
+    Returns:
+        (direction, created_at, id), or None if the cursor is missing or invalid
+    """
+    if not cursor:
+        return None
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        direction, created_at, pk = raw.split('|')
+        if direction not in ('next', 'prev'):
+            return None
+        return direction, datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class KeysetPage:
+    """One page of a newest-first listing, see keyset_paginate()"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def keyset_paginate(queryset, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+    """
+    Paginate a queryset newest first on (created_at, id) without OFFSET
+
+    Each page is a single indexed range query whatever its position, so the
+    last page costs the same as the first.
+
+    Args:
+        queryset: queryset of a model with created_at and id
+        cursor: cursor from a previous page's next_cursor or previous_cursor
+        per_page: number of rows per page
+    """
+    position = decode_cursor(cursor)
+
+    if position and position[0] == 'prev':
+        _, created_at, pk = position
+        rows = list(
+            queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+            .order_by('created_at', 'id')[:per_page + 1]
+        )
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next, has_previous = True, has_more
+    else:
+        if position:
+            _, created_at, pk = position
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+            )
+        rows = list(queryset.order_by('-created_at', '-id')[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        has_next, has_previous = has_more, position is not None
+
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1], 'next') if rows and has_next else None,
+        previous_cursor=encode_cursor(rows[0], 'prev') if rows and has_previous else None,
+    )
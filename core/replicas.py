@@ -0,0 +1,130 @@
+# core/replicas.py
+import os
+import sqlite3
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+# Alias dashboard reports read from, or None to read everything from default
+REPLICA_ALIAS = getattr(settings, 'DATABASE_REPLICA', None)
+
+# Seconds behind the primary the replica may be and still be read from; it
+# is also how long a user who just wrote keeps reading from the primary
+REPLICA_MAX_STALENESS = getattr(settings, 'DATABASE_REPLICA_MAX_STALENESS', 5 * 60)
+
+# Session key holding the time until which the user reads from the primary
+PIN_SESSION_KEY = '_primary_until'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Alias the current request's reads are routed to, see core.routers
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def get_read_alias():
+    return _read_alias.get()
+
+
+def pin_to_primary(request):
+    """Keep the user reading from the primary until the replica has caught up"""
+    request.session[PIN_SESSION_KEY] = time.time() + REPLICA_MAX_STALENESS
+
+
+def replica_age(alias=REPLICA_ALIAS):
+    """
+    Seconds since the replica was refreshed, or None if it can't be used
+
+    The local SQLite stand-in is as old as its file (refresh_replica replaces
+    it atomically). Other databases are assumed to keep up, replication lag
+    being for the server to report.
+    """
+    if alias is None or alias not in settings.DATABASES:
+        return None
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        return 0
+    if connection.is_in_memory_db():
+        return None
+    try:
+        stat = os.stat(connection.settings_dict['NAME'])
+    except OSError:
+        return None
+    # Connecting before the first refresh leaves an empty file behind
+    return time.time() - stat.st_mtime if stat.st_size else None
+
+
+def replica_usable(request):
+    """Whether this request's reports may come from the replica"""
+    if request.method not in SAFE_METHODS:
+        return False
+    if request.session.get(PIN_SESSION_KEY, 0) > time.time():
+        return False
+    age = replica_age()
+    return age is not None and age <= REPLICA_MAX_STALENESS
+
+
+def _reading_from(alias, iterator):
+    token = _read_alias.set(alias)
+    try:
+        yield from iterator
+    finally:
+        _read_alias.reset(token)
+
+
+def read_from_replica(view):
+    """
+    Route the view's reads to the replica when it is fresh enough
+
+    For read-only reporting views that can show data a little behind. Users
+    who sent a form recently (see ReplicaPinMiddleware), and requests that
+    could write, stay on the primary. Streamed responses keep reading from the replica while they
+    are sent.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not replica_usable(request):
+            return view(request, *args, **kwargs)
+
+        token = _read_alias.set(REPLICA_ALIAS)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+        if response.streaming:
+            response.streaming_content = _reading_from(REPLICA_ALIAS, response.streaming_content)
+        return response
+
+    return wrapper
+
+
+def copy_sqlite_database(source, destination):
+    """
+    Copy a SQLite database consistently, even while it is being written to
+    or is in WAL mode, replacing destination atomically
+
+    Connections already open on destination keep reading the old copy.
+    """
+    temporary = f'{destination}.tmp'
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(temporary)
+    try:
+        src.backup(dst)
+        # The copy is a single file, with no -wal to go with it
+        dst.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        src.close()
+        dst.close()
+    os.replace(temporary, destination)
+
+
+def refresh_sqlite_replica(alias=REPLICA_ALIAS):
+    """Replace the SQLite replica with a fresh copy of the default database"""
+    copy_sqlite_database(
+        str(settings.DATABASES['default']['NAME']),
+        str(settings.DATABASES[alias]['NAME']),
+    )
@@ -0,0 +1,31 @@
+# core/routers.py
+from django.db import DEFAULT_DB_ALIAS
+
+from .replicas import REPLICA_ALIAS, get_read_alias
+
+
+class ReplicaRouter:
+    """
+    Send reads made inside read_from_replica views to the replica and
+    everything else, writes included, to the primary
+
+    See core.replicas.
+    """
+
+    def db_for_read(self, model, **hints):
+        return get_read_alias()
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db == REPLICA_ALIAS:
+            # Otherwise Django would save it back where it was read from
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary
+        return db != REPLICA_ALIAS
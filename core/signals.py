@@ -0,0 +1,25 @@
+# core/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from products.models import Category, Product
+from .models import Settings
+from .page_cache import invalidate_cached_pages
+from .site_settings import invalidate_site_settings
+
+
+@receiver(post_save, sender=Settings)
+@receiver(post_delete, sender=Settings)
+def invalidate_on_settings_change(sender, instance, **kwargs):
+    invalidate_site_settings()
+    invalidate_cached_pages()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+def invalidate_pages_on_catalog_change(sender, instance, **kwargs):
+    # Any product or category edit may move a product in or out of the
+    # featured "Top Picks" on the home page
+    invalidate_cached_pages()
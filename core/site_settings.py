@@ -0,0 +1,32 @@
+# core/site_settings.py
+from core.cache_versions import bump_cache_version, get_cache_version
+from .models import Settings
+
+SETTINGS_VERSION_KEY = 'core:settings:version'
+
+# (version, Settings) loaded by this process
+_cached_settings = (None, None)
+
+
+def get_site_settings():
+    """
+    Return the Settings singleton, kept in process memory
+
+    Costs one cache read per call to check the version; the database is
+    only queried again after the settings were saved. That covers saves made
+    by other processes only with a shared cache backend (see CACHES in
+    settings).
+    """
+    global _cached_settings
+
+    version = get_cache_version(SETTINGS_VERSION_KEY)
+    cached_version, settings = _cached_settings
+    if settings is None or cached_version != version:
+        settings = Settings.get_settings()
+        _cached_settings = (version, settings)
+    return settings
+
+
+def invalidate_site_settings():
+    """Make processes sharing the cache reload the settings once the current transaction commits"""
+    bump_cache_version(SETTINGS_VERSION_KEY)
@@ -0,0 +1,70 @@
+# core/static.py
+import mimetypes
+import os
+from functools import cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+# Hashed file names change with their content, so they can be cached for
+# good; anything else is revalidated after a short while
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+STATIC_MAX_AGE = getattr(settings, 'STATIC_MAX_AGE', 60 * 60)
+
+
+@cache
+def hashed_names():
+    """
+    Names collectstatic gave a content hash, read from the manifest once
+
+    collectstatic runs before the server starts, so the manifest doesn't
+    change under a running process.
+    """
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def serve_static(request, path):
+    """
+    Serve a file collected into STATIC_ROOT by collectstatic
+
+    Sends the precompressed .gz copy written by
+    core.storage.OptimizedStaticFilesStorage to clients that accept gzip.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except ValueError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    serve_path = full_path
+    if encoding is None and 'gzip' in request.headers.get('Accept-Encoding', '') \
+            and os.path.isfile(f'{full_path}.gz'):
+        serve_path = f'{full_path}.gz'
+        encoding = 'gzip'
+
+    stat = os.stat(serve_path)
+    if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    response = FileResponse(open(serve_path, 'rb'), content_type=content_type)
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Content-Length'] = stat.st_size
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if os.path.isfile(f'{full_path}.gz'):
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+    if path in hashed_names():
+        response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}'
+    return response
@@ -0,0 +1,125 @@
+# core/storage.py
+import gzip
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, StaticFilesStorage
+from django.core.files.base import ContentFile
+from PIL import Image
+
+# Widest an image under static/ is kept at, and narrower limits for images
+# that are only ever shown small (e.g. the logo)
+STATIC_IMAGE_MAX_WIDTH = getattr(settings, 'STATIC_IMAGE_MAX_WIDTH', 1600)
+STATIC_IMAGE_WIDTHS = getattr(settings, 'STATIC_IMAGE_WIDTHS', {})
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+GZIP_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.map')
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+
+def webp_name(name):
+    """images/logo.png -> images/logo.webp"""
+    return os.path.splitext(name)[0] + '.webp'
+
+
+class OptimizedStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Static files storage that optimizes what collectstatic writes
+
+    On top of the content-hashed names and manifest of
+    ManifestStaticFilesStorage:
+
+    - PNG and JPEG images are shrunk to STATIC_IMAGE_MAX_WIDTH (or their
+      entry in STATIC_IMAGE_WIDTHS) and recompressed, and a WebP copy is
+      written next to each one (see the static_images template tags)
+    - CSS, JS and other text files get a .gz copy for servers that can send
+      precompressed files (see core.static.serve_static)
+    """
+
+    # Templates referencing a file that isn't there shouldn't take the page
+    # down
+    manifest_strict = False
+
+    def url(self, name, force=False):
+        try:
+            return super().url(name, force)
+        except ValueError:
+            # Not collected (e.g. in tests) or missing from static/
+            return StaticFilesStorage.url(self, name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name in [name for name in paths if name.lower().endswith(IMAGE_EXTENSIONS)]:
+                source_storage, source_path = paths[name]
+                extra = self.optimize_image(name, source_storage, source_path)
+                # Hash what was written here, not the source file
+                paths[name] = (self, name)
+                if extra:
+                    # Hash the WebP copies along with everything else
+                    paths[extra] = (self, extra)
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        if not dry_run:
+            self.precompress(set(self.hashed_files) | set(self.hashed_files.values()))
+
+    def optimize_image(self, name, source_storage, source_path):
+        """
+        Write a resized, recompressed copy of an image over the collected one
+
+        The original is always read from the source directory, so running
+        collectstatic again never recompresses a recompressed file.
+
+        Returns:
+            name of the WebP copy, or None if it wouldn't be smaller
+        """
+        with source_storage.open(source_path) as file:
+            original = file.read()
+        image = Image.open(BytesIO(original))
+        image.load()
+
+        max_width = STATIC_IMAGE_WIDTHS.get(name, STATIC_IMAGE_MAX_WIDTH)
+        if image.width > max_width:
+            image = image.resize(
+                (max_width, round(image.height * max_width / image.width)), Image.LANCZOS
+            )
+
+        is_jpeg = image.format == 'JPEG' or name.lower().endswith(('.jpg', '.jpeg'))
+        if is_jpeg and image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        buffer = BytesIO()
+        if is_jpeg:
+            image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        else:
+            image.save(buffer, 'PNG', optimize=True)
+        optimized = buffer.getvalue()
+        if len(optimized) < len(original):
+            self._replace(name, optimized)
+
+        buffer = BytesIO()
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+        if buffer.tell() >= min(len(optimized), len(original)):
+            return None
+        self._replace(webp_name(name), buffer.getvalue())
+        return webp_name(name)
+
+    def precompress(self, names):
+        """Write name.gz next to every text file in names that gzip shrinks"""
+        for name in names:
+            if not name.lower().endswith(GZIP_EXTENSIONS) or not self.exists(name):
+                continue
+            with self.open(name) as file:
+                content = file.read()
+            # mtime=0 keeps the output identical between runs
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(compressed) < len(content):
+                self._replace(f'{name}.gz', compressed)
+
+    def _replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
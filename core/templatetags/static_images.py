@@ -0,0 +1,46 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+
+from core.storage import webp_name
+
+register = template.Library()
+
+
+def _webp_url(path):
+    """URL of the WebP copy collectstatic wrote for path, or None"""
+    # In DEBUG static files come straight from static/, which has no WebP
+    # copies
+    if settings.DEBUG:
+        return None
+    if webp_name(path) not in getattr(staticfiles_storage, 'hashed_files', {}):
+        return None
+    return static(webp_name(path))
+
+
+@register.simple_tag
+def static_webp(path):
+    """
+    Like {% static %}, but prefer the WebP copy of an image when there is one
+
+    For URLs handed to JavaScript, which should keep {% static %} of the
+    same image as a fallback for browsers without WebP support.
+    """
+    return _webp_url(path) or static(path)
+
+
+@register.inclusion_tag('core/includes/static_picture.html')
+def static_picture(path, alt='', css_class='', style=''):
+    """
+    Render a static image as a <picture> offering its WebP copy first
+
+    Usage: {% static_picture 'images/logo.png' alt='Logo' style='height: 35px;' %}
+    """
+    return {
+        'src': static(path),
+        'webp': _webp_url(path),
+        'alt': alt,
+        'css_class': css_class,
+        'style': style,
+    }
@@ -0,0 +1,57 @@
+# core/testing.py
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# SQLite reports a full table scan as "SCAN <table>" with no index after it
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+class QueryPlanTestMixin:
+    """
+    TestCase mixin that runs EXPLAIN QUERY PLAN on every SELECT a block of
+    code issues and fails when one of them scans a whole table
+    """
+
+    # Tables that grow with the shop; small lookup tables such as categories
+    # may still be scanned
+    scan_checked_tables = (
+        'orders_order',
+        'orders_orderitem',
+        'products_product',
+        'core_userprofile',
+        'dashboard_salesdata',
+        'dashboard_productsalesdata',
+    )
+
+    def get_query_plans(self, func, *args, **kwargs):
+        """Call func and return [(sql, [plan detail, ...]), ...] for its SELECTs"""
+        with CaptureQueriesContext(connection) as context:
+            func(*args, **kwargs)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+        return plans
+
+    def assertNoFullTableScan(self, func, *args, **kwargs):
+        plans = self.get_query_plans(func, *args, **kwargs)
+        self.assertTrue(plans, 'No SELECT queries were captured')
+
+        for sql, plan in plans:
+            for detail in plan:
+                match = FULL_SCAN.match(detail)
+                if match and match.group(1) in self.scan_checked_tables:
+                    self.fail(f'Full table scan of {match.group(1)}:\n{sql}\n' + '\n'.join(plan))
+
+    def assertViewNoFullTableScan(self, client, url):
+        def fetch():
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+        self.assertNoFullTableScan(fetch)
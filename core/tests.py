@@ -1,3 +1,464 @@
-from django.test import TestCase
+import base64
+import os
+import random
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, router
+from django.http import HttpResponse
+from django.templatetags.static import static
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from orders.checkout import reserve_stock
+from orders.models import Order
+from products.models import Category, Product
+from .benchmarks import compare_to_baseline, percentile
+from .email_utils import (
+    EMAIL_RETRY_BACKOFF, ORDER_EMAIL_SENDERS, claim_queued_emails, deliver_queued_emails,
+    get_outbox_depth, queue_order_email,
+)
+from .metrics import fingerprint, get_metrics, reset_metrics
+from .middleware import QueryMetricsMiddleware
+from .models import OutgoingEmail, Settings, UserProfile
+from .page_cache import CSRF_PLACEHOLDER
+from .pagination import encode_cursor, keyset_paginate
+from .replicas import read_from_replica
+from .site_settings import get_site_settings
+from .static import hashed_names, serve_static
+from .templatetags.static_images import static_webp
+
+
+class SiteCacheTests(TestCase):
+    """Settings and the home, about and contact pages are served from cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Top Picks')
+        cls.product = Product.objects.create(
+            name='Martabak Pandan',
+            description='Martabak manis rasa pandan wangi',
+            price=30000,
+            stock=10,
+            category=cls.category,
+            image='products/pandan.jpg',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_settings_cached_until_saved(self):
+        get_site_settings()
+        with self.assertNumQueries(0):
+            settings = get_site_settings()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            settings.site_name = 'Martabak Pandan Wangi'
+            settings.save()
+        self.assertEqual(get_site_settings().site_name, 'Martabak Pandan Wangi')
+        self.assertEqual(Settings.objects.count(), 1)
+
+    def test_pages_cached_for_anonymous_visitors(self):
+        for name in ('home', 'about', 'contact'):
+            self.client.get(reverse(name))
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+
+    def test_cached_page_gets_visitors_csrf_token(self):
+        self.client.get(reverse('home'))
+        content = self.client.get(reverse('home')).content.decode()
+        self.assertNotIn(CSRF_PLACEHOLDER, content)
+        self.assertIn('csrfmiddlewaretoken', content)
+
+    def test_featured_product_change_shows_up(self):
+        self.client.get(reverse('home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Martabak Pandan Keju'
+            self.product.save()
+        self.assertContains(self.client.get(reverse('home')), 'Martabak Pandan Keju')
+
+    def test_stock_change_drops_cached_pages(self):
+        self.client.get(reverse('home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_stock(User.objects.create_user('budi', password='x'), {self.product.id: 2})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('home'))
+        self.assertTrue(queries)
+
+    def test_logged_in_users_not_cached(self):
+        self.client.force_login(User.objects.create_user('budi', password='x'))
+        self.client.get(reverse('about'))
+        self.assertContains(self.client.get(reverse('about')), 'budi')
+
+
+@override_settings(REQUEST_METRICS=True)
+class QueryMetricsTests(TestCase):
+    """QueryMetricsMiddleware counts queries per view and spots N+1 patterns"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Martabak Manis')
+        cls.products = [
+            Product.objects.create(
+                name=f'Martabak {i}', description='-', price=30000, stock=10,
+                category=category, image=f'products/{i}.jpg',
+            )
+            for i in range(6)
+        ]
+
+    def setUp(self):
+        reset_metrics()
+        self.addCleanup(reset_metrics)
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 12 AND name = 'it''s' AND x IN (1, 2, 3)"),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND x IN (...)',
+        )
+
+    def test_n_plus_one_flagged(self):
+        def view(request):
+            for product in self.products:
+                Product.objects.get(pk=product.pk)
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        QueryMetricsMiddleware(view)(request)
+
+        metrics = get_metrics()['<unresolved>']
+        self.assertEqual(metrics['queries']['max'], 6)
+        self.assertEqual(len(metrics['n_plus_one']), 1)
+        self.assertEqual(metrics['n_plus_one'][0]['max_repeats'], 6)
+
+    def test_recorded_per_url_name(self):
+        self.client.get(reverse('about'))
+        self.assertIn('about', get_metrics())
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_data_is_deterministic(self):
+        args = ['--products', '5', '--customers', '4', '--orders', '12', '--end-date', '2026-01-31']
+        call_command('seed_data', *args, stdout=StringIO())
+        self.assertEqual(Product.objects.count(), 5)
+        self.assertEqual(Order.objects.count(), 12)
+        first = list(Order.objects.order_by('id').values_list('created_at', 'total_amount', 'status'))
+
+        Order.objects.all().delete()
+        Product.objects.all().delete()
+        Category.objects.all().delete()
+        User.objects.all().delete()
+        call_command('seed_data', *args, stdout=StringIO())
+        self.assertEqual(list(Order.objects.order_by('id').values_list('created_at', 'total_amount', 'status')), first)
+
+    def test_seed_data_with_few_products(self):
+        call_command('seed_data', '--products', '2', '--max-items', '4', '--customers', '2', '--orders', '5',
+                     '--days', '3', '--end-date', '2026-01-31', stdout=StringIO())
+        self.assertEqual(Order.objects.count(), 5)
+        self.assertFalse(Order.objects.filter(item_count__gt=2).exists())
+        days = {timezone.localdate(created_at) for created_at in Order.objects.values_list('created_at', flat=True)}
+        self.assertTrue(days <= {date(2026, 1, 29), date(2026, 1, 30), date(2026, 1, 31)})
+
+        with self.assertRaisesMessage(CommandError, 'Orders need at least one product'):
+            call_command('seed_data', '--products', '0', '--orders', '5', stdout=StringIO())
+
+    def test_compare_to_baseline(self):
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 0.5), 3)
+        baseline = {'a': {'p95_ms': 10, 'queries': 3}, 'b': {'p95_ms': 10, 'queries': 3}}
+        results = {
+            'a': {'p95_ms': 11, 'queries': 3},
+            'b': {'p95_ms': 9, 'queries': 4},
+            'c': {'p95_ms': 1, 'queries': 1},
+        }
+        rows = {name: regressed for name, _, _, regressed in compare_to_baseline(results, baseline)}
+        self.assertEqual(rows, {'a': False, 'b': True, 'c': False})
+
+
+class SQLiteSettingsTests(TestCase):
+    def test_connection_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+@mock.patch('core.replicas.replica_age', return_value=0)
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('penjual', 'penjual@example.com', 'secret')
+        UserProfile.objects.create(user=cls.seller, is_seller=True)
+        cls.order = Order.objects.create(
+            user=cls.seller, full_name='Budi', email='budi@example.com', phone='08123456789',
+            address='Jl. Pandan Wangi', total_amount=35000,
+        )
+
+    def route(self, request):
+        """The alias Order reads and writes go to inside a replica view"""
+        @read_from_replica
+        def view(request):
+            order = Order(full_name='Budi')
+            order._state.db = router.db_for_read(Order)
+            return HttpResponse(f'{order._state.db} {router.db_for_write(Order, instance=order)}')
+
+        request.session = self.client.session
+        return view(request).content.decode()
+
+    def test_reports_read_from_replica(self, replica_age):
+        self.assertEqual(self.route(RequestFactory().get('/')), 'replica default')
+        self.assertEqual(self.route(RequestFactory().post('/')), 'default default')
+        replica_age.return_value = 3600
+        self.assertEqual(self.route(RequestFactory().get('/')), 'default default')
+
+    def test_primary_after_posting(self, replica_age):
+        self.client.force_login(self.seller)
+        self.client.post(reverse('update_order_status', args=[self.order.id]), {'status': 'processing'})
+        self.assertEqual(self.route(RequestFactory().get('/')), 'default default')
+
+
+@mock.patch('core.replicas.replica_age', return_value=0)
+class ReplicaReportTests(TransactionTestCase):
+    """Report views run their queries on the replica connection"""
+
+    # The test replica mirrors default through its own connection, which
+    # only sees committed rows
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.seller = User.objects.create_user('penjual', 'penjual@example.com', 'secret')
+        UserProfile.objects.create(user=self.seller, is_seller=True)
+        customer = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        UserProfile.objects.create(user=customer, phone='08123456789')
+        Order.objects.create(
+            user=customer, full_name='Budi Santoso', email='budi@example.com', phone='08123456789',
+            address='Jl. Pandan Wangi', total_amount=35000,
+        )
+        self.client.force_login(self.seller)
+
+    def get(self, name, query=''):
+        """Return (body, queries on default, queries on the replica)"""
+        with CaptureQueriesContext(connection) as default, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse(name) + query)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+        return body.decode(), default, replica
+
+    def ran(self, queries, sql):
+        return any(sql in query['sql'] for query in queries)
+
+    def test_order_list(self, replica_age):
+        body, default, replica = self.get('dashboard_orders')
+        self.assertIn('Budi Santoso', body)
+        self.assertTrue(self.ran(replica, 'FROM "orders_order"'))
+        self.assertFalse(self.ran(default, 'FROM "orders_order"'))
+
+    def test_streamed_export(self, replica_age):
+        body, default, replica = self.get('export_customers', '?format=csv')
+        self.assertIn('budi@example.com', body)
+        # The rows are read while the response streams, after the view returned
+        customers = 'FROM "core_userprofile" INNER JOIN "auth_user"'
+        self.assertTrue(self.ran(replica, customers))
+        self.assertFalse(self.ran(default, customers))
+
+
+class KeysetPaginationTests(TestCase):
+    """keyset_paginate() pages are stable when many rows share a created_at"""
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        orders = Order.objects.bulk_create([
+            Order(
+                user=customer, full_name='Budi', email='budi@example.com', phone='08123456789',
+                address='Jl. Pandan Wangi', total_amount=35000,
+            )
+            for _ in range(23)
+        ])
+        # Three timestamps for 23 orders, so most ties are broken by id
+        now = timezone.now()
+        for i, order in enumerate(orders):
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(hours=i % 3))
+        cls.newest_first = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def ids(self, page):
+        return [order.id for order in page]
+
+    def walk(self):
+        pages = [keyset_paginate(Order.objects.all(), per_page=5)]
+        while pages[-1].has_next:
+            pages.append(keyset_paginate(Order.objects.all(), pages[-1].next_cursor, per_page=5))
+        return pages
+
+    def test_pages_cover_every_row_once(self):
+        pages = self.walk()
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        self.assertEqual(sum((self.ids(page) for page in pages), []), self.newest_first)
+        self.assertFalse(pages[0].has_previous)
+
+    def test_walking_back_returns_the_same_pages(self):
+        pages = self.walk()
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = keyset_paginate(Order.objects.all(), page.previous_cursor, per_page=5)
+            self.assertEqual(self.ids(page), self.ids(expected))
+        self.assertFalse(page.has_previous)
+        self.assertTrue(page.has_next)
+
+    def test_invalid_cursor_gives_the_first_page(self):
+        first = self.ids(keyset_paginate(Order.objects.all(), per_page=5))
+        order = Order.objects.first()
+        for cursor in (
+            'garbage',
+            '%%%',
+            encode_cursor(order, 'next')[:-4],
+            encode_cursor(order, 'sideways'),
+            base64.urlsafe_b64encode(b'next|yesterday|1').decode(),
+            base64.urlsafe_b64encode(b'next|2024-01-01T00:00:00+00:00|abc').decode(),
+            base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+        ):
+            with self.subTest(cursor=cursor):
+                page = keyset_paginate(Order.objects.all(), cursor, per_page=5)
+                self.assertEqual(self.ids(page), first)
+                self.assertFalse(page.has_previous)
+
+
+class OutboxTests(TestCase):
+    """Queued order emails are sent once, retried with backoff, then given up on"""
+
+    @classmethod
+    def setUpTestData(cls):
+        customer = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        cls.orders = [
+            Order.objects.create(
+                user=customer, full_name='Budi', email='budi@example.com', phone='08123456789',
+                address='Jl. Pandan Wangi', total_amount=35000,
+            )
+            for _ in range(3)
+        ]
+
+    def setUp(self):
+        self.emails = [queue_order_email(order, 'confirmation') for order in self.orders]
+
+    def test_sends_due_emails(self):
+        self.assertEqual(deliver_queued_emails(), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(get_outbox_depth(), {'pending': 0, 'sending': 0, 'sent': 3, 'failed': 0})
+        self.assertEqual(deliver_queued_emails(), (0, 0))
+
+    def test_concurrent_workers_send_each_email_once(self):
+        sent_orders = []
+
+        def send(order):
+            sent_orders.append(order.id)
+            # Another worker polls while this one is sending
+            if len(sent_orders) == 1:
+                self.assertEqual(deliver_queued_emails(batch_size=2), (1, 0))
+
+        with mock.patch.dict(ORDER_EMAIL_SENDERS, {'confirmation': send}):
+            self.assertEqual(deliver_queued_emails(batch_size=2), (2, 0))
+        self.assertEqual(sorted(sent_orders), [order.id for order in self.orders])
+
+    def test_retry_with_backoff_then_failed(self):
+        failing = mock.Mock(side_effect=OSError('SMTP down'))
+        with mock.patch.dict(ORDER_EMAIL_SENDERS, {'confirmation': failing}):
+            for attempt in range(1, 4):
+                started = timezone.now()
+                self.assertEqual(deliver_queued_emails(max_attempts=3), (0, 3))
+                email = OutgoingEmail.objects.get(pk=self.emails[0].pk)
+                self.assertEqual((email.attempts, email.last_error), (attempt, 'SMTP down'))
+                if attempt < 3:
+                    self.assertEqual(email.status, 'pending')
+                    delay = (email.next_attempt_at - started).total_seconds()
+                    expected = EMAIL_RETRY_BACKOFF * 2 ** (attempt - 1)
+                    self.assertTrue(expected <= delay < expected + 5)
+                    # Not due until the backoff is over
+                    self.assertEqual(deliver_queued_emails(max_attempts=3), (0, 0))
+                    OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+
+        self.assertEqual(get_outbox_depth()['failed'], 3)
+        self.assertEqual(deliver_queued_emails(max_attempts=3), (0, 0))
+
+    def test_expired_claims_are_due_again(self):
+        claim_queued_emails(batch_size=1)
+        self.assertEqual(deliver_queued_emails(), (2, 0))
+        OutgoingEmail.objects.filter(status='sending').update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_queued_emails(), (1, 0))
+
+
+class StaticPipelineTests(SimpleTestCase):
+    """collectstatic writes hashed, resized, WebP and gzipped copies"""
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.static_root)
+
+        os.makedirs(os.path.join(self.source, 'images'))
+        # Noise, which WebP stores in far less than PNG
+        noise = Image.frombytes('RGB', (200, 150), random.Random(1).randbytes(200 * 150 * 3))
+        noise.save(os.path.join(self.source, 'images', 'noise.png'))
+        Image.linear_gradient('L').resize((2000, 300)).convert('RGB').save(
+            os.path.join(self.source, 'images', 'wide.jpg'), quality=95,
+        )
+        with open(os.path.join(self.source, 'site.css'), 'w') as file:
+            file.write('body { background: url("images/noise.png"); }\n' * 50)
+
+        self.settings_override = override_settings(
+            STATIC_ROOT=self.static_root,
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        hashed_names.cache_clear()
+        self.addCleanup(hashed_names.cache_clear)
+
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def collected(self, name):
+        return os.path.join(self.static_root, staticfiles_storage.hashed_files[name])
+
+    def test_collected_files(self):
+        for name in ('site.css', 'images/noise.png', 'images/noise.webp', 'images/wide.jpg', 'images/wide.webp'):
+            self.assertTrue(os.path.isfile(self.collected(name)), name)
+            self.assertNotEqual(staticfiles_storage.hashed_files[name], name)
+        self.assertTrue(os.path.isfile(self.collected('site.css') + '.gz'))
+        with Image.open(self.collected('images/wide.jpg')) as image:
+            self.assertEqual(image.width, 1600)
+        # The CSS points at the hashed image
+        with open(self.collected('site.css')) as file:
+            self.assertIn(staticfiles_storage.hashed_files['images/noise.png'].split('/')[-1], file.read())
+
+    def test_serve_static(self):
+        css = staticfiles_storage.hashed_files['site.css']
+        response = serve_static(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'), css)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        response.close()
+
+        response = serve_static(RequestFactory().get('/'), 'site.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertNotIn('Content-Encoding', response)
+        response.close()
+
+    @override_settings(DEBUG=False)
+    def test_static_webp(self):
+        self.assertEqual(static_webp('images/noise.png'), static('images/noise.webp'))
+        self.assertTrue(static_webp('images/noise.png').endswith('.webp'))
+        self.assertEqual(static_webp('missing.png'), static('missing.png'))
@@ -2,31 +2,31 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib import messages
-from .models import UserProfile, Settings
+from .models import UserProfile
+from .page_cache import cache_public_page
 from products.models import Product, Category
 
-def home(request):
-    try:
-        top_picks_category = Category.objects.get(name="Top Picks")
-        featured_products = Product.objects.filter(category=top_picks_category)
-    except Category.DoesNotExist:
-        featured_products = Product.objects.none()
+# Settings reach these templates as site_settings through
+# core.context_processors.site_settings
+
+@cache_public_page
+def home(request, extra_context=None):
+    featured_products = Product.objects.filter(category__name="Top Picks")
     
     # Add any other context data your dashboard needs
     context = {
         'featured_products': featured_products,
     }
-    settings = Settings.get_settings()
     
-    return render(request, 'core/home.html', {**context, 'settings': settings})
+    return render(request, 'core/home.html', {**context, **(extra_context or {})})
 
-def about(request):
-    settings = Settings.get_settings()
-    return render(request, 'core/about.html', {'settings': settings})
+@cache_public_page
+def about(request, extra_context=None):
+    return render(request, 'core/about.html', extra_context)
 
-def contact(request):
-    settings = Settings.get_settings()
-    return render(request, 'core/contact.html', {'settings': settings})
+@cache_public_page
+def contact(request, extra_context=None):
+    return render(request, 'core/contact.html', extra_context)
 
 def login_view(request):
     if request.method == 'POST':
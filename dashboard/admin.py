@@ -1,6 +1,12 @@
 from django.contrib import admin
-from .models import SalesData
+from .models import ProductSalesData, SalesData
 
 @admin.register(SalesData)
 class SalesDataAdmin(admin.ModelAdmin):
     list_display = ('date', 'total_sales', 'total_orders')
+
+@admin.register(ProductSalesData)
+class ProductSalesDataAdmin(admin.ModelAdmin):
+    list_display = ('date', 'product', 'units', 'revenue')
+    list_filter = ('date',)
+    list_select_related = ('product',)
@@ -0,0 +1,119 @@
+# dashboard/exports.py
+import csv
+import tempfile
+
+import openpyxl
+from django.db.models import Prefetch
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from core.models import UserProfile
+from orders.models import OrderItem
+
+# Rows fetched from the database per round trip while exporting
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+CUSTOMER_HEADERS = ['ID', 'Username', 'Email', 'First Name', 'Last Name', 'Phone', 'Address', 'Date Joined']
+
+ORDER_HEADERS = [
+    'Order ID', 'Date', 'Status', 'Customer', 'Email', 'Phone', 'Order Total',
+    'Product', 'Quantity', 'Unit Price', 'Line Total',
+]
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def customer_rows():
+    """Yield one row per customer without loading them all at once"""
+    customers = UserProfile.objects.filter(is_seller=False).values_list(
+        'user__id', 'user__username', 'user__email', 'user__first_name',
+        'user__last_name', 'phone', 'address', 'user__date_joined',
+    ).order_by('user__id')
+
+    for row in customers.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [*row[:-1], row[-1].strftime('%Y-%m-%d %H:%M:%S')]
+
+
+def order_rows(orders):
+    """
+    Yield one row per order item, with the order's columns repeated
+
+    Orders are read in chunks of EXPORT_CHUNK_SIZE and each chunk's items
+    are fetched with a single prefetch query.
+
+    Args:
+        orders: Order queryset, e.g. from dashboard.views.filter_orders()
+    """
+    items = OrderItem.objects.select_related('product').only(
+        'order_id', 'quantity', 'price', 'product__name',
+    )
+    orders = orders.order_by('-created_at', '-id').prefetch_related(
+        Prefetch('items', queryset=items)
+    )
+
+    for order in orders.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        order_columns = [
+            order.id,
+            timezone.localtime(order.created_at).strftime('%Y-%m-%d %H:%M:%S'),
+            order.get_status_display(),
+            order.full_name,
+            order.email,
+            order.phone,
+            order.total_amount,
+        ]
+        lines = order.items.all()
+        if not lines:
+            yield order_columns + [None] * 4
+        for item in lines:
+            yield order_columns + [item.product.name, item.quantity, item.price, item.get_total()]
+
+
+def csv_response(filename, headers, rows):
+    """Stream rows as a CSV download, one line at a time"""
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+def xlsx_response(filename, title, headers, rows):
+    """
+    Send rows as an Excel download built with a write-only workbook
+
+    Write-only worksheets keep rows on disk instead of in memory, and the
+    finished file is streamed from a temporary file, so memory use does not
+    grow with the number of rows.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = Font(bold=True)
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for row in rows:
+        ws.append(row)
+
+    output = tempfile.TemporaryFile()
+    wb.save(output)
+    output.seek(0)
+
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
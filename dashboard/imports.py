@@ -0,0 +1,310 @@
+# dashboard/imports.py
+import csv
+import io
+import os
+import zipfile
+from decimal import Decimal, InvalidOperation
+
+import openpyxl
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from openpyxl.utils.exceptions import InvalidFileException
+
+from core.page_cache import invalidate_cached_pages
+from products.catalog import bump_catalog_version
+from products.models import Category, Product
+from products.search import index_products
+from .kpis import invalidate_dashboard_kpis
+
+# Rows validated and written per round trip while importing
+IMPORT_CHUNK_SIZE = 500
+
+# Columns an import file may have, in the order of the template; slug finds
+# the product to update and defaults to the slugified name
+IMPORT_COLUMNS = ('slug', 'name', 'category', 'description', 'price', 'stock')
+
+# Columns a row creating a product must fill; rows updating one only need
+# the columns that change
+REQUIRED_FOR_NEW = ('name', 'category', 'description', 'price', 'stock')
+
+MAX_PRICE = Decimal('99999999.99')
+
+# Largest value the database stores in a PositiveIntegerField such as stock
+MAX_STOCK = connection.ops.integer_field_range('PositiveIntegerField')[1]
+
+
+class ImportFileError(Exception):
+    """The upload can't be read as a product import at all"""
+
+
+def read_rows(file, filename):
+    """
+    Yield the data rows of a CSV or XLSX upload one at a time
+
+    XLSX files are opened in openpyxl's read-only mode, which streams the
+    sheet instead of building it in memory.
+
+    Args:
+        file: the uploaded file
+        filename: its name, for the format
+
+    Yields:
+        (row number in the file, {column: value}) for non-blank rows
+
+    Raises:
+        ImportFileError: unknown format, unreadable file or no header row
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    workbook = None
+    if extension == '.csv':
+        rows = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    elif extension == '.xlsx':
+        try:
+            workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        except (InvalidFileException, zipfile.BadZipFile, KeyError, OSError):
+            raise ImportFileError('The file is not a valid XLSX workbook')
+        rows = workbook.active.iter_rows(values_only=True)
+    else:
+        raise ImportFileError('Upload a .csv or .xlsx file')
+
+    try:
+        header = next(rows, None) or ()
+        columns = [str(column or '').strip().lower() for column in header]
+        if 'slug' not in columns and 'name' not in columns:
+            raise ImportFileError(
+                f"The first row must name the columns: {', '.join(IMPORT_COLUMNS)}"
+            )
+
+        for number, values in enumerate(rows, start=2):
+            row = {
+                column: value for column, value in zip(columns, values)
+                if column in IMPORT_COLUMNS and value not in (None, '')
+            }
+            if row:
+                yield number, row
+    except (UnicodeDecodeError, csv.Error):
+        raise ImportFileError('CSV files must be UTF-8 text')
+    finally:
+        # Read-only workbooks keep the file open until closed
+        if workbook is not None:
+            workbook.close()
+
+
+def _text(value):
+    return str(value).strip()
+
+
+def _parse_price(value):
+    try:
+        price = Decimal(_text(value))
+    except InvalidOperation:
+        return None, f'Price "{value}" is not a number'
+    if not price.is_finite() or price < 0 or price > MAX_PRICE:
+        return None, f'Price "{value}" is out of range'
+    if price.as_tuple().exponent < -2:
+        return None, f'Price "{value}" has more than 2 decimals'
+    return price, None
+
+
+def _parse_stock(value):
+    try:
+        stock = Decimal(_text(value))
+    except InvalidOperation:
+        return None, f'Stock "{value}" is not a number'
+    if not stock.is_finite() or stock < 0 or stock != stock.to_integral_value():
+        return None, f'Stock "{value}" must be a whole number of at least 0'
+    if stock > MAX_STOCK:
+        return None, f'Stock "{value}" is out of range'
+    return int(stock), None
+
+
+class CategoryResolver:
+    """
+    Find categories by name or slug from one query for the whole import
+
+    Unknown categories are either errors or, with create=True, unsaved
+    Category objects that _write_chunk() saves along with the first rows
+    using them.
+    """
+
+    def __init__(self, create=False):
+        self.create = create
+        self.by_key = {}
+        for category in Category.objects.all():
+            self.by_key.setdefault(category.name.strip().lower(), category)
+            self.by_key.setdefault(category.slug, category)
+
+    def resolve(self, value):
+        name = _text(value)
+        category = self.by_key.get(name.lower()) or self.by_key.get(slugify(name))
+        if category is None and self.create and slugify(name):
+            category = Category(name=name[:100], slug=slugify(name)[:100])
+            self.by_key[name.lower()] = self.by_key[category.slug] = category
+        return category
+
+
+def clean_row(row, categories):
+    """
+    Validate one row
+
+    Returns:
+        (slug, {field: value} to set, list of errors)
+    """
+    values, errors = {}, []
+
+    if 'name' in row:
+        values['name'] = _text(row['name'])[:200]
+    slug = slugify(_text(row.get('slug') or values.get('name', '')))[:200]
+    if not slug:
+        errors.append('A slug or a name is required')
+
+    if 'description' in row:
+        values['description'] = _text(row['description'])
+    if 'category' in row:
+        values['category'] = categories.resolve(row['category'])
+        if values['category'] is None:
+            errors.append(f'Unknown category "{row["category"]}"')
+    if 'price' in row:
+        values['price'], error = _parse_price(row['price'])
+        if error:
+            errors.append(error)
+    if 'stock' in row:
+        values['stock'], error = _parse_stock(row['stock'])
+        if error:
+            errors.append(error)
+
+    return slug, values, errors
+
+
+def _changes(product, values):
+    changes = {}
+    for field, value in values.items():
+        if field == 'category':
+            if product.category_id != value.pk:
+                changes[field] = value
+        elif getattr(product, field) != value:
+            changes[field] = value
+    return changes
+
+
+def _write_chunk(chunk, dry_run):
+    """
+    Create or update one chunk of validated rows
+
+    Takes a lookup, one INSERT for new categories, one bulk_create, one
+    bulk_update and the search index refresh, whatever the number of rows.
+
+    Returns:
+        (report entries for the chunk, slugs of the new categories it uses)
+    """
+    new_categories = {
+        values['category'].slug: values['category'] for _, _, values in chunk
+        if 'category' in values and values['category'].pk is None
+    }
+    with transaction.atomic():
+        if not dry_run:
+            Category.objects.bulk_create(new_categories.values())
+        existing = Product.objects.only(
+            'id', 'slug', 'name', 'description', 'price', 'stock', 'category_id',
+        ).in_bulk([slug for _, slug, _ in chunk], field_name='slug')
+
+        report, to_create, to_update, fields = [], [], [], set()
+        for number, slug, values in chunk:
+            entry = {'row': number, 'slug': slug, 'messages': []}
+            product = existing.get(slug)
+            if product is None:
+                missing = [field for field in REQUIRED_FOR_NEW if field not in values]
+                if missing:
+                    entry.update(
+                        result='error',
+                        messages=[f"New product needs {', '.join(missing)}"],
+                    )
+                else:
+                    entry['result'] = 'created'
+                    to_create.append(Product(slug=slug, **values))
+            else:
+                changes = _changes(product, values)
+                if changes:
+                    entry.update(result='updated', messages=[f"Changed {', '.join(changes)}"])
+                    for field, value in changes.items():
+                        setattr(product, field, value)
+                    fields.update(changes)
+                    to_update.append(product)
+                else:
+                    entry['result'] = 'unchanged'
+            report.append(entry)
+
+        if not dry_run:
+            Product.objects.bulk_create(to_create)
+            if to_update:
+                now = timezone.now()
+                for product in to_update:
+                    product.updated_at = now
+                Product.objects.bulk_update(to_update, [*fields, 'updated_at'])
+            # bulk_create and bulk_update skip post_save, which keeps the
+            # search index in sync for single saves
+            index_products(to_create + [p for p in to_update if fields & {'name', 'description'}])
+
+    return report, set(new_categories)
+
+
+def import_products(file, filename, create_categories=False, dry_run=False, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Create or update products from a CSV or XLSX file, matched by slug
+
+    The file is streamed and written chunk_size rows at a time, each chunk
+    in its own transaction, so memory doesn't grow with the file. Blank
+    cells leave a product's current value alone.
+
+    Args:
+        file: the uploaded file
+        filename: its name, for the format
+        create_categories: create categories the file names that don't
+            exist instead of rejecting those rows
+        dry_run: validate and report without writing anything
+
+    Returns:
+        dict with 'results' (one {'row', 'slug', 'result', 'messages'} per
+        row, result being 'created', 'updated', 'unchanged' or 'error'),
+        'counts' per result and 'categories_created'
+
+    Raises:
+        ImportFileError: the file can't be read at all
+    """
+    categories = CategoryResolver(create=create_categories)
+    results, chunk, seen, new_categories = [], [], {}, set()
+
+    def flush():
+        report, created = _write_chunk(chunk, dry_run)
+        results.extend(report)
+        new_categories.update(created)
+        chunk.clear()
+
+    for number, row in read_rows(file, filename):
+        slug, values, errors = clean_row(row, categories)
+        if slug in seen:
+            errors.append(f'Slug "{slug}" is already used on row {seen[slug]}')
+        elif slug:
+            seen[slug] = number
+
+        if errors:
+            results.append({'row': number, 'slug': slug, 'result': 'error', 'messages': errors})
+            continue
+        chunk.append((number, slug, values))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    results.sort(key=lambda entry: entry['row'])
+    counts = dict.fromkeys(('created', 'updated', 'unchanged', 'error'), 0)
+    for entry in results:
+        counts[entry['result']] += 1
+
+    if not dry_run and (counts['created'] or counts['updated'] or new_categories):
+        bump_catalog_version()
+        invalidate_cached_pages()
+        invalidate_dashboard_kpis()
+
+    return {'results': results, 'counts': counts, 'categories_created': len(new_categories)}
@@ -0,0 +1,62 @@
+# dashboard/kpis.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from core.models import UserProfile
+from orders.models import Order
+from products.models import Product
+from .models import SalesData
+
+# Upper bound in seconds on how stale the dashboard KPIs can get, in case a
+# write skips the invalidation (e.g. a raw queryset update)
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+
+KPI_CACHE_KEY = 'dashboard:kpis:{day}'
+
+
+def compute_dashboard_kpis(today):
+    """Run the dashboard queries; see get_dashboard_kpis()"""
+    last_week = today - timedelta(days=7)
+
+    return {
+        'total_orders': Order.objects.count(),
+        'total_products': Product.objects.count(),
+        'total_customers': UserProfile.objects.filter(is_seller=False).count(),
+        'total_sales': Order.objects.filter(status='delivered').aggregate(
+            Sum('total_amount'))['total_amount__sum'] or 0,
+        'recent_orders': list(Order.objects.order_by('-created_at')[:5]),
+        'sales_data': list(SalesData.objects.filter(date__gte=last_week).order_by('date')),
+    }
+
+
+def get_dashboard_kpis():
+    """
+    Return the dashboard statistics, recent orders and last week's sales
+
+    Served from the cache until a write to Order, Product or UserProfile
+    invalidates it or DASHBOARD_CACHE_TIMEOUT passes.
+    """
+    today = timezone.localdate()
+    key = KPI_CACHE_KEY.format(day=today.isoformat())
+
+    kpis = cache.get(key)
+    if kpis is None:
+        kpis = compute_dashboard_kpis(today)
+        cache.set(key, kpis, DASHBOARD_CACHE_TIMEOUT)
+    return kpis
+
+
+def invalidate_dashboard_kpis():
+    """
+    Drop the cached KPIs once the current transaction commits
+
+    Only reaches other processes through a shared cache backend, see CACHES
+    in settings.
+    """
+    key = KPI_CACHE_KEY.format(day=timezone.localdate().isoformat())
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.rollups import rebuild_sales_data
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily SalesData and ProductSalesData rollups from orders for a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=parse_date,
+                            help='First date to rebuild (YYYY-MM-DD), defaults to the first order')
+        parser.add_argument('--to', dest='date_to', type=parse_date,
+                            help='Last date to rebuild (YYYY-MM-DD), defaults to the last order')
+
+    def handle(self, *args, **options):
+        days, product_days = rebuild_sales_data(options['date_from'], options['date_to'])
+        self.stdout.write(f'Wrote {days} SalesData and {product_days} ProductSalesData row(s)')
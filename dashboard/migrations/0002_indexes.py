@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salesdata',
+            index=models.Index(fields=['date'], name='dashboard_sales_date_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.15 on 2026-10-18 00:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='salesdata',
+            name='dashboard_sales_date_idx',
+        ),
+        migrations.AlterField(
+            model_name='salesdata',
+            name='date',
+            field=models.DateField(unique=True),
+        ),
+    ]
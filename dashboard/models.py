@@ -2,7 +2,7 @@
 from django.db import models
 
 class SalesData(models.Model):
-    date = models.DateField(auto_now_add=True)
+    date = models.DateField(unique=True)
     total_sales = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_orders = models.PositiveIntegerField(default=0)
     
@@ -12,3 +12,20 @@ class SalesData(models.Model):
     
     def __str__(self):
         return f"Sales on {self.date} - {self.total_sales}"
+
+class ProductSalesData(models.Model):
+    """Units sold and revenue per product per day, kept by dashboard.rollups"""
+    date = models.DateField()
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'Product Sales Data'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='dashboard_product_sales_day'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} on {self.date} - {self.units}"
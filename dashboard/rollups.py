@@ -0,0 +1,320 @@
+# dashboard/rollups.py
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, DecimalField, F, PositiveIntegerField, Sum, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.date_utils import start_of_day
+from orders.models import Order, OrderItem
+from .models import ProductSalesData, SalesData
+
+# (date, product) pairs written per query, keeping each statement well
+# under SQLite's limits on bound parameters
+PRODUCT_SALES_BATCH_SIZE = 500
+
+LINE_REVENUE = Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def order_day(order):
+    """Return the local date an order counts towards"""
+    return timezone.localdate(order.created_at)
+
+
+def counts_as_sale(status):
+    return status != 'cancelled'
+
+
+def add_to_sales_data(day, sales, orders):
+    """
+    Atomically add to a day's SalesData row, creating it if needed
+
+    Args:
+        day: date of the row
+        sales: amount to add to total_sales (may be negative)
+        orders: number to add to total_orders (may be negative)
+    """
+    changes = {
+        'total_sales': F('total_sales') + sales,
+        'total_orders': F('total_orders') + orders,
+    }
+    if SalesData.objects.filter(date=day).update(**changes) or orders < 0:
+        return
+
+    try:
+        with transaction.atomic():
+            SalesData.objects.create(date=day, total_sales=sales, total_orders=orders)
+    except IntegrityError:
+        # Another request created the row first
+        SalesData.objects.filter(date=day).update(**changes)
+
+
+def add_to_product_sales(day, deltas):
+    """
+    Atomically add units and revenue to a day's ProductSalesData rows
+
+    Args:
+        day: date of the rows
+        deltas: dict of {product_id: (units, revenue)}, all positive or all negative
+    """
+    add_to_product_sales_by_day({(day, product_id): delta for product_id, delta in deltas.items()})
+
+
+def add_to_product_sales_by_day(deltas):
+    """
+    Atomically add units and revenue to ProductSalesData rows of any days
+
+    Additions are multi-row INSERT ... ON CONFLICT DO UPDATE, removals
+    UPDATEs, one query per PRODUCT_SALES_BATCH_SIZE (date, product) pairs.
+
+    Args:
+        deltas: dict of {(date, product_id): (units, revenue)}, all positive
+            or all negative
+    """
+    items = list(deltas.items())
+    for start in range(0, len(items), PRODUCT_SALES_BATCH_SIZE):
+        batch = items[start:start + PRODUCT_SALES_BATCH_SIZE]
+        if any(units < 0 for _, (units, _) in batch):
+            _remove_product_sales(batch)
+        else:
+            _add_product_sales(batch)
+
+
+def _remove_product_sales(batch):
+    # The IN filters only narrow the rows down; the CASEs pick the exact
+    # (date, product) pairs. An OR per pair would nest one level per term
+    # and hit SQLite's expression depth limit.
+    ProductSalesData.objects.filter(
+        date__in={day for (day, _), _ in batch},
+        product_id__in={product_id for (_, product_id), _ in batch},
+    ).update(
+        units=Case(
+            *[When(date=day, product_id=product_id, then=F('units') + units)
+              for (day, product_id), (units, _) in batch],
+            default=F('units'),
+            output_field=PositiveIntegerField(),
+        ),
+        revenue=Case(
+            *[When(date=day, product_id=product_id, then=F('revenue') + revenue)
+              for (day, product_id), (_, revenue) in batch],
+            default=F('revenue'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+def _add_product_sales(batch):
+    table = connection.ops.quote_name(ProductSalesData._meta.db_table)
+    params = []
+    for (day, product_id), (units, revenue) in batch:
+        params += [
+            connection.ops.adapt_datefield_value(day),
+            product_id,
+            units,
+            connection.ops.adapt_decimalfield_value(revenue, 12, 2),
+        ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (date, product_id, units, revenue) '
+            f'VALUES {", ".join(["(%s, %s, %s, %s)"] * len(batch))} '
+            f'ON CONFLICT (date, product_id) DO UPDATE SET '
+            f'units = {table}.units + excluded.units, '
+            f'revenue = {table}.revenue + excluded.revenue',
+            params,
+        )
+
+
+def add_to_sales_data_by_day(deltas):
+    """
+    Atomically add to the SalesData rows of any days in one query
+
+    Args:
+        deltas: dict of {date: (sales, orders)}, all positive or all
+            negative; rows are only created for positive ones
+    """
+    if not deltas:
+        return
+
+    if any(orders < 0 for _, orders in deltas.values()):
+        SalesData.objects.filter(date__in=list(deltas)).update(
+            total_sales=Case(
+                *[When(date=day, then=F('total_sales') + sales) for day, (sales, _) in deltas.items()],
+                default=F('total_sales'),
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+            total_orders=Case(
+                *[When(date=day, then=F('total_orders') + orders) for day, (_, orders) in deltas.items()],
+                default=F('total_orders'),
+                output_field=PositiveIntegerField(),
+            ),
+        )
+        return
+
+    table = connection.ops.quote_name(SalesData._meta.db_table)
+    params = []
+    for day, (sales, orders) in deltas.items():
+        params += [
+            connection.ops.adapt_datefield_value(day),
+            connection.ops.adapt_decimalfield_value(sales, 10, 2),
+            orders,
+        ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (date, total_sales, total_orders) '
+            f'VALUES {", ".join(["(%s, %s, %s)"] * len(deltas))} '
+            f'ON CONFLICT (date) DO UPDATE SET '
+            f'total_sales = {table}.total_sales + excluded.total_sales, '
+            f'total_orders = {table}.total_orders + excluded.total_orders',
+            params,
+        )
+
+
+def order_product_deltas(order, sign=1):
+    """Return {product_id: (units, revenue)} for an order's items in one query"""
+    return {
+        row['product_id']: (sign * row['units'], sign * row['revenue'])
+        for row in order.items.values('product_id').annotate(
+            units=Sum('quantity'), revenue=LINE_REVENUE,
+        ).order_by()
+    }
+
+
+def record_order_created(order):
+    if counts_as_sale(order.status):
+        add_to_sales_data(order_day(order), order.total_amount, 1)
+
+
+def record_order_placed(order, items):
+    """Add a new order's items to the per-product rollup"""
+    if not counts_as_sale(order.status):
+        return
+
+    deltas = {}
+    for item in items:
+        units, revenue = deltas.get(item.product_id, (0, Decimal('0')))
+        deltas[item.product_id] = (units + item.quantity, revenue + item.get_total())
+    add_to_product_sales(order_day(order), deltas)
+
+
+def record_order_status_change(order, old_status):
+    """Move an order in or out of the rollups when it is cancelled or restored"""
+    was_sale, is_sale = counts_as_sale(old_status), counts_as_sale(order.status)
+    if was_sale == is_sale:
+        return
+
+    sign = 1 if is_sale else -1
+    add_to_sales_data(order_day(order), sign * order.total_amount, sign)
+    add_to_product_sales(order_day(order), order_product_deltas(order, sign))
+
+
+def record_bulk_status_change(orders, status):
+    """
+    Move orders that were all changed to status in or out of the rollups
+
+    Takes a constant number of queries however many orders and days are
+    involved.
+
+    Args:
+        orders: Order objects with their previous status in original_status
+        status: the status they were moved to
+    """
+    is_sale = counts_as_sale(status)
+    moved = [order for order in orders if counts_as_sale(order.original_status) != is_sale]
+    if not moved:
+        return
+
+    sign = 1 if is_sale else -1
+    sales = {}
+    for order in moved:
+        day_sales, day_orders = sales.get(order_day(order), (Decimal('0'), 0))
+        sales[order_day(order)] = (day_sales + sign * order.total_amount, day_orders + sign)
+    add_to_sales_data_by_day(sales)
+
+    add_to_product_sales_by_day({
+        (row['day'], row['product_id']): (sign * row['units'], sign * row['revenue'])
+        for row in OrderItem.objects.filter(order__in=[order.id for order in moved])
+        .annotate(day=TruncDate('order__created_at'))
+        .values('day', 'product_id')
+        .annotate(units=Sum('quantity'), revenue=LINE_REVENUE)
+        .order_by()
+    })
+
+
+def record_order_deleted(order):
+    """Take an order out of the rollups; called before its items are deleted"""
+    if counts_as_sale(order.status):
+        add_to_sales_data(order_day(order), -order.total_amount, -1)
+        add_to_product_sales(order_day(order), order_product_deltas(order, -1))
+
+
+def rebuild_sales_data(date_from=None, date_to=None):
+    """
+    Recompute SalesData and ProductSalesData for a date range
+
+    Each table is rebuilt from one grouped query over the orders. The
+    signals only track orders and their items as written by checkout, status
+    changes and deletes; orders.admin rebuilds the day of an order edited
+    there, and items saved one by one elsewhere count after a rebuild.
+
+    Args:
+        date_from: first date to rebuild, or None for the first order's date
+        date_to: last date to rebuild, or None for the last order's date
+
+    Returns:
+        (SalesData rows written, ProductSalesData rows written)
+    """
+    orders = Order.objects.exclude(status='cancelled')
+    rows = SalesData.objects.all()
+    product_rows = ProductSalesData.objects.all()
+
+    if date_from:
+        orders = orders.filter(created_at__gte=start_of_day(date_from))
+        rows = rows.filter(date__gte=date_from)
+        product_rows = product_rows.filter(date__gte=date_from)
+    if date_to:
+        orders = orders.filter(created_at__lt=start_of_day(date_to + timedelta(days=1)))
+        rows = rows.filter(date__lte=date_to)
+        product_rows = product_rows.filter(date__lte=date_to)
+
+    product_totals = (
+        OrderItem.objects.filter(order__in=orders)
+        .annotate(day=TruncDate('order__created_at'))
+        .values('day', 'product_id')
+        .annotate(units=Sum('quantity'), revenue=LINE_REVENUE)
+        .order_by('day')
+    )
+
+    totals = (
+        orders.annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(total_sales=Sum('total_amount'), total_orders=Count('id'))
+        .order_by('day')
+    )
+
+    with transaction.atomic():
+        rows.delete()
+        created = SalesData.objects.bulk_create([
+            SalesData(
+                date=row['day'],
+                total_sales=row['total_sales'] or Decimal('0'),
+                total_orders=row['total_orders'],
+            )
+            for row in totals
+        ])
+
+        product_rows.delete()
+        product_created = ProductSalesData.objects.bulk_create([
+            ProductSalesData(
+                date=row['day'],
+                product_id=row['product_id'],
+                units=row['units'],
+                revenue=row['revenue'] or Decimal('0'),
+            )
+            for row in product_totals
+        ])
+
+    return len(created), len(product_created)
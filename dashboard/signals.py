@@ -0,0 +1,60 @@
+# dashboard/signals.py
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.models import UserProfile
+from orders.models import Order
+from orders.signals import order_placed, order_statuses_changed
+from products.models import Product
+from . import rollups
+from .kpis import invalidate_dashboard_kpis
+
+
+@receiver(post_save, sender=Order)
+def update_dashboard_on_order_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    invalidate_dashboard_kpis()
+
+    if created:
+        rollups.record_order_created(instance)
+    elif instance.original_status and instance.status != instance.original_status:
+        rollups.record_order_status_change(instance, instance.original_status)
+
+
+@receiver(order_placed)
+def update_product_sales_on_order_placed(sender, order, items, **kwargs):
+    rollups.record_order_placed(order, items)
+
+
+@receiver(order_statuses_changed)
+def update_dashboard_on_bulk_status_change(sender, orders, status, **kwargs):
+    invalidate_dashboard_kpis()
+    rollups.record_bulk_status_change(orders, status)
+
+
+@receiver(pre_delete, sender=Order)
+def update_dashboard_on_order_delete(sender, instance, **kwargs):
+    # pre_delete so the order's items can still be read
+    invalidate_dashboard_kpis()
+    rollups.record_order_deleted(instance)
+
+
+@receiver(post_save, sender=Product)
+def update_kpis_on_product_save(sender, instance, created, raw=False, **kwargs):
+    # Only the product count is on the dashboard
+    if created and not raw:
+        invalidate_dashboard_kpis()
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=UserProfile)
+def update_kpis_on_delete(sender, instance, **kwargs):
+    invalidate_dashboard_kpis()
+
+
+@receiver(post_save, sender=UserProfile)
+def update_kpis_on_profile_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_dashboard_kpis()
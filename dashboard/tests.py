@@ -1,3 +1,658 @@
+import csv
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from io import BytesIO
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from django.utils import timezone
+
+from core.models import OutgoingEmail, UserProfile
+from core.testing import QueryPlanTestMixin
+from orders.checkout import create_order
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from products.search import search_product_ids
+from .exports import CUSTOMER_HEADERS, ORDER_HEADERS, XLSX_CONTENT_TYPE, order_rows
+from .imports import import_products
+from .kpis import KPI_CACHE_KEY, get_dashboard_kpis
+from .models import ProductSalesData, SalesData
+from .rollups import rebuild_sales_data
+
+
+class DashboardQueryPlanTests(QueryPlanTestMixin, TestCase):
+    """The seller dashboard queries in dashboard/views.py must use an index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('penjual', 'penjual@example.com', 'secret')
+        UserProfile.objects.create(user=cls.seller, is_seller=True)
+        customer = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        UserProfile.objects.create(user=customer)
+
+        category = Category.objects.create(name='Martabak Telur')
+        product = Product.objects.create(
+            name='Martabak Telur Bebek',
+            description='Telur bebek',
+            price=40000,
+            stock=0,
+            category=category,
+            image='products/telur-bebek.jpg',
+        )
+        for status in ('pending', 'processing', 'delivered'):
+            order = Order.objects.create(
+                user=customer,
+                full_name='Budi',
+                email='budi@example.com',
+                phone='08123456789',
+                address='Jl. Pandan Wangi',
+                total_amount=40000,
+                status=status,
+            )
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=40000)
+
+    def setUp(self):
+        # The dashboard KPIs are cached; start cold so their queries run
+        cache.clear()
+        self.client.force_login(self.seller)
+
+    def test_dashboard(self):
+        self.assertViewNoFullTableScan(self.client, reverse('dashboard'))
+
+    def test_order_list(self):
+        self.assertViewNoFullTableScan(self.client, reverse('dashboard_orders'))
+
+    def test_order_list_by_status_and_date(self):
+        url = reverse('dashboard_orders') + '?status=delivered&date_from=2025-01-01&date_to=2025-12-31'
+        self.assertViewNoFullTableScan(self.client, url)
+
+    def test_order_list_by_date(self):
+        url = reverse('dashboard_orders') + '?date_from=2025-01-01'
+        self.assertViewNoFullTableScan(self.client, url)
+
+    def test_product_list_by_stock(self):
+        for stock_status in ('in_stock', 'out_of_stock', 'low_stock'):
+            url = reverse('dashboard_products') + f'?stock_status={stock_status}'
+            self.assertViewNoFullTableScan(self.client, url)
+
+    def test_customer_list(self):
+        self.assertViewNoFullTableScan(self.client, reverse('customer_list'))
+
+    def test_sales_data(self):
+        for period in ('week', 'month', 'year'):
+            url = reverse('sales_data') + f'?period={period}'
+            self.assertViewNoFullTableScan(self.client, url)
+
+
+class SellerAccessTests(TestCase):
+    """Dashboard views are for sellers only and load the profile with the user"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('penjual', 'penjual@example.com', 'secret')
+        UserProfile.objects.create(user=cls.seller, is_seller=True)
+        cls.customer = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        UserProfile.objects.create(user=cls.customer)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seller_and_profile_loaded_in_one_query(self):
+        self.client.force_login(self.seller)
+        self.client.get(reverse('dashboard'))
+        # One query for the session, one joined query for the user and
+        # profile; the KPIs come from the cache
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_customer_redirected(self):
+        self.client.force_login(self.customer)
+        self.assertRedirects(self.client.get(reverse('dashboard')), reverse('home'))
+
+    def test_user_without_profile_redirected(self):
+        self.client.force_login(User.objects.create_user('tanpa-profil', password='secret'))
+        self.assertRedirects(self.client.get(reverse('dashboard_orders')), reverse('home'))
+
+    def test_anonymous_sent_to_login(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertRedirects(response, reverse('login') + '?next=' + reverse('dashboard'))
+
+    def test_wrong_password(self):
+        # Hashed once, by the only backend
+        with mock.patch.object(User, 'check_password', autospec=True, return_value=False) as check_password:
+            self.assertFalse(self.client.login(username='penjual', password='salah'))
+        self.assertEqual(check_password.call_count, 1)
+        self.assertTrue(self.client.login(username='penjual', password='secret'))
+
+    def test_model_backend_sessions_sign_in_again(self):
+        # See AUTHENTICATION_BACKENDS in settings
+        self.client.force_login(self.seller, backend='django.contrib.auth.backends.ModelBackend')
+        response = self.client.get(reverse('dashboard'))
+        self.assertRedirects(response, reverse('login') + '?next=' + reverse('dashboard'))
+
+
+class DashboardKpiCacheTests(TestCase):
+    """The dashboard KPIs are cached and dropped after writes commit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('penjual', 'penjual@example.com', 'secret')
+        UserProfile.objects.create(user=cls.seller, is_seller=True)
+        cls.customer = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        cls.profile = UserProfile.objects.create(user=cls.customer)
+        cls.category = Category.objects.create(name='Martabak Manis')
+
+    def setUp(self):
+        cache.clear()
+        self.key = KPI_CACHE_KEY.format(day=timezone.localdate().isoformat())
+
+    def assertDroppedOnCommit(self, write):
+        get_dashboard_kpis()
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+            self.assertIsNotNone(cache.get(self.key))
+        self.assertIsNone(cache.get(self.key))
+
+    def test_warm_kpis_cost_no_queries(self):
+        get_dashboard_kpis()
+        with self.assertNumQueries(0):
+            get_dashboard_kpis()
+
+    def test_warm_dashboard_refresh(self):
+        self.client.force_login(self.seller)
+        self.client.get(reverse('dashboard'))
+        # The session and the joined user and profile; nothing for the KPIs
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_order_write_drops_kpis(self):
+        self.assertDroppedOnCommit(lambda: Order.objects.create(
+            user=self.customer,
+            full_name='Budi',
+            email='budi@example.com',
+            phone='08123456789',
+            address='Jl. Merdeka 1',
+            total_amount=25000,
+        ))
+
+    def test_product_write_drops_kpis(self):
+        self.assertDroppedOnCommit(lambda: Product.objects.create(
+            name='Martabak Keju', description='Keju', price=30000,
+            category=self.category, stock=5,
+        ))
+
+    def test_profile_write_drops_kpis(self):
+        def write():
+            self.profile.phone = '08987654321'
+            self.profile.save()
+        self.assertDroppedOnCommit(write)
+
+class BulkStatusTests(TestCase):
+    """Orders change status in bulk in one UPDATE, keeping the rollups right"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('penjual', 'penjual@example.com', 'secret')
+        UserProfile.objects.create(user=cls.seller, is_seller=True)
+        customer = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        category = Category.objects.create(name='Martabak Manis')
+        cls.products = [
+            Product.objects.create(name=f'Martabak {i}', description='Manis', price=30000, stock=50, category=category)
+            for i in range(2)
+        ]
+        cls.orders = {}
+        for i, status in enumerate(['pending', 'pending', 'processing', 'pending', 'delivered', 'cancelled']):
+            order = Order.objects.create(
+                user=customer, full_name='Budi', email='budi@example.com', phone='08123456789',
+                address='Jl. Pandan Wangi', total_amount=30000 * (i + 1), status=status,
+            )
+            OrderItem.objects.create(order=order, product=cls.products[i % 2], quantity=i + 1, price=30000)
+            # Spread over three days
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=i % 3))
+            cls.orders.setdefault(status, []).append(order.id)
+
+    def setUp(self):
+        rebuild_sales_data()
+        self.client.force_login(self.seller)
+
+    def post(self, data, query=''):
+        return self.client.post(
+            reverse('bulk_update_order_status') + query, data, HTTP_ACCEPT='application/json',
+        )
+
+    def rollups(self):
+        # Rows emptied by a cancellation stay behind at zero until a rebuild
+        return (
+            list(SalesData.objects.filter(total_orders__gt=0).order_by('date')
+                 .values_list('date', 'total_sales', 'total_orders')),
+            list(ProductSalesData.objects.filter(units__gt=0).order_by('date', 'product')
+                 .values_list('date', 'product', 'units', 'revenue')),
+        )
+
+    def test_selected_orders_with_per_order_results(self):
+        pending = self.orders['pending']
+        ids = pending[:2] + self.orders['delivered'] + self.orders['cancelled'] + [999]
+        response = self.post({'new_status': 'delivered', 'order_ids': ids})
+        results = {result['id']: result['result'] for result in response.json()['results']}
+        self.assertEqual(results, {
+            pending[0]: 'updated', pending[1]: 'updated',
+            self.orders['delivered'][0]: 'unchanged',
+            self.orders['cancelled'][0]: 'invalid',
+            999: 'not_found',
+        })
+        self.assertEqual(Order.objects.filter(status='delivered').count(), 3)
+        self.assertEqual(OutgoingEmail.objects.filter(kind='delivered').count(), 2)
+
+    def test_constant_queries(self):
+        counts = []
+        for status, ids in (('processing', self.orders['pending'][:1]), ('delivered', self.orders['pending'][1:] + self.orders['processing'])):
+            with CaptureQueriesContext(connection) as queries:
+                self.post({'new_status': status, 'order_ids': ids})
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_cancel_and_restore_filtered_keep_rollups(self):
+        self.post({'new_status': 'cancelled', 'apply_to': 'filtered'}, '?status=pending')
+        self.assertFalse(Order.objects.filter(status='pending').exists())
+        after_cancel = self.rollups()
+        rebuild_sales_data()
+        self.assertEqual(self.rollups(), after_cancel)
+
+        self.post({'new_status': 'pending', 'apply_to': 'filtered'}, '?status=cancelled')
+        after_restore = self.rollups()
+        rebuild_sales_data()
+        self.assertEqual(self.rollups(), after_restore)
+        self.assertEqual(Order.objects.filter(status='pending').count(), 4)
+
+    def test_cancel_many_days_and_products(self):
+        # More (day, product) pairs than SQLite allows terms in one nested
+        # expression
+        category = Category.objects.create(name='Martabak Telur')
+        products = Product.objects.bulk_create([
+            Product(name=f'Telur {i}', slug=f'telur-{i}', description='Telur', price=20000, stock=10, category=category)
+            for i in range(40)
+        ])
+        customer = User.objects.get(username='budi')
+        orders = Order.objects.bulk_create([
+            Order(
+                user=customer, full_name='Budi', email='budi@example.com', phone='08123456789',
+                address='Jl. Pandan Wangi', total_amount=20000 * 40, status='processing',
+            )
+            for _ in range(60)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1, price=20000)
+            for order in orders for product in products
+        ])
+        for i, order in enumerate(orders):
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=i))
+        rebuild_sales_data()
+
+        response = self.post({'new_status': 'cancelled', 'apply_to': 'filtered'}, '?status=processing')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.filter(status='processing').count(), 0)
+        after_cancel = self.rollups()
+        rebuild_sales_data()
+        self.assertEqual(self.rollups(), after_cancel)
+
+
+class RollupTests(TestCase):
+    """SalesData and ProductSalesData follow orders as they are written"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        category = Category.objects.create(name='Martabak Manis')
+        cls.products = [
+            Product.objects.create(name=f'Martabak {i}', description='Manis', price=30000 + i * 5000, stock=50, category=category)
+            for i in range(2)
+        ]
+
+    def place(self, quantities):
+        return create_order(
+            self.customer,
+            {product.id: quantity for product, quantity in zip(self.products, quantities) if quantity},
+            full_name='Budi', email='budi@example.com', phone='08123456789', address='Jl. Pandan Wangi',
+        )
+
+    def rollups(self):
+        return (
+            list(SalesData.objects.filter(total_orders__gt=0).order_by('date')
+                 .values_list('date', 'total_sales', 'total_orders')),
+            list(ProductSalesData.objects.filter(units__gt=0).order_by('date', 'product_id')
+                 .values_list('date', 'product', 'units', 'revenue')),
+        )
+
+    def assertMatchesRebuild(self):
+        rollups = self.rollups()
+        rebuild_sales_data()
+        self.assertEqual(self.rollups(), rollups)
+
+    def test_create_order(self):
+        self.place([2, 1])
+        self.place([1, 0])
+        today = timezone.localdate()
+        self.assertEqual(self.rollups(), (
+            [(today, 2 * 30000 + 35000 + 30000, 2)],
+            [(today, self.products[0].id, 3, 90000), (today, self.products[1].id, 1, 35000)],
+        ))
+        self.assertMatchesRebuild()
+
+    def test_cancel_and_restore(self):
+        kept = self.place([1, 0])
+        order = Order.objects.get(pk=self.place([2, 3]).pk)
+        order.status = 'cancelled'
+        order.save()
+        today = timezone.localdate()
+        self.assertEqual(self.rollups(), ([(today, 30000, 1)], [(today, self.products[0].id, 1, 30000)]))
+        self.assertMatchesRebuild()
+
+        order.status = 'processing'
+        order.save()
+        self.assertEqual(self.rollups()[0], [(today, kept.total_amount + order.total_amount, 2)])
+        self.assertMatchesRebuild()
+
+    def test_delete_order(self):
+        self.place([1, 0])
+        Order.objects.get(pk=self.place([2, 3]).pk).delete()
+        today = timezone.localdate()
+        self.assertEqual(self.rollups(), ([(today, 30000, 1)], [(today, self.products[0].id, 1, 30000)]))
+
+    def test_rebuild_date_range(self):
+        orders = [self.place([1, 1]) for _ in range(3)]
+        for i, order in enumerate(orders):
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=i))
+        rebuild_sales_data()
+        expected = self.rollups()
+        SalesData.objects.update(total_sales=1, total_orders=9)
+        ProductSalesData.objects.update(units=9)
+
+        yesterday = timezone.localdate() - timedelta(days=1)
+        self.assertEqual(rebuild_sales_data(yesterday, timezone.localdate()), (2, 4))
+        sales, product_sales = self.rollups()
+        self.assertEqual(sales[1:], expected[0][1:])
+        self.assertEqual(product_sales[2:], expected[1][2:])
+        # Days outside the range are left alone
+        self.assertEqual(sales[0][1:], (1, 9))
+        self.assertEqual([row[2] for row in product_sales[:2]], [9, 9])
+
+    def test_admin_inline_items(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        self.client.force_login(admin_user)
+        order = self.place([1, 0])
+        item = order.items.get()
+        response = self.client.post(reverse('admin:orders_order_change', args=[order.pk]), {
+            'user': self.customer.pk, 'full_name': 'Budi', 'email': 'budi@example.com',
+            'phone': '08123456789', 'address': 'Jl. Pandan Wangi', 'total_amount': '95000',
+            'status': 'pending', 'item_count': 2, 'total_quantity': 3, 'customer_name': 'budi',
+            'items-TOTAL_FORMS': 2, 'items-INITIAL_FORMS': 1,
+            'items-0-id': item.pk, 'items-0-order': order.pk, 'items-0-product': self.products[0].id,
+            'items-0-quantity': 1, 'items-0-price': '30000',
+            'items-1-order': order.pk, 'items-1-product': self.products[1].id,
+            'items-1-quantity': 2, 'items-1-price': '32500',
+        })
+        self.assertEqual(response.status_code, 302)
+        today = timezone.localdate()
+        self.assertEqual(self.rollups(), (
+            [(today, 95000, 1)],
+            [(today, self.products[0].id, 1, 30000), (today, self.products[1].id, 2, 65000)],
+        ))
+
+
+class OrderExportTests(TestCase):
+    """The orders export follows the list's filters, one row per order item"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('penjual', 'penjual@example.com', 'secret')
+        UserProfile.objects.create(user=cls.seller, is_seller=True)
+        cls.customer = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        category = Category.objects.create(name='Martabak Manis')
+        cls.products = [
+            Product.objects.create(name=f'Martabak {i}', description='Manis', price=30000, stock=50, category=category)
+            for i in range(2)
+        ]
+        cls.today = timezone.localdate()
+        # Two items delivered today, one item pending three days ago
+        cls.delivered = cls.create_order('delivered', days_ago=0, quantities=[1, 2])
+        cls.pending = cls.create_order('pending', days_ago=3, quantities=[3])
+
+    @classmethod
+    def create_order(cls, status, days_ago=0, quantities=(1,)):
+        order = Order.objects.create(
+            user=cls.customer, full_name='Budi', email='budi@example.com', phone='08123456789',
+            address='Jl. Pandan Wangi', total_amount=30000 * sum(quantities), status=status,
+        )
+        for product, quantity in zip(cls.products, quantities):
+            OrderItem.objects.create(order=order, product=product, quantity=quantity, price=30000)
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return order
+
+    def setUp(self):
+        self.client.force_login(self.seller)
+
+    def csv_rows(self, query=''):
+        response = self.client.get(reverse('export_orders') + '?format=csv' + query)
+        body = b''.join(response.streaming_content).decode()
+        return list(csv.reader(body.splitlines()))
+
+    def xlsx_rows(self, query=''):
+        response = self.client.get(reverse('export_orders') + '?format=xlsx' + query)
+        sheet = openpyxl.load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+    def test_one_row_per_item(self):
+        header, *rows = self.csv_rows()
+        self.assertEqual(header, ORDER_HEADERS)
+        self.assertEqual(
+            [(row[0], row[2], row[7], row[8], row[10]) for row in rows],
+            [
+                (str(self.delivered.id), 'Siap Diambil', 'Martabak 0', '1', '30000.00'),
+                (str(self.delivered.id), 'Siap Diambil', 'Martabak 1', '2', '60000.00'),
+                (str(self.pending.id), 'Pesanan Dibuat', 'Martabak 0', '3', '90000.00'),
+            ],
+        )
+
+    def test_status_and_date_filters(self):
+        ids = lambda query: {row[0] for row in self.csv_rows(query)[1:]}
+        self.assertEqual(ids('&status=pending'), {str(self.pending.id)})
+        self.assertEqual(ids(f'&date_from={self.today.isoformat()}'), {str(self.delivered.id)})
+        two_days_ago = (self.today - timedelta(days=2)).isoformat()
+        self.assertEqual(ids(f'&date_to={two_days_ago}'), {str(self.pending.id)})
+        self.assertEqual(ids(f'&status=delivered&date_to={two_days_ago}'), set())
+
+    def test_csv_and_xlsx_match(self):
+        def cell(value):
+            # CSV has only text, the workbook keeps numbers as numbers
+            if value in (None, ''):
+                return ''
+            try:
+                return Decimal(str(value))
+            except InvalidOperation:
+                return str(value)
+
+        for query in ('', '&status=delivered'):
+            csv_rows = [[cell(value) for value in row] for row in self.csv_rows(query)]
+            xlsx_rows = [[cell(value) for value in row] for row in self.xlsx_rows(query)]
+            self.assertEqual(csv_rows, xlsx_rows)
+
+    def test_constant_queries_per_chunk(self):
+        def queries(orders):
+            with CaptureQueriesContext(connection) as captured:
+                rows = list(order_rows(Order.objects.all()))
+            self.assertEqual(len(rows), orders)
+            return len(captured)
+
+        with mock.patch('dashboard.exports.EXPORT_CHUNK_SIZE', 2):
+            # One query streams the orders, then one items query per chunk
+            for _ in range(2):
+                self.create_order('processing')
+            self.assertEqual(queries(4 + 1), 1 + 2)
+            for _ in range(4):
+                self.create_order('processing')
+            self.assertEqual(queries(8 + 1), 1 + 4)
+
+
+class CustomerExportTests(TestCase):
+    """The customer export writes every customer, in one query at any size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('penjual', 'penjual@example.com', 'secret')
+        UserProfile.objects.create(user=cls.seller, is_seller=True)
+
+    def setUp(self):
+        self.client.force_login(self.seller)
+
+    def add_customers(self, count):
+        start = UserProfile.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(f'pelanggan{i}', f'pelanggan{i}@example.com', 'secret', first_name='Budi')
+            UserProfile.objects.create(user=user, phone=f'0812{i:04d}', address='Jl. Pandan Wangi')
+
+    def export(self):
+        """Return (worksheet rows, number of queries)"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('export_customers'))
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+        sheet = openpyxl.load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        return [list(row) for row in sheet.iter_rows(values_only=True)], len(queries)
+
+    def test_xlsx_header_and_rows(self):
+        self.add_customers(3)
+        (header, *rows), _ = self.export()
+        self.assertEqual(list(header), CUSTOMER_HEADERS)
+        customers = User.objects.filter(profile__is_seller=False).order_by('id')
+        self.assertEqual(
+            [row[:7] for row in rows],
+            [
+                [user.id, user.username, user.email, 'Budi', None, user.profile.phone, 'Jl. Pandan Wangi']
+                for user in customers
+            ],
+        )
+        self.assertEqual(rows[0][7], customers[0].date_joined.strftime('%Y-%m-%d %H:%M:%S'))
+
+    def test_constant_queries_across_chunks(self):
+        counts = []
+        with mock.patch('dashboard.exports.EXPORT_CHUNK_SIZE', 2):
+            for count in (3, 6):
+                self.add_customers(count)
+                rows, queries = self.export()
+                self.assertEqual(len(rows), UserProfile.objects.filter(is_seller=False).count() + 1)
+                counts.append(queries)
+        self.assertEqual(counts[0], counts[1])
+
+
+class ProductImportTests(TestCase):
+    """Products are created or updated from a CSV/XLSX file, matched by slug"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('penjual', 'penjual@example.com', 'secret')
+        UserProfile.objects.create(user=cls.seller, is_seller=True)
+        cls.category = Category.objects.create(name='Martabak Manis')
+        cls.existing = Product.objects.create(
+            name='Martabak Coklat', description='Manis', price=30000, stock=5, category=cls.category,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.seller)
+
+    def upload(self, content, name='products.csv', **data):
+        data['file'] = SimpleUploadedFile(name, content)
+        return self.client.post(reverse('import_products'), data, HTTP_ACCEPT='application/json')
+
+    def test_csv_creates_updates_and_reports_each_row(self):
+        content = (
+            'slug,name,category,description,price,stock\n'
+            ',Martabak Keju,Martabak Manis,Keju parut,35000,10\n'
+            'martabak-coklat,,,,32000,\n'
+            'martabak-coklat,,,,33000,\n'
+            ',Martabak Kacang,Martabak Telur,Kacang,25000,3\n'
+            ',Martabak Susu,martabak-manis,Susu,abc,-1\n'
+            'martabak-baru,,,,20000,1\n'
+            ',Martabak Jumbo,Martabak Manis,Besar,50000,99999999999999999999\n'
+        ).encode()
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['counts'], {'created': 1, 'updated': 1, 'unchanged': 0, 'error': 5})
+        self.assertEqual(
+            [(entry['row'], entry['result']) for entry in report['results']],
+            [(2, 'created'), (3, 'updated'), (4, 'error'), (5, 'error'), (6, 'error'), (7, 'error'), (8, 'error')],
+        )
+        self.assertEqual(report['results'][6]['messages'], ['Stock "99999999999999999999" is out of range'])
+        self.assertEqual(len(report['results'][4]['messages']), 2)
+
+        created = Product.objects.get(slug='martabak-keju')
+        self.assertEqual((created.category, created.stock), (self.category, 10))
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.price, self.existing.stock), (32000, 5))
+        self.assertEqual(search_product_ids('keju'), [created.pk])
+
+    def test_imported_products_render_without_an_image(self):
+        cache.clear()
+        self.upload(b'name,category,description,price,stock\nMartabak Tanpa Foto,Martabak Manis,Polos,20000,4\n')
+        product = Product.objects.get(slug='martabak-tanpa-foto')
+        self.assertFalse(product.image)
+
+        for url in (
+            reverse('product_list'),
+            reverse('product_detail', args=[product.slug]),
+            reverse('home'),
+            reverse('dashboard_products'),
+            reverse('edit_product', args=[product.id]),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+        self.assertContains(self.client.get(reverse('product_list')), 'Martabak Tanpa Foto')
+
+    def test_xlsx_in_chunks_with_new_categories(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(['Name', 'Category', 'Description', 'Price', 'Stock'])
+        for i in range(7):
+            sheet.append([f'Martabak Telur {i}', 'Martabak Telur', 'Telur bebek', 40000 + i, i])
+        buffer = BytesIO()
+        workbook.save(buffer)
+
+        with CaptureQueriesContext(connection) as queries:
+            report = import_products(
+                BytesIO(buffer.getvalue()), 'products.xlsx', create_categories=True, chunk_size=3,
+            )
+        self.assertEqual(report['counts']['created'], 7)
+        self.assertEqual(report['categories_created'], 1)
+        telur = Category.objects.get(slug='martabak-telur')
+        self.assertEqual(telur.products.count(), 7)
+        # One INSERT per chunk of 3 rows
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "products_product"')]
+        self.assertEqual(len(inserts), 3)
+
+    def test_dry_run_and_unreadable_files(self):
+        content = b'name,category,description,price,stock\nMartabak Pandan,Baru,Pandan,30000,2\n'
+        report = self.upload(content, create_categories='1', dry_run='1').json()
+        self.assertEqual(report['counts']['created'], 1)
+        self.assertEqual(report['categories_created'], 1)
+        self.assertFalse(Product.objects.filter(slug='martabak-pandan').exists())
+        self.assertFalse(Category.objects.filter(name='Baru').exists())
+
+        self.assertEqual(self.upload(content, name='products.txt').status_code, 400)
+        self.assertEqual(self.upload(b'not a zip', name='products.xlsx').status_code, 400)
+        self.assertEqual(self.upload(b'price,stock\n1,2\n').status_code, 400)
 
-# Create your tests here.
+        response = self.client.post(reverse('import_products'), {
+            'file': SimpleUploadedFile('products.csv', content), 'create_categories': '1',
+        })
+        self.assertContains(response, '1 created')
+        self.assertTrue(Product.objects.filter(slug='martabak-pandan', category__name='Baru').exists())
@@ -4,13 +4,18 @@ from . import views
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('orders/', views.order_list, name='dashboard_orders'),
+    path('orders/export/', views.export_orders, name='export_orders'),
     path('orders/<int:order_id>/', views.order_detail, name='dashboard_order_detail'),
+    path('orders/update-status/', views.bulk_update_order_status, name='bulk_update_order_status'),
     path('orders/update-status/<int:order_id>/', views.update_order_status, name='update_order_status'),
     path('products/', views.product_list, name='dashboard_products'),
     path('products/add/', views.add_product, name='add_product'),
+    path('products/import/', views.import_products, name='import_products'),
     path('products/edit/<int:product_id>/', views.edit_product, name='edit_product'),
     path('products/delete/<int:product_id>/', views.delete_product, name='delete_product'),
     path('customers/', views.customer_list, name='customer_list'),
     path('customers/export/', views.export_customers, name='export_customers'),
     path('sales/', views.sales_data, name='sales_data'),
+    path('performance/', views.performance, name='dashboard_performance'),
+    path('performance.json', views.performance_json, name='dashboard_performance_json'),
 ]
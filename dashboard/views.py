@@ -1,88 +1,55 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from django.http import HttpResponse, JsonResponse
 from django.contrib import messages
 from django.db.models import Sum, Count
 from django.utils import timezone
+from django.conf import settings
 from products.models import Product, Category
 from orders.models import Order, OrderItem
+from orders.status import bulk_update_status
 from core.models import UserProfile
-from core.email_utils import send_order_status_update_email, send_order_shipped_email, send_order_delivered_email
-from .models import SalesData
-import openpyxl
-from openpyxl.styles import Font
+from core.decorators import seller_required
+from core.replicas import read_from_replica
+from core.metrics import get_metrics
+from core.email_utils import queue_order_email, status_email_kind
+from core.date_utils import start_of_day
+from core.pagination import keyset_paginate
+from .models import ProductSalesData, SalesData
+from .kpis import get_dashboard_kpis
+from .imports import IMPORT_COLUMNS, ImportFileError, import_products as run_product_import
+from .exports import (
+    CUSTOMER_HEADERS, ORDER_HEADERS, csv_response, customer_rows, order_rows,
+    xlsx_response,
+)
 from datetime import datetime, timedelta
 import csv
 import io
 
-@login_required
+@seller_required
 def dashboard(request):
     """Main dashboard view for sellers"""
-    # Check if user is a seller
-    if not request.user.profile.is_seller:
-        messages.error(request, "You don't have permission to access the dashboard")
-        return redirect('home')
-    
-    # Get dashboard statistics
-    total_orders = Order.objects.count()
-    total_products = Product.objects.count()
-    total_customers = UserProfile.objects.filter(is_seller=False).count()
-    total_sales = Order.objects.filter(status='delivered').aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    
-    # Get recent orders
-    recent_orders = Order.objects.order_by('-created_at')[:5]
-    
-    # Get sales data for chart
-    today = timezone.now().date()
-    last_week = today - timedelta(days=7)
-    
-    # Create or update sales data
-    update_sales_data()
-    
-    # Get sales data for the last 7 days
-    sales_data = SalesData.objects.filter(date__gte=last_week).order_by('date')
-    
-    context = {
-        'total_orders': total_orders,
-        'total_products': total_products,
-        'total_customers': total_customers,
-        'total_sales': total_sales,
-        'recent_orders': recent_orders,
-        'sales_data': sales_data,
-    }
+    # Get dashboard statistics, recent orders and the last 7 days of sales
+    # data (cached, see dashboard.kpis)
+    context = get_dashboard_kpis()
     
     return render(request, 'dashboard/dashboard.html', context)
 
-def update_sales_data():
-    """Update sales data for reporting"""
-    today = timezone.now().date()
-    
-    # Check if today's data already exists
-    if not SalesData.objects.filter(date=today).exists():
-        # Get today's orders
-        today_orders = Order.objects.filter(created_at__date=today)
-        total_sales = today_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        total_orders = today_orders.count()
-        
-        # Create sales data record
-        SalesData.objects.create(
-            date=today,
-            total_sales=total_sales,
-            total_orders=total_orders
-        )
-
-@login_required
-def order_list(request):
-    """View for listing all orders"""
-    # Check if user is a seller
-    if not request.user.profile.is_seller:
-        messages.error(request, "You don't have permission to access the dashboard")
-        return redirect('home')
+def filter_orders(params):
+    """
+    Apply the order list's status/date_from/date_to filters
+    
+    Args:
+        params: request.GET of the order list or the orders export
     
+    Returns:
+        (orders queryset, status, date_from, date_to)
+    """
     # Get filter parameters
-    status = request.GET.get('status')
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
+    status = params.get('status')
+    date_from = params.get('date_from')
+    date_to = params.get('date_to')
     
     # Filter orders
     orders = Order.objects.all()
@@ -93,22 +60,35 @@ def order_list(request):
     if date_from:
         try:
             date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
-            orders = orders.filter(created_at__date__gte=date_from)
+            orders = orders.filter(created_at__gte=start_of_day(date_from))
         except ValueError:
             pass
     
     if date_to:
         try:
             date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
-            orders = orders.filter(created_at__date__lte=date_to)
+            orders = orders.filter(created_at__lt=start_of_day(date_to + timedelta(days=1)))
         except ValueError:
             pass
     
-    # Order by created_at (newest first)
-    orders = orders.order_by('-created_at')
+    return orders, status, date_from, date_to
+
+@seller_required
+@read_from_replica
+def order_list(request):
+    """View for listing all orders"""
+    orders, status, date_from, date_to = filter_orders(request.GET)
+    
+    # Newest first, one page at a time
+    orders = keyset_paginate(orders, request.GET.get('cursor'))
+    
+    # Keep the filters on the next/previous page links
+    query_params = request.GET.copy()
+    query_params.pop('cursor', None)
     
     context = {
         'orders': orders,
+        'query_string': query_params.urlencode(),
         'status_choices': Order.STATUS_CHOICES,
         'selected_status': status,
         'date_from': date_from,
@@ -117,14 +97,22 @@ def order_list(request):
     
     return render(request, 'dashboard/order_list.html', context)
 
-@login_required
+@seller_required
+@read_from_replica
+def export_orders(request):
+    """View for exporting the filtered orders with their items to Excel or CSV"""
+    orders = filter_orders(request.GET)[0]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    # Orders are streamed in chunks with one items prefetch per chunk
+    if request.GET.get('format') == 'csv':
+        return csv_response(f'orders_{timestamp}.csv', ORDER_HEADERS, order_rows(orders))
+    
+    return xlsx_response(f'orders_{timestamp}.xlsx', 'Orders', ORDER_HEADERS, order_rows(orders))
+
+@seller_required
 def order_detail(request, order_id):
     """View for displaying order details"""
-    # Check if user is a seller
-    if not request.user.profile.is_seller:
-        messages.error(request, "You don't have permission to access the dashboard")
-        return redirect('home')
-    
     order = get_object_or_404(Order, id=order_id)
     
     context = {
@@ -135,14 +123,9 @@ def order_detail(request, order_id):
     
     return render(request, 'dashboard/order_detail.html', context)
 
-@login_required
+@seller_required
 def update_order_status(request, order_id):
     """View for updating order status"""
-    # Check if user is a seller
-    if not request.user.profile.is_seller:
-        messages.error(request, "You don't have permission to access the dashboard")
-        return redirect('home')
-    
     if request.method == 'POST':
         order = get_object_or_404(Order, id=order_id)
         old_status = order.status
@@ -152,19 +135,9 @@ def update_order_status(request, order_id):
             order.status = status
             order.save()
             
-            # Send email notification based on new status
-            try:
-                if status == 'processing':
-                    send_order_status_update_email(order)
-                elif status == 'shipped':
-                    send_order_shipped_email(order)
-                elif status == 'delivered':
-                    send_order_delivered_email(order)
-                elif status != old_status:  # For other status changes
-                    send_order_status_update_email(order)
-            except Exception as e:
-                # Log the error but don't stop the process
-                print(f"Error sending email: {e}")
+            # Queue email notification based on new status
+            if status in ('processing', 'shipped', 'delivered') or status != old_status:
+                queue_order_email(order, status_email_kind(status))
             
             messages.success(request, f"Order #{order.id} status updated to {order.get_status_display()}")
         else:
@@ -172,14 +145,58 @@ def update_order_status(request, order_id):
     
     return redirect('dashboard_order_detail', order_id=order_id)
 
-@login_required
+@seller_required
+@require_POST
+def bulk_update_order_status(request):
+    """
+    Move the selected orders, or every order matching the order list's
+    filters (passed in the query string), to a new status at once
+    
+    Answers with JSON per-order results when asked for JSON, otherwise
+    goes back to the order list with a summary.
+    """
+    status = request.POST.get('new_status')
+    back = f"{reverse('dashboard_orders')}?{request.GET.urlencode()}"
+    wants_json = 'application/json' in request.headers.get('Accept', '')
+    
+    if request.POST.get('apply_to') == 'filtered':
+        orders, order_ids = filter_orders(request.GET)[0], None
+    else:
+        order_ids = [int(order_id) for order_id in request.POST.getlist('order_ids') if order_id.isdigit()]
+        orders = Order.objects.filter(id__in=order_ids)
+    
+    error = None
+    if status not in dict(Order.STATUS_CHOICES):
+        error = 'Invalid status'
+    elif order_ids == []:
+        error = 'No orders selected'
+    if error:
+        if wants_json:
+            return JsonResponse({'status': 'error', 'message': error}, status=400)
+        messages.error(request, error)
+        return redirect(back)
+    
+    results = bulk_update_status(orders, status, order_ids)
+    counts = dict.fromkeys(('updated', 'unchanged', 'invalid', 'not_found'), 0)
+    for result in results:
+        counts[result['result']] += 1
+    
+    if wants_json:
+        return JsonResponse({'status': 'success', 'counts': counts, 'results': results})
+    
+    summary = f"{counts['updated']} order(s) updated to {dict(Order.STATUS_CHOICES)[status]}"
+    if counts['unchanged']:
+        summary += f", {counts['unchanged']} already were"
+    messages.success(request, summary)
+    problems = [result['message'] for result in results if result['result'] in ('invalid', 'not_found')]
+    if problems:
+        more = f' and {len(problems) - 10} more' if len(problems) > 10 else ''
+        messages.warning(request, '; '.join(problems[:10]) + more)
+    return redirect(back)
+
+@seller_required
 def product_list(request):
     """View for listing all products"""
-    # Check if user is a seller
-    if not request.user.profile.is_seller:
-        messages.error(request, "You don't have permission to access the dashboard")
-        return redirect('home')
-    
     # Get filter parameters
     category_id = request.GET.get('category')
     stock_status = request.GET.get('stock_status')
@@ -212,14 +229,9 @@ def product_list(request):
     
     return render(request, 'dashboard/product_list.html', context)
 
-@login_required
+@seller_required
 def add_product(request):
     """View for adding a new product"""
-    # Check if user is a seller
-    if not request.user.profile.is_seller:
-        messages.error(request, "You don't have permission to access the dashboard")
-        return redirect('home')
-    
     # Get all categories
     categories = Category.objects.all()
     
@@ -264,14 +276,45 @@ def add_product(request):
     
     return render(request, 'dashboard/add_product.html', {'categories': categories})
 
-@login_required
+@seller_required
+def import_products(request):
+    """
+    Create or update products in bulk from an uploaded CSV or XLSX file
+    
+    Rows are matched to products by slug. Answers with the JSON report when
+    asked for JSON, otherwise shows it under the upload form.
+    """
+    context = {'columns': IMPORT_COLUMNS}
+    
+    if request.method == 'POST':
+        wants_json = 'application/json' in request.headers.get('Accept', '')
+        upload = request.FILES.get('file')
+        
+        try:
+            if upload is None:
+                raise ImportFileError('Choose a file to import')
+            report = run_product_import(
+                upload,
+                upload.name,
+                create_categories=bool(request.POST.get('create_categories')),
+                dry_run=bool(request.POST.get('dry_run')),
+            )
+        except ImportFileError as e:
+            if wants_json:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            messages.error(request, str(e))
+            return render(request, 'dashboard/import_products.html', context)
+        
+        report['dry_run'] = bool(request.POST.get('dry_run'))
+        if wants_json:
+            return JsonResponse({'status': 'success', **report})
+        context['report'] = report
+    
+    return render(request, 'dashboard/import_products.html', context)
+
+@seller_required
 def edit_product(request, product_id):
     """View for editing a product"""
-    # Check if user is a seller
-    if not request.user.profile.is_seller:
-        messages.error(request, "You don't have permission to access the dashboard")
-        return redirect('home')
-    
     product = get_object_or_404(Product, id=product_id)
     categories = Category.objects.all()
     
@@ -314,14 +357,9 @@ def edit_product(request, product_id):
     
     return render(request, 'dashboard/edit_product.html', {'product': product, 'categories': categories})
 
-@login_required
+@seller_required
 def delete_product(request, product_id):
     """View for deleting a product"""
-    # Check if user is a seller
-    if not request.user.profile.is_seller:
-        messages.error(request, "You don't have permission to access the dashboard")
-        return redirect('home')
-    
     product = get_object_or_404(Product, id=product_id)
     
     if request.method == 'POST':
@@ -332,75 +370,36 @@ def delete_product(request, product_id):
     
     return render(request, 'dashboard/delete_product.html', {'product': product})
 
-@login_required
+@seller_required
+@read_from_replica
 def customer_list(request):
     """View for listing all customers"""
-    # Check if user is a seller
-    if not request.user.profile.is_seller:
-        messages.error(request, "You don't have permission to access the dashboard")
-        return redirect('home')
-    
     # Get all customers (users with is_seller=False)
     customers = UserProfile.objects.filter(is_seller=False).select_related('user')
     
     return render(request, 'dashboard/customer_list.html', {'customers': customers})
 
-@login_required
+@seller_required
+@read_from_replica
 def export_customers(request):
-    """View for exporting customer data to Excel"""
-    # Check if user is a seller
-    if not request.user.profile.is_seller:
-        messages.error(request, "You don't have permission to access the dashboard")
-        return redirect('home')
+    """View for exporting customer data to Excel or CSV"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    # Get all customers
-    customers = UserProfile.objects.filter(is_seller=False).select_related('user')
+    # Rows are streamed from the database in chunks for both formats
+    if request.GET.get('format') == 'csv':
+        return csv_response(f'customers_{timestamp}.csv', CUSTOMER_HEADERS, customer_rows())
     
-    # Create a new workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Customers"
-    
-    # Add headers
-    headers = ['ID', 'Username', 'Email', 'First Name', 'Last Name', 'Phone', 'Address', 'Date Joined']
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.value = header
-        cell.font = Font(bold=True)
-    
-    # Add customer data
-    for row_num, profile in enumerate(customers, 2):
-        user = profile.user
-        ws.cell(row=row_num, column=1).value = user.id
-        ws.cell(row=row_num, column=2).value = user.username
-        ws.cell(row=row_num, column=3).value = user.email
-        ws.cell(row=row_num, column=4).value = user.first_name
-        ws.cell(row=row_num, column=5).value = user.last_name
-        ws.cell(row=row_num, column=6).value = profile.phone
-        ws.cell(row=row_num, column=7).value = profile.address
-        ws.cell(row=row_num, column=8).value = user.date_joined.strftime('%Y-%m-%d %H:%M:%S')
-    
-    # Create response
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename=customers_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    # Save the workbook to the response
-    wb.save(response)
-    return response
+    return xlsx_response(f'customers_{timestamp}.xlsx', 'Customers', CUSTOMER_HEADERS, customer_rows())
 
-@login_required
+@seller_required
+@read_from_replica
 def sales_data(request):
     """View for displaying sales data"""
-    # Check if user is a seller
-    if not request.user.profile.is_seller:
-        messages.error(request, "You don't have permission to access the dashboard")
-        return redirect('home')
-    
     # Get date range parameters
     period = request.GET.get('period', 'week')
     
     # Calculate date range based on period
-    today = timezone.now().date()
+    today = timezone.localdate()
     
     if period == 'week':
         start_date = today - timedelta(days=7)
@@ -422,23 +421,46 @@ def sales_data(request):
     total_sales = sales_data.aggregate(Sum('total_sales'))['total_sales__sum'] or 0
     total_orders = sales_data.aggregate(Sum('total_orders'))['total_orders__sum'] or 0
     
-    # Get top selling products
-    top_products = OrderItem.objects.filter(
-        order__created_at__date__gte=start_date
-    ).values(
-        'product__name'
+    # Get top selling products and sales per category from the per-product
+    # daily rollup (kept up to date by dashboard.rollups)
+    product_sales = ProductSalesData.objects.filter(date__gte=start_date)
+    top_products = product_sales.values(
+        'product_id', 'product__name'
     ).annotate(
-        total_quantity=Sum('quantity'),
-        total_sales=Sum('price')
+        total_quantity=Sum('units'),
+        total_sales=Sum('revenue')
     ).order_by('-total_quantity')[:5]
+    category_sales = product_sales.values(
+        'product__category__name'
+    ).annotate(
+        total_quantity=Sum('units'),
+        total_sales=Sum('revenue')
+    ).order_by('-total_sales')
     
     context = {
         'sales_data': sales_data,
         'total_sales': total_sales,
         'total_orders': total_orders,
         'top_products': top_products,
+        'category_sales': category_sales,
         'period': period,
         'title': title,
     }
     
     return render(request, 'dashboard/sales_data.html', context)
+
+@seller_required
+def performance(request):
+    """View for the per-view request metrics recorded by QueryMetricsMiddleware"""
+    return render(request, 'dashboard/performance.html', {
+        'metrics': get_metrics(),
+        'enabled': getattr(settings, 'REQUEST_METRICS', False),
+    })
+
+@seller_required
+def performance_json(request):
+    """The per-view request metrics as JSON"""
+    return JsonResponse({
+        'enabled': getattr(settings, 'REQUEST_METRICS', False),
+        'views': get_metrics(),
+    })
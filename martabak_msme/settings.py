@@ -40,6 +40,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.QueryMetricsMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'martabak_msme.urls'
@@ -55,6 +57,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.site_settings',
             ],
         },
     },
@@ -63,13 +66,61 @@ TEMPLATES = [
 WSGI_APPLICATION = 'martabak_msme.wsgi.application'
 
 # Database
+
+# Run on every new SQLite connection. WAL lets readers (the dashboard, the
+# storefront) carry on while a checkout writes; synchronous=NORMAL is
+# durable in WAL mode except for the last commits on power loss
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,  # in KiB, per connection
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Keep connections (and their page cache) between requests
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            # Seconds a write waits for the lock instead of failing with
+            # "database is locked"
+            'timeout': 20,
+            # Transactions take the write lock when they begin, so one that
+            # reads before writing (like checkout) waits its turn instead of
+            # failing when it tries to upgrade its lock
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Local stand-in for a read replica: a copy of db.sqlite3 that
+    # `manage.py refresh_replica --interval 60` keeps replacing. Until the
+    # first refresh (or once it is older than DATABASE_REPLICA_MAX_STALENESS)
+    # everything reads from default
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        # A new connection per request picks up the latest copy
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'init_command': 'PRAGMA query_only=1;PRAGMA mmap_size=134217728;PRAGMA cache_size=-20000',
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Dashboard reports (see core.replicas.read_from_replica) read from this
+# alias; set to None to read everything from default
+DATABASE_REPLICA = 'replica'
+# Seconds the replica may lag behind and still be read from, which is also
+# how long users who just wrote keep reading from default
+DATABASE_REPLICA_MAX_STALENESS = 2 * 60
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -98,6 +149,27 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic resizes and recompresses images (with WebP copies), writes
+# content-hashed names with a manifest and gzips CSS/JS; see core.storage
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.storage.OptimizedStaticFilesStorage',
+    },
+}
+STATIC_IMAGE_MAX_WIDTH = 1600
+STATIC_IMAGE_WIDTHS = {
+    # Shown at most 150px high (225px wide), so 2x for high-DPI screens
+    'images/logo.png': 450,
+}
+
+# Serve the collected STATIC_ROOT from Django when DEBUG is off (with the
+# precompressed .gz copies and far-future caching for hashed names); turn
+# off when a web server in front serves /static/ itself
+SERVE_STATIC = True
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -111,8 +183,60 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 # Authentication
 LOGIN_URL = 'login'
+
+# ProfileBackend loads request.user and its profile in one joined query. It
+# is a ModelBackend, so listing ModelBackend too would only check a wrong
+# password a second time. Sessions started while ModelBackend was listed
+# name it as their backend and are logged out once when this is deployed;
+# that is intended, their users just sign in again.
+AUTHENTICATION_BACKENDS = [
+    'core.backends.ProfileBackend',
+]
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 
 # Email settings (for development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Email outbox (see core.email_utils and the send_queued_emails command)
+EMAIL_RETRY_BACKOFF = 60  # seconds before the first retry, doubled per attempt
+EMAIL_MAX_ATTEMPTS = 5
+EMAIL_CLAIM_TIMEOUT = 300  # seconds before emails claimed by a crashed worker are retried
+
+# Checkout stock reservations (see orders.checkout); run the
+# release_expired_reservations command from cron to sweep expired holds
+STOCK_RESERVATION_TTL = 15 * 60  # seconds
+
+# Cache. LocMemCache is private to each process, so the invalidation done
+# on writes (dashboard KPIs, catalogue and page versions, site settings) only
+# reaches the process that made the write; other processes serve what they
+# cached until it times out. Run a single worker process with it, or switch
+# to a shared backend such as Redis or Memcached before running several.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'martabak-msme',
+    }
+}
+
+# Seconds the cached dashboard KPIs may be served before being recomputed
+DASHBOARD_CACHE_TIMEOUT = 60
+
+# Seconds a cached storefront listing or product page may be kept; saving a
+# Product or Category invalidates them straight away (see products.catalog)
+CATALOG_CACHE_TIMEOUT = 15 * 60
+
+# Seconds the home, about and contact pages may be served from the cache to
+# anonymous visitors; saving Settings or a product invalidates them
+PAGE_CACHE_TIMEOUT = 10 * 60
+
+# Product images are resized to these widths (JPEG and WebP) next to the
+# upload, on this many background threads per process; see products.images
+# and the regenerate_image_variants command
+PRODUCT_IMAGE_VARIANT_WIDTHS = {'thumb': 400, 'detail': 1000}
+PRODUCT_IMAGE_WORKERS = 2
+
+# Per-view latency / SQL query metrics with N+1 detection, shown on the
+# dashboard's Performance page (see core.middleware.QueryMetricsMiddleware)
+REQUEST_METRICS = False
+REQUEST_METRICS_N_PLUS_ONE_THRESHOLD = 5
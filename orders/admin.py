@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from dashboard.rollups import order_day, rebuild_sales_data
+from .models import Order, OrderItem, StockReservation
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -7,7 +8,31 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'full_name', 'total_amount', 'status', 'created_at')
+    list_display = ('id', 'customer_name', 'full_name', 'item_count', 'total_amount', 'status', 'created_at')
     list_filter = ('status', 'created_at')
     search_fields = ('full_name', 'email', 'phone')
     inlines = [OrderItemInline]
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Items saved through the inline (and total_amount edits) don't go
+        # through the dashboard rollup signals, so the order's day is
+        # recomputed from its orders instead
+        day = order_day(form.instance)
+        rebuild_sales_data(day, day)
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('product', 'user', 'quantity', 'expires_at')
+    list_select_related = ('product', 'user')
+    
+    # Holds are only written through orders.checkout, which keeps
+    # Product.reserved in step with them
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
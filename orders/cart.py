@@ -0,0 +1,164 @@
+# orders/cart.py
+from decimal import Decimal
+
+from products.models import Product
+
+CART_SESSION_KEY = 'cart'
+
+
+class Cart:
+    """
+    Server-side shopping cart stored in the session
+
+    Each line keeps a snapshot of the product name, price and available
+    stock (stock not held by checkout reservations) taken when it was last
+    added or validated, so price and stock drift can be reported before
+    checkout instead of at it.
+    """
+
+    def __init__(self, request):
+        self.session = request.session
+        self.lines = self.session.get(CART_SESSION_KEY)
+        if self.lines is None:
+            self.lines = self.session[CART_SESSION_KEY] = {}
+
+    @classmethod
+    async def aload(cls, request):
+        """Cart(request) for async views, loading the session without blocking"""
+        await request.session.aget(CART_SESSION_KEY)
+        return cls(request)
+
+    def __len__(self):
+        return sum(line['quantity'] for line in self.lines.values())
+
+    def __iter__(self):
+        for product_id, line in self.lines.items():
+            yield {
+                'id': int(product_id),
+                'name': line['name'],
+                'price': Decimal(line['price']),
+                'stock': line['stock'],
+                'quantity': line['quantity'],
+                'subtotal': Decimal(line['price']) * line['quantity'],
+            }
+
+    def save(self):
+        self.session.modified = True
+
+    def _snapshot(self, product, quantity):
+        self.lines[str(product.id)] = {
+            'name': product.name,
+            'price': str(product.price),
+            'stock': product.get_available_stock(),
+            'quantity': quantity,
+        }
+
+    def add(self, product, quantity=1, override_quantity=False):
+        """Add a product to the cart or change its quantity"""
+        line = self.lines.get(str(product.id))
+        if line and not override_quantity:
+            quantity += line['quantity']
+        self._snapshot(product, quantity)
+        self.save()
+
+    def remove(self, product_id):
+        if self.lines.pop(str(product_id), None) is not None:
+            self.save()
+
+    def clear(self):
+        self.lines.clear()
+        self.save()
+
+    def replace(self, quantities):
+        """
+        Replace the cart contents with {product_id: quantity} sent by the client
+
+        Snapshots are kept for products already in the cart and filled in
+        by the next validate() call for new ones.
+        """
+        lines = {}
+        for product_id, quantity in quantities.items():
+            line = self.lines.get(str(product_id)) or {
+                'name': '', 'price': '0', 'stock': 0,
+            }
+            lines[str(product_id)] = {**line, 'quantity': quantity}
+        self.lines.clear()
+        self.lines.update(lines)
+        self.save()
+
+    def validate(self):
+        """
+        Check every line against the database in one query
+
+        Snapshots are refreshed, lines whose product is gone are dropped and
+        quantities above the current stock are lowered to it.
+
+        Returns:
+            list of {'id', 'name', 'problem', 'message'} dicts, empty when the
+            cart can be checked out as is
+        """
+        products = Product.objects.only('id', 'name', 'price', 'stock', 'reserved').in_bulk(
+            [int(product_id) for product_id in self.lines]
+        )
+
+        issues = []
+        for product_id, line in list(self.lines.items()):
+            product = products.get(int(product_id))
+            if product is None:
+                issues.append({
+                    'id': int(product_id),
+                    'name': line['name'],
+                    'problem': 'unavailable',
+                    'message': f"{line['name'] or 'A product'} is no longer available",
+                })
+                del self.lines[product_id]
+                continue
+
+            quantity = line['quantity']
+            if line['name'] and Decimal(line['price']) != product.price:
+                issues.append({
+                    'id': product.id,
+                    'name': product.name,
+                    'problem': 'price_changed',
+                    'message': f'The price of {product.name} changed to Rp {product.price}',
+                })
+            available = product.get_available_stock()
+            if available <= 0:
+                issues.append({
+                    'id': product.id,
+                    'name': product.name,
+                    'problem': 'out_of_stock',
+                    'message': f'{product.name} is out of stock',
+                })
+                del self.lines[product_id]
+                continue
+            if quantity > available:
+                issues.append({
+                    'id': product.id,
+                    'name': product.name,
+                    'problem': 'insufficient_stock',
+                    'message': f'Only {available} {product.name} available',
+                })
+                quantity = available
+
+            self._snapshot(product, quantity)
+
+        self.save()
+        return issues
+
+    def get_quantities(self):
+        """Return the cart as {product_id: quantity} for orders.checkout"""
+        return {int(product_id): line['quantity'] for product_id, line in self.lines.items()}
+
+    def get_total(self):
+        return sum((line['subtotal'] for line in self), Decimal('0'))
+
+    def as_json(self):
+        return {
+            'items': [
+                {**line, 'price': str(line['price']), 'subtotal': str(line['subtotal'])}
+                for line in self
+            ],
+            'count': len(self),
+            'total': str(self.get_total()),
+        }
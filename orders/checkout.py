@@ -0,0 +1,227 @@
+# orders/checkout.py
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+from django.utils import timezone
+
+from core.page_cache import invalidate_cached_pages
+from products.catalog import bump_catalog_version
+from products.models import Product
+from .models import Order, OrderItem, StockReservation
+from .signals import order_placed
+
+# How long entering checkout holds the cart's stock, in seconds
+STOCK_RESERVATION_TTL = getattr(settings, 'STOCK_RESERVATION_TTL', 15 * 60)
+
+
+class CheckoutError(Exception):
+    """Raised when a cart cannot be turned into an order"""
+
+
+def normalize_cart(cart_items):
+    """
+    Collapse the cart payload sent by main.js into {product_id: quantity}
+
+    Args:
+        cart_items: dict of {key: {'id': ..., 'quantity': ...}} as stored in the cart cookie
+    """
+    quantities = {}
+    for item_data in cart_items.values():
+        try:
+            product_id = int(item_data['id'])
+            quantity = int(item_data['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise CheckoutError('Your cart contains an invalid item')
+
+        if quantity <= 0:
+            raise CheckoutError('Quantity must be greater than zero')
+
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+    return quantities
+
+
+def _shift_column(column, deltas, condition=None, **extra):
+    """
+    Apply {product_id: delta} to a Product counter column in one UPDATE
+
+    Args:
+        column: 'stock' or 'reserved'
+        deltas: dict of {product_id: amount to add (may be negative)}
+        condition: optional Q every row must still match to be updated
+        extra: other columns to set on the updated rows
+
+    Returns:
+        number of rows updated
+    """
+    if not deltas:
+        return 0
+
+    # Stock and holds decide what the storefront shows as available
+    bump_catalog_version()
+    invalidate_cached_pages()
+
+    return Product.objects.filter(
+        condition if condition is not None else Q(pk__in=list(deltas))
+    ).update(
+        **{column: Case(
+            *[When(pk=product_id, then=F(column) + delta)
+              for product_id, delta in deltas.items()],
+            default=F(column),
+            output_field=PositiveIntegerField(),
+        )},
+        **extra
+    )
+
+
+def _release(reservations):
+    """
+    Give back the units held by a StockReservation queryset, in three queries
+
+    The holds are locked and then deleted by id, so two releases running at
+    once can't both give back the same units.
+    """
+    rows = list(reservations.select_for_update().values_list('id', 'product_id', 'quantity'))
+    held = {}
+    for _, product_id, quantity in rows:
+        held[product_id] = held.get(product_id, 0) + quantity
+    _shift_column('reserved', {product_id: -total for product_id, total in held.items()})
+    if rows:
+        StockReservation.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+    return held
+
+
+def release_reservations(user):
+    """Release every hold the user currently has"""
+    with transaction.atomic():
+        return _release(StockReservation.objects.filter(user=user))
+
+
+def release_expired_reservations(now=None):
+    """
+    Sweep expired holds in bulk
+
+    Returns:
+        dict of {product_id: units released}
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        return _release(StockReservation.objects.filter(expires_at__lte=now))
+
+
+def reserve_stock(user, quantities, ttl=STOCK_RESERVATION_TTL):
+    """
+    Hold the cart's units for the user while they fill in the checkout form
+
+    Any previous holds of the user are replaced, unless they already match
+    the cart, in which case nothing is written (reloading checkout keeps the
+    holds and their expiry). Holds count against the available stock of a
+    product until they are released, swept after expiring or consumed by
+    create_order().
+
+    Args:
+        user: User entering checkout
+        quantities: dict of {product_id: quantity}, see normalize_cart()
+        ttl: seconds the hold lasts
+    """
+    release_expired_reservations()
+
+    with transaction.atomic():
+        holds = list(StockReservation.objects.select_for_update().filter(user=user))
+        if len(holds) == len(quantities) and {hold.product_id: hold.quantity for hold in holds} == quantities:
+            return holds
+
+        _release(StockReservation.objects.filter(user=user))
+
+        if not quantities:
+            return []
+
+        enough = Q()
+        for product_id, quantity in quantities.items():
+            enough |= Q(pk=product_id, stock__gte=F('reserved') + quantity)
+
+        if _shift_column('reserved', quantities, enough) != len(quantities):
+            raise CheckoutError('Some products in your cart are no longer available in that quantity')
+
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        return StockReservation.objects.bulk_create([
+            StockReservation(user=user, product_id=product_id, quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in quantities.items()
+        ])
+
+
+def create_order(user, quantities, **details):
+    """
+    Turn a normalized cart into an Order in one transaction
+
+    The user's own holds are released first, then products are loaded (and
+    locked) in a single query, order lines are written with one bulk INSERT
+    and stock is decremented with one conditional UPDATE, so the query count
+    does not grow with the cart.
+
+    Args:
+        user: User placing the order
+        quantities: dict of {product_id: quantity}, see normalize_cart()
+        details: full_name, email, phone and address for the Order
+    """
+    if not quantities:
+        raise CheckoutError('Your cart is empty')
+
+    with transaction.atomic():
+        _release(StockReservation.objects.filter(user=user))
+
+        products = Product.objects.select_for_update().in_bulk(list(quantities))
+
+        if len(products) != len(quantities):
+            raise CheckoutError('Some products in your cart are no longer available')
+
+        total_amount = Decimal('0')
+        for product_id, quantity in quantities.items():
+            product = products[product_id]
+            if quantity > product.get_available_stock():
+                raise CheckoutError(f'Only {product.get_available_stock()} {product.name} available')
+            total_amount += product.price * quantity
+
+        # bulk_create skips OrderItem.save(), so the summary columns are
+        # filled in here
+        order = Order.objects.create(
+            user=user,
+            total_amount=total_amount,
+            status='pending',
+            item_count=len(quantities),
+            total_quantity=sum(quantities.values()),
+            **details
+        )
+
+        items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=products[product_id],
+                quantity=quantity,
+                price=products[product_id].price,
+            )
+            for product_id, quantity in quantities.items()
+        ])
+
+        # Every row only matches while it still has enough unreserved stock,
+        # so a short row count means someone else bought it first and we roll
+        # back.
+        in_stock = Q()
+        for product_id, quantity in quantities.items():
+            in_stock |= Q(pk=product_id, stock__gte=F('reserved') + quantity)
+
+        updated = _shift_column(
+            'stock',
+            {product_id: -quantity for product_id, quantity in quantities.items()},
+            in_stock,
+            updated_at=timezone.now(),
+        )
+        if updated != len(quantities):
+            raise CheckoutError('Some products in your cart just sold out')
+
+        order_placed.send(sender=Order, order=order, items=items)
+
+    return order
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from orders.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = 'Fill in Order.item_count, total_quantity and customer_name for existing orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of orders to update per query')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # One grouped query for all item summaries
+        summaries = {
+            row['order_id']: row
+            for row in OrderItem.objects.values('order_id').annotate(
+                item_count=Count('id'),
+                total_quantity=Sum('quantity'),
+            ).order_by()
+        }
+
+        updated = 0
+        batch = []
+        orders = Order.objects.only(
+            'id', 'item_count', 'total_quantity', 'customer_name', 'user__username'
+        ).select_related('user').order_by('id')
+
+        for order in orders.iterator(chunk_size=batch_size):
+            summary = summaries.get(order.id, {})
+            order.item_count = summary.get('item_count', 0)
+            order.total_quantity = summary.get('total_quantity') or 0
+            order.customer_name = order.user.username
+            batch.append(order)
+
+            if len(batch) >= batch_size:
+                updated += self.flush(batch)
+
+        updated += self.flush(batch)
+        self.stdout.write(f'Updated {updated} order(s)')
+
+    def flush(self, batch):
+        with transaction.atomic():
+            Order.objects.bulk_update(batch, ['item_count', 'total_quantity', 'customer_name'])
+        count = len(batch)
+        batch.clear()
+        return count
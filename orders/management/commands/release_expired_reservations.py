@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from orders.checkout import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Release checkout stock reservations that have expired'
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations()
+        self.stdout.write(
+            f'Released {sum(released.values())} unit(s) across {len(released)} product(s)'
+        )
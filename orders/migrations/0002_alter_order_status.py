@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pesanan Dibuat'), ('processing', 'Proses Pembuatan'), ('delivered', 'Siap Diambil'), ('cancelled', 'Cancelled')], default='pending', max_length=20),
+        ),
+    ]
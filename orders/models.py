@@ -21,14 +21,51 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Summary columns kept in sync with the order's items so listings
+    # don't need a COUNT or a user lookup per row
+    item_count = models.PositiveIntegerField(default=0)
+    total_quantity = models.PositiveIntegerField(default=0)
+    customer_name = models.CharField(max_length=150, blank=True)
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Newest-first listings, keyset pagination and date ranges
+            models.Index(fields=['created_at', 'id'], name='orders_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='orders_status_created_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='orders_user_created_idx'),
+        ]
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Status as last loaded or saved, so post_save receivers can tell
+        # what a save changed (None when status was deferred)
+        self.original_status = self.__dict__.get('status')
+    
+    def save(self, *args, **kwargs):
+        if not self.customer_name and self.user_id:
+            self.customer_name = self.user.username
+        super().save(*args, **kwargs)
+        self.original_status = self.status
     
     def __str__(self):
-        return f"Order {self.id} - {self.user.username}"
+        return f"Order {self.id} - {self.customer_name}"
     
     def get_total_items(self):
-        return self.items.count()
+        return self.item_count
+    
+    def update_summary(self):
+        """Recompute item_count and total_quantity from the order's items"""
+        summary = self.items.aggregate(
+            item_count=models.Count('id'),
+            total_quantity=models.Sum('quantity'),
+        )
+        self.item_count = summary['item_count']
+        self.total_quantity = summary['total_quantity'] or 0
+        Order.objects.filter(pk=self.pk).update(
+            item_count=self.item_count,
+            total_quantity=self.total_quantity,
+        )
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -39,5 +76,30 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.order.update_summary()
+    
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.order.update_summary()
+        return result
+    
     def get_total(self):
         return self.price * self.quantity
+
+class StockReservation(models.Model):
+    """Units of a product held for a customer while they are in checkout"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='orders_reservation_exp_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} held for {self.user_id}"
@@ -0,0 +1,23 @@
+# orders/signals.py
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_delete
+from django.dispatch import Signal, receiver
+
+# Sent by orders.checkout.create_order() once an order and all its items are
+# written (OrderItem.objects.bulk_create() does not send post_save).
+# Arguments: order, items
+order_placed = Signal()
+
+# Sent by orders.status.bulk_update_status() after one UPDATE moved several
+# orders to a new status (queryset updates do not send post_save).
+# Arguments: orders (with their previous status in original_status), status
+order_statuses_changed = Signal()
+
+
+@receiver(pre_delete, sender=User)
+def release_reservations_on_user_delete(sender, instance, **kwargs):
+    # The CASCADE would delete the holds without giving back
+    # Product.reserved; orders.checkout imports this module
+    from .checkout import release_reservations
+
+    release_reservations(instance)
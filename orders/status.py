@@ -0,0 +1,91 @@
+# orders/status.py
+from django.db import transaction
+from django.utils import timezone
+
+from core.email_utils import queue_order_emails, status_email_kind
+from .models import Order
+from .signals import order_statuses_changed
+
+# Statuses an order can move to from each status. Cancelled orders can be
+# reopened; orders ready for pickup are done.
+STATUS_TRANSITIONS = {
+    'pending': ('processing', 'delivered', 'cancelled'),
+    'processing': ('delivered', 'cancelled'),
+    'delivered': (),
+    'cancelled': ('pending',),
+}
+
+
+def allowed_sources(status):
+    """Return the statuses an order may be moved to status from"""
+    return [source for source, targets in STATUS_TRANSITIONS.items() if status in targets]
+
+
+def bulk_update_status(orders, status, order_ids=None):
+    """
+    Move a set of orders to a new status in one UPDATE
+
+    The transition check is part of the UPDATE's WHERE clause, so orders
+    whose status doesn't allow the move are left alone. Changed orders get
+    their status email queued in one INSERT, and the dashboard rollups are
+    updated through order_statuses_changed, in a constant number of queries
+    overall.
+
+    Args:
+        orders: queryset of the orders to move
+        status: one of Order.STATUS_CHOICES
+        order_ids: ids the seller picked, to report those that don't exist
+
+    Returns:
+        list of {'id', 'result', 'from', 'message'} dicts, one per order,
+        where result is 'updated', 'unchanged', 'invalid' or 'not_found'
+    """
+    labels = dict(Order.STATUS_CHOICES)
+    if status not in labels:
+        raise ValueError(f'Unknown status {status!r}')
+    sources = allowed_sources(status)
+
+    with transaction.atomic():
+        current = list(
+            orders.select_for_update()
+            .only('id', 'status', 'total_amount', 'created_at')
+            .order_by('id')
+        )
+
+        results, changed = [], []
+        for order in current:
+            result = {'id': order.id, 'from': order.status}
+            if order.status == status:
+                result.update(result='unchanged', message=f'Order #{order.id} is already {labels[status]}')
+            elif order.status in sources:
+                result.update(
+                    result='updated',
+                    message=f'Order #{order.id}: {labels[order.status]} → {labels[status]}',
+                )
+                order.status = status
+                changed.append(order)
+            else:
+                result.update(
+                    result='invalid',
+                    message=f'Order #{order.id} cannot go from {labels[order.status]} to {labels[status]}',
+                )
+            results.append(result)
+
+        found = {order.id for order in current}
+        for order_id in sorted(set(order_ids or ()) - found):
+            results.append({
+                'id': order_id, 'from': None, 'result': 'not_found',
+                'message': f'Order #{order_id} does not exist',
+            })
+
+        if changed:
+            # Only the locked orders reported above change; running the
+            # caller's queryset again could pick up orders that started
+            # matching it since
+            Order.objects.filter(id__in=[order.id for order in changed], status__in=sources).update(
+                status=status, updated_at=timezone.now(),
+            )
+            queue_order_emails(changed, status_email_kind(status))
+            order_statuses_changed.send(sender=Order, orders=changed, status=status)
+
+    return results
@@ -1,3 +1,429 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from urllib.parse import quote
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import OutgoingEmail, UserProfile
+from core.testing import QueryPlanTestMixin
+from products.models import Category, Product
+from .cart import Cart
+from .checkout import (
+    CheckoutError, create_order, release_expired_reservations, release_reservations,
+    reserve_stock,
+)
+from .models import Order, OrderItem, StockReservation
+
+
+class OrderQueryPlanTests(QueryPlanTestMixin, TestCase):
+    """The customer order queries in orders/views.py must use an index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        UserProfile.objects.create(user=cls.user)
+        cls.orders = Order.objects.bulk_create([
+            Order(
+                user=cls.user,
+                full_name='Budi',
+                email='budi@example.com',
+                phone='08123456789',
+                address='Jl. Pandan Wangi',
+                total_amount=35000,
+            )
+            for _ in range(30)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_my_orders(self):
+        self.assertViewNoFullTableScan(self.client, reverse('my_orders'))
+
+    def test_my_orders_next_page(self):
+        response = self.client.get(reverse('my_orders'))
+        cursor = response.context['orders'].next_cursor
+        self.assertViewNoFullTableScan(self.client, reverse('my_orders') + f'?cursor={cursor}')
+
+    def test_track_order(self):
+        url = reverse('track_order', args=[self.orders[0].id])
+        self.assertViewNoFullTableScan(self.client, url)
+
+
+class AsyncCartTests(TestCase):
+    """The cart AJAX views run natively under ASGI"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(
+            name='Martabak Coklat Keju',
+            description='Coklat dan keju',
+            price=35000,
+            stock=3,
+            category=Category.objects.create(name='Martabak Manis'),
+        )
+
+    async def test_add_update_remove(self):
+        response = await self.async_client.post(reverse('add_to_cart', args=[self.product.id]), {'quantity': 2})
+        self.assertEqual(response.json()['count'], 2)
+
+        response = await self.async_client.post(reverse('update_cart', args=[self.product.id]), {'quantity': 5})
+        self.assertEqual(response.json()['message'], 'Only 3 items available')
+        response = await self.async_client.post(reverse('update_cart', args=[self.product.id]), {'quantity': 3})
+        self.assertEqual(response.json()['count'], 3)
+
+        response = await self.async_client.post(reverse('remove_from_cart', args=[self.product.id]))
+        self.assertEqual(response.json()['count'], 0)
+
+    async def test_add_validates_quantity(self):
+        url = reverse('add_to_cart', args=[self.product.id])
+        for quantity, message in (
+            ('abc', 'Quantity must be greater than zero'),
+            (-5, 'Quantity must be greater than zero'),
+            (0, 'Quantity must be greater than zero'),
+            (999999, 'Only 3 items available'),
+        ):
+            response = await self.async_client.post(url, {'quantity': quantity})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), {'status': 'error', 'message': message})
+
+        # What is already in the cart counts towards the stock
+        response = await self.async_client.post(url, {'quantity': 2})
+        self.assertEqual(response.json()['count'], 2)
+        response = await self.async_client.post(url, {'quantity': 2})
+        self.assertEqual(response.json()['message'], 'Only 3 items available')
+        response = await self.async_client.post(url)
+        self.assertEqual(response.json()['count'], 3)
+
+    async def test_unknown_product(self):
+        response = await self.async_client.post(reverse('add_to_cart', args=[self.product.id + 1]))
+        self.assertEqual(response.status_code, 404)
+
+
+class CartValidationTests(TestCase):
+    """validate_cart checks the whole cart against the database in one query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Martabak Manis')
+        cls.products = [
+            Product.objects.create(name=f'Martabak {i}', description='Manis', price=30000, stock=5, category=category)
+            for i in range(10)
+        ]
+
+    def post(self, cart=None, body=None):
+        if cart is not None:
+            body = json.dumps({
+                str(product_id): {'id': product_id, 'quantity': quantity}
+                for product_id, quantity in cart.items()
+            })
+        return self.client.post(reverse('validate_cart'), body or '', content_type='application/json')
+
+    def problems(self, response):
+        return {issue['id']: issue['problem'] for issue in response.json()['issues']}
+
+    def test_price_drift(self):
+        product = self.products[0]
+        response = self.post({product.id: 1})
+        self.assertEqual(response.json()['status'], 'success')
+
+        Product.objects.filter(pk=product.pk).update(price=32000)
+        # An empty body validates the cart kept in the session
+        response = self.post()
+        self.assertEqual(self.problems(response), {product.id: 'price_changed'})
+        self.assertEqual(response.json()['items'][0]['price'], '32000.00')
+        self.assertEqual(response.json()['total'], '32000.00')
+        self.assertEqual(self.post().json()['status'], 'success')
+
+    def test_quantity_above_stock(self):
+        low, held = self.products[:2]
+        Product.objects.filter(pk=held.pk).update(reserved=5)
+        response = self.post({low.id: 8, held.id: 1})
+        self.assertEqual(self.problems(response), {low.id: 'insufficient_stock', held.id: 'out_of_stock'})
+        # Lowered to what is available; sold out lines are dropped
+        self.assertEqual(
+            [(item['id'], item['quantity']) for item in response.json()['items']], [(low.id, 5)],
+        )
+
+    def test_deleted_products(self):
+        kept, deleted = self.products[:2]
+        self.post({kept.id: 1, deleted.id: 2})
+        Product.objects.filter(pk=deleted.pk).delete()
+        response = self.post()
+        self.assertEqual(self.problems(response), {deleted.id: 'unavailable'})
+        self.assertEqual([item['id'] for item in response.json()['items']], [kept.id])
+
+        response = self.post({999: 1})
+        self.assertEqual(self.problems(response), {999: 'unavailable'})
+        self.assertEqual(response.json()['items'], [])
+
+    def test_malformed_json(self):
+        for body, message in (
+            ('{not json', 'Invalid cart data'),
+            ('[1, 2]', 'Invalid cart data'),
+            ('{"a": {"id": "x", "quantity": 1}}', 'Your cart contains an invalid item'),
+            ('{"a": {"quantity": 1}}', 'Your cart contains an invalid item'),
+            (json.dumps({'a': {'id': self.products[0].id, 'quantity': 0}}), 'Quantity must be greater than zero'),
+        ):
+            response = self.post(body=body)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'status': 'error', 'message': message})
+
+    def test_one_query(self):
+        for products in (self.products[:1], self.products):
+            request = RequestFactory().post(reverse('validate_cart'))
+            request.session = SessionStore()
+            cart = Cart(request)
+            cart.replace({product.id: 1 for product in products})
+            with self.assertNumQueries(1):
+                self.assertEqual(cart.validate(), [])
+            self.assertEqual(len(cart), len(products))
+
+
+class CheckoutTests(TestCase):
+    """create_order() is all or nothing, in a constant number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        category = Category.objects.create(name='Martabak Manis')
+        cls.products = [
+            Product.objects.create(
+                name=f'Martabak {i}', description='Manis', price=30000 + i * 1000, stock=10, category=category,
+            )
+            for i in range(6)
+        ]
+
+    def place(self, quantities):
+        return create_order(
+            self.user, quantities,
+            full_name='Budi', email='budi@example.com', phone='08123456789', address='Jl. Pandan Wangi',
+        )
+
+    def stock(self):
+        return list(Product.objects.order_by('id').values_list('stock', 'reserved'))
+
+    def test_places_order_and_decrements_stock_once(self):
+        first, second = self.products[:2]
+        reserve_stock(self.user, {first.id: 2})
+        order = self.place({first.id: 2, second.id: 3})
+
+        self.assertEqual(order.total_amount, 2 * 30000 + 3 * 31000)
+        self.assertEqual((order.item_count, order.total_quantity), (2, 5))
+        self.assertEqual(
+            sorted(order.items.values_list('product_id', 'quantity', 'price')),
+            [(first.id, 2, 30000), (second.id, 3, 31000)],
+        )
+        # The user's hold is consumed, not subtracted on top of the sale
+        self.assertEqual(self.stock()[:3], [(8, 0), (7, 0), (10, 0)])
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_rolls_back_when_a_product_runs_out(self):
+        before = self.stock()
+        with self.assertRaisesMessage(CheckoutError, 'Only 10 Martabak 1 available'):
+            self.place({self.products[0].id: 2, self.products[1].id: 11})
+        self.assertEqual(self.stock(), before)
+        self.assertFalse(Order.objects.exists())
+
+    def test_rolls_back_when_sold_out_by_the_update(self):
+        # Stock taken by someone else after the products were read is only
+        # noticed by the conditional UPDATE, after the order was written
+        before = self.stock()
+        with mock.patch.object(Product, 'get_available_stock', return_value=100):
+            with self.assertRaisesMessage(CheckoutError, 'Some products in your cart just sold out'):
+                self.place({self.products[0].id: 2, self.products[1].id: 11})
+        self.assertEqual(self.stock(), before)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_missing_product(self):
+        with self.assertRaisesMessage(CheckoutError, 'Some products in your cart are no longer available'):
+            self.place({self.products[0].id: 1, self.products[-1].id + 1: 1})
+        with self.assertRaisesMessage(CheckoutError, 'Your cart is empty'):
+            self.place({})
+        self.assertFalse(Order.objects.exists())
+
+    def test_view_queues_confirmation_with_the_order(self):
+        self.client.force_login(self.user)
+        data = {
+            'full_name': 'Budi', 'email': 'budi@example.com', 'phone': '08123456789', 'address': 'Jl. Pandan Wangi',
+            'order_items': json.dumps({'a': {'id': self.products[0].id, 'quantity': 2}}),
+        }
+        before = self.stock()
+        with mock.patch('orders.views.queue_order_email', side_effect=RuntimeError('outbox down')):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('place_order'), data)
+        # Nothing is kept of an order whose email could not be queued
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.stock(), before)
+
+        response = self.client.post(reverse('place_order'), data)
+        order = Order.objects.get()
+        self.assertRedirects(response, reverse('order_success', args=[order.id]))
+        self.assertEqual(list(OutgoingEmail.objects.values_list('order', 'kind')), [(order.id, 'confirmation')])
+
+    def test_constant_queries(self):
+        # The first order of the day also creates its SalesData row
+        self.place({self.products[0].id: 1})
+        counts = []
+        for products in (self.products[:1], self.products[1:]):
+            with CaptureQueriesContext(connection) as queries:
+                self.place({product.id: 1 for product in products})
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class ReservationTests(TestCase):
+    """Entering checkout holds the cart's stock until it is released or expires"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        cls.other = User.objects.create_user('siti', 'siti@example.com', 'secret')
+        category = Category.objects.create(name='Martabak Manis')
+        cls.first, cls.second = [
+            Product.objects.create(name=f'Martabak {i}', description='Manis', price=30000, stock=5, category=category)
+            for i in range(2)
+        ]
+
+    def reserved(self):
+        return list(Product.objects.order_by('id').values_list('reserved', flat=True))
+
+    def test_reserve_replace_and_release(self):
+        reserve_stock(self.user, {self.first.id: 2, self.second.id: 1})
+        self.assertEqual(self.reserved(), [2, 1])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.get_available_stock(), 3)
+
+        reserve_stock(self.user, {self.first.id: 4})
+        self.assertEqual(self.reserved(), [4, 0])
+
+        # Too much for what others leave is refused, keeping the old holds
+        with self.assertRaises(CheckoutError):
+            reserve_stock(self.other, {self.first.id: 2})
+        self.assertEqual(self.reserved(), [4, 0])
+
+        self.assertEqual(release_reservations(self.user), {self.first.id: 4})
+        self.assertEqual(self.reserved(), [0, 0])
+        self.assertEqual(release_reservations(self.user), {})
+
+    def test_same_cart_writes_nothing(self):
+        holds = reserve_stock(self.user, {self.first.id: 2})
+        with CaptureQueriesContext(connection) as queries:
+            again = reserve_stock(self.user, {self.first.id: 2})
+        self.assertEqual([hold.pk for hold in again], [hold.pk for hold in holds])
+        self.assertFalse([
+            query['sql'] for query in queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ])
+        self.assertEqual(self.reserved(), [2, 0])
+
+    def test_deleting_user_releases_holds(self):
+        reserve_stock(self.user, {self.first.id: 2, self.second.id: 1})
+        reserve_stock(self.other, {self.first.id: 1})
+        self.user.delete()
+        self.assertEqual(self.reserved(), [1, 0])
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+    def test_admin_is_read_only(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        self.client.force_login(admin_user)
+        hold = reserve_stock(self.user, {self.first.id: 2})[0]
+        changelist = reverse('admin:orders_stockreservation_changelist')
+        self.assertEqual(self.client.get(changelist).status_code, 200)
+        self.client.post(changelist, {'action': 'delete_selected', '_selected_action': [hold.pk], 'post': 'yes'})
+        self.assertEqual(
+            self.client.post(reverse('admin:orders_stockreservation_delete', args=[hold.pk]), {'post': 'yes'}).status_code,
+            403,
+        )
+        self.assertEqual(self.reserved(), [2, 0])
+        self.assertTrue(StockReservation.objects.filter(pk=hold.pk).exists())
+
+    def test_expired_holds_are_swept(self):
+        reserve_stock(self.user, {self.first.id: 2, self.second.id: 1})
+        reserve_stock(self.other, {self.first.id: 1}, ttl=3600)
+        StockReservation.objects.filter(user=self.user).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        out = StringIO()
+        call_command('release_expired_reservations', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Released 3 unit(s) across 2 product(s)')
+        self.assertEqual(self.reserved(), [1, 0])
+        self.assertEqual(release_expired_reservations(now=timezone.now() + timedelta(hours=2)), {self.first.id: 1})
+        self.assertEqual(self.reserved(), [0, 0])
+
+    def test_checkout_page_holds_the_cart(self):
+        self.client.force_login(self.user)
+        self.client.cookies['cart'] = quote(json.dumps({'a': {'id': self.first.id, 'quantity': 2}}))
+        for _ in range(2):
+            self.assertEqual(self.client.get(reverse('checkout')).status_code, 200)
+        self.assertEqual(StockReservation.objects.get().quantity, 2)
+        self.assertEqual(self.reserved(), [2, 0])
+
+        self.client.get(reverse('cart'))
+        self.assertEqual(self.reserved(), [0, 0])
+
+
+class OrderSummaryTests(TestCase):
+    """Order.item_count, total_quantity and customer_name follow the items"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('budi', 'budi@example.com', 'secret')
+        category = Category.objects.create(name='Martabak Manis')
+        cls.first, cls.second = [
+            Product.objects.create(name=f'Martabak {i}', description='Manis', price=30000, stock=10, category=category)
+            for i in range(2)
+        ]
+
+    def new_order(self, **fields):
+        return Order(
+            user=self.user, full_name='Budi', email='budi@example.com', phone='08123456789',
+            address='Jl. Pandan Wangi', total_amount=30000, **fields
+        )
+
+    def summary(self, order):
+        order.refresh_from_db()
+        return order.item_count, order.total_quantity, order.customer_name
+
+    def test_items_keep_summary_in_sync(self):
+        order = self.new_order()
+        order.save()
+        self.assertEqual(self.summary(order), (0, 0, 'budi'))
+
+        item = OrderItem.objects.create(order=order, product=self.first, quantity=2, price=30000)
+        OrderItem.objects.create(order=order, product=self.second, quantity=3, price=30000)
+        self.assertEqual(self.summary(order), (2, 5, 'budi'))
+
+        item.quantity = 4
+        item.save()
+        self.assertEqual(self.summary(order), (2, 7, 'budi'))
+
+        item.delete()
+        self.assertEqual(self.summary(order), (1, 3, 'budi'))
+
+    def test_backfill_command(self):
+        # bulk_create skips save(), leaving the summaries empty
+        orders = Order.objects.bulk_create([self.new_order() for _ in range(3)])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=orders[0], product=self.first, quantity=2, price=30000),
+            OrderItem(order=orders[0], product=self.second, quantity=1, price=30000),
+            OrderItem(order=orders[1], product=self.first, quantity=5, price=30000),
+        ])
+        self.assertEqual(self.summary(orders[0]), (0, 0, ''))
+
+        out = StringIO()
+        call_command('backfill_order_summaries', '--batch-size', '2', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Updated 3 order(s)')
+        self.assertEqual(
+            [self.summary(order) for order in orders],
+            [(2, 3, 'budi'), (1, 5, 'budi'), (0, 0, 'budi')],
+        )
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('cart/', views.cart_view, name='cart'),
+    path('cart/validate/', views.validate_cart, name='validate_cart'),
     path('add-to-cart/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
     path('remove-from-cart/<int:product_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('update-cart/<int:product_id>/', views.update_cart, name='update_cart'),
@@ -1,52 +1,101 @@
 # orders/views.py
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse, JsonResponse
 from django.contrib import messages
+from django.db import transaction
 from django.views.decorators.http import require_POST
-from django.core.mail import send_mail
-from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.views.decorators.csrf import ensure_csrf_cookie
 from products.models import Product
+from core.email_utils import queue_order_email
+from core.pagination import keyset_paginate
 from .models import Order, OrderItem
+from .cart import Cart
+from .checkout import (
+    STOCK_RESERVATION_TTL, CheckoutError, create_order, normalize_cart,
+    release_reservations, reserve_stock,
+)
 import json
 import datetime 
 import urllib
 
+def get_cookie_cart(request):
+    """Return the cart stored by main.js in the cart cookie"""
+    cart_cookie = request.COOKIES.get('cart', '{}')
+    cart_cookie = urllib.parse.unquote(cart_cookie) if cart_cookie else '{}'
+    return json.loads(cart_cookie)
+
+@ensure_csrf_cookie
 def cart_view(request):
     """View for displaying the shopping cart page"""
+    # Leaving checkout gives back the stock held for it
+    if request.user.is_authenticated:
+        release_reservations(request.user)
+    
     return render(request, 'orders/cart.html')
 
+# The cart AJAX views are async so that, under ASGI, waiting on the session
+# and product lookups doesn't hold a worker thread
+
 @require_POST
-def add_to_cart(request, product_id):
+async def add_to_cart(request, product_id):
     """AJAX view for adding a product to the cart"""
-    product = get_object_or_404(Product, id=product_id)
+    product = await aget_object_or_404(Product, id=product_id)
+    cart = await Cart.aload(request)
     
-    if product.stock <= 0:
+    if not product.is_available():
         return JsonResponse({
             'status': 'error',
             'message': 'Product is out of stock'
         })
     
+    try:
+        quantity = int(request.POST.get('quantity', 1))
+    except ValueError:
+        quantity = 0
+    
+    if quantity <= 0:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Quantity must be greater than zero'
+        })
+    
+    # The cart may already hold some of this product
+    line = cart.lines.get(str(product.id))
+    if quantity + (line['quantity'] if line else 0) > product.get_available_stock():
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Only {product.get_available_stock()} items available'
+        })
+    
+    cart.add(product, quantity)
+    
     return JsonResponse({
         'status': 'success',
-        'message': f'{product.name} added to cart'
+        'message': f'{product.name} added to cart',
+        'count': len(cart),
     })
 
 @require_POST
-def remove_from_cart(request, product_id):
+async def remove_from_cart(request, product_id):
     """AJAX view for removing a product from the cart"""
+    cart = await Cart.aload(request)
+    cart.remove(product_id)
+    
     return JsonResponse({
         'status': 'success',
-        'message': 'Item removed from cart'
+        'message': 'Item removed from cart',
+        'count': len(cart),
     })
 
 @require_POST
-def update_cart(request, product_id):
+async def update_cart(request, product_id):
     """AJAX view for updating the quantity of a product in the cart"""
-    product = get_object_or_404(Product, id=product_id)
-    quantity = int(request.POST.get('quantity', 1))
+    product = await aget_object_or_404(Product, id=product_id)
+    try:
+        quantity = int(request.POST.get('quantity', 1))
+    except ValueError:
+        quantity = 0
     
     if quantity <= 0:
         return JsonResponse({
@@ -54,15 +103,47 @@ def update_cart(request, product_id):
             'message': 'Quantity must be greater than zero'
         })
     
-    if quantity > product.stock:
+    if quantity > product.get_available_stock():
         return JsonResponse({
             'status': 'error',
-            'message': f'Only {product.stock} items available'
+            'message': f'Only {product.get_available_stock()} items available'
         })
     
+    cart = await Cart.aload(request)
+    cart.add(product, quantity, override_quantity=True)
+    
     return JsonResponse({
         'status': 'success',
-        'message': 'Cart updated'
+        'message': 'Cart updated',
+        'count': len(cart),
+    })
+
+@require_POST
+def validate_cart(request):
+    """
+    AJAX view for syncing and validating the whole cart in one round trip
+    
+    Accepts the cart cookie contents as a JSON body (or nothing, to validate
+    the cart already stored in the session) and answers with current prices,
+    stock and any problems found.
+    """
+    cart = Cart(request)
+    
+    if request.content_type == 'application/json' and request.body:
+        try:
+            cart.replace(normalize_cart(json.loads(request.body)))
+        except (ValueError, AttributeError, CheckoutError) as e:
+            return JsonResponse({
+                'status': 'error',
+                'message': str(e) if isinstance(e, CheckoutError) else 'Invalid cart data'
+            }, status=400)
+    
+    issues = cart.validate()
+    
+    return JsonResponse({
+        'status': 'error' if issues else 'success',
+        'issues': issues,
+        **cart.as_json(),
     })
 
 @login_required
@@ -78,7 +159,20 @@ def checkout(request):
             'address': request.user.profile.address or '',
         }
     
-    return render(request, 'orders/checkout.html', {'initial_data': initial_data})
+    # Hold the cart's stock while the customer fills in the form; reloading
+    # the page with the same cart leaves the holds alone
+    try:
+        cart_items = get_cookie_cart(request)
+        quantities = normalize_cart(cart_items) if cart_items else Cart(request).get_quantities()
+        reserve_stock(request.user, quantities)
+    except (ValueError, CheckoutError) as e:
+        messages.error(request, str(e) if isinstance(e, CheckoutError) else 'Invalid cart data')
+        return redirect('cart')
+    
+    return render(request, 'orders/checkout.html', {
+        'initial_data': initial_data,
+        'reservation_ttl': STOCK_RESERVATION_TTL // 60,
+    })
 
 @login_required
 @require_POST
@@ -97,95 +191,43 @@ def place_order(request):
             messages.error(request, 'Please fill in all required fields')
             return redirect('checkout')
         
-        # Get cart data from hidden field or cookie
+        # Get cart data from hidden field, the session cart or cookie
+        cart = Cart(request)
         cart_items = request.POST.get('order_items')
         if cart_items:
             cart_items = json.loads(cart_items)
-        else:
-            # Fallback to cookie if hidden field is not available
-            cart_cookie = request.COOKIES.get('cart', '{}')
-            cart_cookie = urllib.parse.unquote(cart_cookie) if cart_cookie else '{}'
-            cart_items = json.loads(cart_cookie)
-        if not cart_items:
+        elif not cart.lines:
+            # Fallback to cookie if hidden field and session cart are not available
+            cart_items = get_cookie_cart(request)
+        if not cart_items and not cart.lines:
             messages.error(request, 'Your cart is empty')
             return redirect('cart')
         
-        # Calculate total amount
-        total_amount = 0
-        for item_id, item_data in cart_items.items():
-            product = get_object_or_404(Product, id=item_data['id'])
-            quantity = item_data['quantity']
-            
-            # Validate stock
-            if quantity > product.stock:
-                messages.error(request, f'Only {product.stock} {product.name} available')
-                return redirect('cart')
-            
-            total_amount += product.price * quantity
-        
-        # Create order
-        order = Order.objects.create(
-            user=request.user,
-            full_name=full_name,
-            email=email,
-            phone=phone,
-            address=address,
-            total_amount=total_amount,
-            status='pending'
-        )
-        
-        # Create order items and update stock
-        for item_id, item_data in cart_items.items():
-            product = get_object_or_404(Product, id=item_data['id'])
-            quantity = item_data['quantity']
-            
-            # Create order item
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=quantity,
-                price=product.price
-            )
-            
-            # Update product stock
-            product.stock -= quantity
-            product.save()
-        
-        # Send order confirmation email
+        # Validate stock, create the order and its items, update stock and
+        # queue the confirmation email for the send_queued_emails worker in
+        # a single transaction, so an order never goes without its email
         try:
-            send_order_confirmation_email(order)
-        except Exception as e:
-            # Log the error but don't stop the order process
-            print(f"Error sending email: {e}")
+            with transaction.atomic():
+                order = create_order(
+                    request.user,
+                    normalize_cart(cart_items) if cart_items else cart.get_quantities(),
+                    full_name=full_name,
+                    email=email,
+                    phone=phone,
+                    address=address,
+                )
+                queue_order_email(order, 'confirmation')
+        except CheckoutError as e:
+            messages.error(request, str(e))
+            return redirect('cart')
+        
+        cart.clear()
         
         # Redirect to order success page
         return redirect('order_success', order_id=order.id)
     
     return redirect('checkout')
 
-def send_order_confirmation_email(order):
-    """Send order confirmation email to customer"""
-    subject = f'Order Confirmation - Order #{order.id}'
-    
-    # Render HTML email template
-    html_message = render_to_string('emails/order_confirmation.html', {
-        'order': order,
-        'items': order.items.all(),
-    })
-    
-    # Create plain text version
-    plain_message = strip_tags(html_message)
-    
-    # Send email
-    send_mail(
-        subject,
-        plain_message,
-        settings.DEFAULT_FROM_EMAIL,
-        [order.email],
-        html_message=html_message,
-        fail_silently=False,
-    )
-
 @login_required
 def order_success(request, order_id):
     """View for displaying the order success page"""
@@ -195,7 +237,10 @@ def order_success(request, order_id):
 @login_required
 def my_orders(request):
     """View for displaying the user's orders"""
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
+    orders = keyset_paginate(
+        Order.objects.filter(user=request.user),
+        request.GET.get('cursor'),
+    )
     return render(request, 'orders/my_orders.html', {'orders': orders})
 
 @login_required
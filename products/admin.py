@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Product, Category
+from .search import search_product_ids
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -7,6 +8,13 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ('name', 'description')
     list_filter = ('category',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of LIKE '%..%' over every row
+        if not search_term:
+            return queryset, False
+        ids = search_product_ids(search_term, limit=None, available_only=False)
+        return queryset.filter(pk__in=ids), False
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name',)
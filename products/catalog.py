@@ -0,0 +1,193 @@
+# products/catalog.py
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache_versions import aget_cache_version, bump_cache_version, get_cache_version
+from .models import AVAILABLE, Category, Product
+
+# Seconds a cached listing or product may be kept; edits don't wait for
+# this, they bump the catalogue version instead
+CATALOG_CACHE_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 15 * 60)
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+# Orderings the storefront offers; anything else falls back to newest first
+SORT_OPTIONS = ('name', '-name', 'price', '-price')
+
+
+def get_catalog_version():
+    """Return the current catalogue version, part of every catalogue cache key"""
+    return get_cache_version(CATALOG_VERSION_KEY)
+
+
+async def aget_catalog_version():
+    return await aget_cache_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached listing and product once the current transaction
+    commits
+
+    Nothing is deleted: entries cached under the old version simply stop
+    being looked up and expire on their own.
+    """
+    bump_cache_version(CATALOG_VERSION_KEY)
+
+
+def _parse_price(value):
+    try:
+        price = Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return price if price.is_finite() else None
+
+
+def normalize_filters(params, category_slug=None):
+    """
+    Reduce the product_list query string to the filters it can apply
+
+    Invalid prices and unknown sort orders are dropped, so equivalent URLs
+    share one cache entry.
+
+    Args:
+        params: request.GET
+        category_slug: slug from the URL, if any
+    """
+    return {
+        'category': category_slug or None,
+        'min_price': _parse_price(params.get('min_price')),
+        'max_price': _parse_price(params.get('max_price')),
+        'sort': params.get('sort') if params.get('sort') in SORT_OPTIONS else None,
+    }
+
+
+def _cached(key, compute):
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, CATALOG_CACHE_TIMEOUT)
+    return value
+
+
+async def _acached(key, compute):
+    value = await cache.aget(key)
+    if value is None:
+        value = await compute()
+        await cache.aset(key, value, CATALOG_CACHE_TIMEOUT)
+    return value
+
+
+def get_categories(version=None):
+    version = version or get_catalog_version()
+    return _cached(f'catalog:{version}:categories', lambda: list(Category.objects.all()))
+
+
+async def aget_categories(version=None):
+    version = version or await aget_catalog_version()
+
+    async def compute():
+        return [category async for category in Category.objects.all()]
+
+    return await _acached(f'catalog:{version}:categories', compute)
+
+
+def _find_category(categories, slug):
+    return next((c for c in categories if c.slug == slug), None)
+
+
+def _listing_queryset(category, filters):
+    products = Product.objects.filter(AVAILABLE)
+    if category:
+        products = products.filter(category=category)
+    if filters['min_price'] is not None:
+        products = products.filter(price__gte=filters['min_price'])
+    if filters['max_price'] is not None:
+        products = products.filter(price__lte=filters['max_price'])
+    if filters['sort']:
+        products = products.order_by(filters['sort'])
+    return products
+
+
+def _listing_key(version, filters):
+    return 'catalog:{version}:list:{category}:{min_price}:{max_price}:{sort}'.format(
+        version=version, **filters
+    )
+
+
+def get_product_listing(filters):
+    """
+    Return the category, categories and products for product_list
+
+    Args:
+        filters: dict made by normalize_filters()
+
+    Returns:
+        dict with 'category', 'categories' and 'products', or None when the
+        category slug is unknown
+    """
+    version = get_catalog_version()
+    categories = get_categories(version)
+
+    category = None
+    if filters['category']:
+        category = _find_category(categories, filters['category'])
+        if category is None:
+            return None
+
+    return {
+        'category': category,
+        'categories': categories,
+        'products': _cached(
+            _listing_key(version, filters), lambda: list(_listing_queryset(category, filters))
+        ),
+    }
+
+
+async def aget_product_listing(filters):
+    """get_product_listing() for async views, sharing its cache entries"""
+    version = await aget_catalog_version()
+    categories = await aget_categories(version)
+
+    category = None
+    if filters['category']:
+        category = _find_category(categories, filters['category'])
+        if category is None:
+            return None
+
+    async def compute():
+        return [product async for product in _listing_queryset(category, filters)]
+
+    return {
+        'category': category,
+        'categories': categories,
+        'products': await _acached(_listing_key(version, filters), compute),
+    }
+
+
+def _product_queryset(slug):
+    return Product.objects.filter(AVAILABLE).select_related('category').filter(slug=slug)
+
+
+def get_product(slug):
+    """Return the available product with this slug, or None"""
+    key = f'catalog:{get_catalog_version()}:product:{slug}'
+    product = cache.get(key)
+    if product is None:
+        product = _product_queryset(slug).first()
+        if product is not None:
+            cache.set(key, product, CATALOG_CACHE_TIMEOUT)
+    return product
+
+
+async def aget_product(slug):
+    """get_product() for async views"""
+    key = f'catalog:{await aget_catalog_version()}:product:{slug}'
+    product = await cache.aget(key)
+    if product is None:
+        product = await _product_queryset(slug).afirst()
+        if product is not None:
+            await cache.aset(key, product, CATALOG_CACHE_TIMEOUT)
+    return product
@@ -0,0 +1,140 @@
+# products/images.py
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from core.page_cache import invalidate_cached_pages
+from .catalog import bump_catalog_version
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# Widths of the resized copies: the product grid and the detail page
+IMAGE_VARIANT_WIDTHS = getattr(settings, 'PRODUCT_IMAGE_VARIANT_WIDTHS', {
+    'thumb': 400,
+    'detail': 1000,
+})
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# Threads resizing uploads in the background of the web process
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'PRODUCT_IMAGE_WORKERS', 2),
+    thread_name_prefix='product-images',
+)
+
+
+def variant_name(name, width, extension):
+    """products/a.jpg -> products/a-400w.webp"""
+    stem, _ = os.path.splitext(name)
+    return f'{stem}-{width}w.{extension}'
+
+
+def _save(image, name, format, **options):
+    buffer = BytesIO()
+    image.save(buffer, format=format, **options)
+    # Replace an earlier copy instead of getting a suffixed name
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def delete_image_variants(variants):
+    for key in ('jpeg', 'webp'):
+        for name, _ in variants.get(key, []):
+            default_storage.delete(name)
+
+
+def generate_image_variants(product_id):
+    """
+    Write the resized JPEG and WebP copies of a product's image next to it
+
+    Images are never upscaled, so a copy can be narrower than its nominal
+    width; the widths actually written are recorded on the product.
+
+    Returns:
+        the new image_variants, or None if the product has no image
+    """
+    product = Product.objects.filter(pk=product_id).only('image', 'image_variants').first()
+    if product is None or not product.image:
+        return None
+
+    source = product.image.name
+    with default_storage.open(source) as file:
+        original = ImageOps.exif_transpose(Image.open(file))
+        original.load()
+
+    # JPEG has no alpha channel, so transparent uploads go on white
+    if original.mode in ('RGBA', 'LA', 'P'):
+        original = original.convert('RGBA')
+        background = Image.new('RGB', original.size, 'white')
+        background.paste(original, mask=original.getchannel('A'))
+        original = background
+    elif original.mode != 'RGB':
+        original = original.convert('RGB')
+
+    variants = {'source': source, 'jpeg': [], 'webp': []}
+    for width in sorted(set(IMAGE_VARIANT_WIDTHS.values())):
+        resized = original.copy()
+        resized.thumbnail((width, width * 4), Image.LANCZOS)
+        actual = resized.width
+
+        variants['jpeg'].append([
+            _save(resized, variant_name(source, width, 'jpg'), 'JPEG',
+                  quality=JPEG_QUALITY, optimize=True, progressive=True),
+            actual,
+        ])
+        variants['webp'].append([
+            _save(resized, variant_name(source, width, 'webp'), 'WEBP',
+                  quality=WEBP_QUALITY, method=4),
+            actual,
+        ])
+
+    if product.image_variants.get('source') not in (None, source):
+        delete_image_variants(product.image_variants)
+
+    # Only record them if the image wasn't replaced in the meantime; the
+    # queryset update skips post_save, so the caches are bumped here
+    if Product.objects.filter(pk=product_id, image=source).update(image_variants=variants):
+        bump_catalog_version()
+        invalidate_cached_pages()
+
+    return variants
+
+
+def _generate_in_background(product_id):
+    try:
+        generate_image_variants(product_id)
+    except Exception:
+        logger.exception('Could not generate image variants for product %s', product_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_image_variants(product):
+    """
+    Generate the product's image variants on a background thread once the
+    current transaction commits, keeping the resizing off the request
+
+    Anything lost (e.g. the process restarting) is picked up by the
+    regenerate_image_variants command.
+    """
+    product_id = product.pk
+    transaction.on_commit(lambda: _executor.submit(_generate_in_background, product_id))
+
+
+def needs_image_variants(product):
+    """Whether the product has an uploaded image without up to date variants"""
+    return (
+        bool(product.image)
+        and product.image_variants.get('source') != product.image.name
+        and default_storage.exists(product.image.name)
+    )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text product search index from the products table'
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index()
+        self.stdout.write(f'Indexed {count} product(s)')
@@ -0,0 +1,52 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from products.images import generate_image_variants
+from products.models import Product
+
+
+def _init_worker():
+    # Spawned workers start without Django set up; forked ones inherit the
+    # parent's state and must not share its database connections
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the resized JPEG/WebP variants of product images in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (default: one per CPU core)')
+        parser.add_argument('--missing', action='store_true',
+                            help='Only products whose variants are missing or out of date')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').only('image', 'image_variants')
+        product_ids = [
+            product.pk for product in products.iterator()
+            if not options['missing'] or product.image_variants.get('source') != product.image.name
+        ]
+        if not product_ids:
+            self.stdout.write('Nothing to regenerate')
+            return
+
+        workers = max(1, min(options['workers'], len(product_ids)))
+        connections.close_all()
+
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = {executor.submit(generate_image_variants, pk): pk for pk in product_ids}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'Product {futures[future]}: {e}')
+
+        self.stdout.write(f'Regenerated {done} product image(s) with {workers} worker(s), {failed} failed')
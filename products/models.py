@@ -8,6 +8,9 @@ class Category(models.Model):
     
     class Meta:
         verbose_name_plural = 'Categories'
+        indexes = [
+            models.Index(fields=['name'], name='products_category_name_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -17,19 +20,36 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+# Products with stock left that is not held by checkout reservations
+AVAILABLE = models.Q(stock__gt=models.F('reserved'))
+
 class Product(models.Model):
     name = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    # Units held by active checkout reservations (orders.StockReservation)
+    reserved = models.PositiveIntegerField(default=0)
     image = models.ImageField(upload_to='products/')
+    # Resized copies of image written by products.images, e.g.
+    # {'source': 'products/a.jpg', 'jpeg': [[name, width], ...], 'webp': [...]}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # The storefront only lists products that can be bought, so its
+            # indexes only cover those rows
+            models.Index(fields=['created_at'], condition=AVAILABLE, name='products_avail_created_idx'),
+            models.Index(fields=['category', 'created_at'], condition=AVAILABLE, name='products_avail_cat_idx'),
+            models.Index(fields=['price'], condition=AVAILABLE, name='products_avail_price_idx'),
+            # Stock filters on the dashboard product list
+            models.Index(fields=['stock'], name='products_stock_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -39,5 +59,8 @@ class Product(models.Model):
     def __str__(self):
         return self.name
     
+    def get_available_stock(self):
+        return max(self.stock - self.reserved, 0)
+    
     def is_available(self):
-        return self.stock > 0
+        return self.stock > self.reserved
@@ -0,0 +1,161 @@
+# products/search.py
+import re
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import AVAILABLE, Product
+
+# SQLite FTS5 table holding name and description, rowid = product id (see
+# migration 0004_product_search)
+FTS_TABLE = 'products_product_fts'
+
+# bm25() weights for the name and description columns
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+SEARCH_RESULTS_LIMIT = 100
+SUGGEST_LIMIT = 8
+
+WORD = re.compile(r'\w+')
+
+CENTS = Decimal('0.01')
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text, prefix=False):
+    """
+    Turn user input into an FTS5 MATCH expression matching every word
+
+    Each word is quoted so FTS5 operators typed by the user are taken
+    literally. With prefix=True the last word also matches longer words,
+    for type-ahead.
+
+    Returns:
+        the expression, or None if the text has no words
+    """
+    words = WORD.findall(text or '')
+    if not words:
+        return None
+
+    terms = [f'"{word}"' for word in words]
+    if prefix:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _search(select, text, prefix, limit, available_only):
+    match = build_match_query(text, prefix)
+    if match is None:
+        return []
+
+    sql = (
+        f'SELECT {select} FROM {FTS_TABLE} '
+        f'JOIN products_product p ON p.id = {FTS_TABLE}.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s '
+        + ('AND p.stock > p.reserved ' if available_only else '')
+        + f'ORDER BY bm25({FTS_TABLE}, {NAME_WEIGHT}, {DESCRIPTION_WEIGHT}) '
+        + 'LIMIT %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, limit if limit is not None else -1])
+        return cursor.fetchall()
+
+
+def search_product_ids(text, prefix=True, limit=SEARCH_RESULTS_LIMIT, available_only=True):
+    """
+    Return the ids of the products matching text, best match first
+
+    Matches in the name rank above matches in the description.
+    """
+    if not fts_enabled():
+        products = Product.objects.all()
+        for word in WORD.findall(text or ''):
+            products = products.filter(Q(name__icontains=word) | Q(description__icontains=word))
+        if available_only:
+            products = products.filter(AVAILABLE)
+        return list(products.values_list('id', flat=True)[:limit])
+
+    return [row[0] for row in _search('p.id', text, prefix, limit, available_only)]
+
+
+def search_products(text, limit=SEARCH_RESULTS_LIMIT):
+    """Return the available products matching text as a ranked list"""
+    ids = search_product_ids(text, limit=limit)
+    products = Product.objects.filter(AVAILABLE).in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
+
+
+def suggest_products(text, limit=SUGGEST_LIMIT):
+    """
+    Return type-ahead suggestions for text in one indexed query
+
+    Returns:
+        list of {'id', 'name', 'slug', 'price'} dicts
+    """
+    if not fts_enabled():
+        products = Product.objects.in_bulk(search_product_ids(text, limit=limit))
+        rows = [(p.id, p.name, p.slug, p.price) for p in products.values()]
+    else:
+        rows = _search('p.id, p.name, p.slug, p.price', text, True, limit, True)
+
+    return [
+        {'id': pk, 'name': name, 'slug': slug, 'price': str(Decimal(str(price)).quantize(CENTS))}
+        for pk, name, slug, price in rows
+    ]
+
+
+def index_product(product):
+    """Add or refresh a product in the search index"""
+    index_products([product])
+
+
+def index_products(products):
+    """Add or refresh several products in the search index in two queries"""
+    if not fts_enabled() or not products:
+        return
+    params = []
+    for product in products:
+        params += [product.pk, product.name, product.description]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(products))})',
+            [product.pk for product in products],
+        )
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+            f'VALUES {", ".join(["(%s, %s, %s)"] * len(products))}',
+            params,
+        )
+
+
+def unindex_product(product_id):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+
+def rebuild_search_index():
+    """
+    Re-index every product, e.g. after products were changed with a raw
+    queryset update
+
+    Returns:
+        number of products indexed
+    """
+    if not fts_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+            'SELECT id, name, description FROM products_product'
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute('SELECT COUNT(*) FROM products_product')
+        return cursor.fetchone()[0]
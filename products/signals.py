@@ -0,0 +1,31 @@
+# products/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import images, search
+from .catalog import bump_catalog_version
+from .models import Category, Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+def bump_catalog_version_on_change(sender, instance, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, **kwargs):
+    search.index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_on_delete(sender, instance, **kwargs):
+    search.unindex_product(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def schedule_image_variants_on_save(sender, instance, raw=False, **kwargs):
+    if not raw and images.needs_image_variants(instance):
+        images.schedule_image_variants(instance)
@@ -0,0 +1,47 @@
+from django import template
+from django.core.files.storage import default_storage
+
+register = template.Library()
+
+# Rendered width of each image slot, for the browser to pick a variant
+SIZES = {
+    'thumb': '(min-width: 992px) 300px, (min-width: 768px) 33vw, 100vw',
+    'detail': '(min-width: 768px) 50vw, 100vw',
+}
+
+
+def _srcset(variants):
+    return ', '.join(f'{default_storage.url(name)} {width}w' for name, width in variants)
+
+
+@register.inclusion_tag('products/includes/product_picture.html')
+def product_picture(product, size='thumb', css_class='', style='', placeholder='300x200'):
+    """
+    Render a product image as a <picture> with WebP and JPEG srcsets
+
+    Falls back to the original upload until products.images has written
+    the resized variants for it.
+
+    Usage: {% product_picture product 'detail' css_class='img-fluid' %}
+    """
+    variants = product.image_variants or {}
+    ready = bool(product.image) and variants.get('source') == product.image.name
+
+    src = product.image.url if product.image else ''
+    if ready:
+        jpeg = variants['jpeg']
+        # Smallest copy for the grid, largest for the detail page
+        src = default_storage.url(jpeg[0][0] if size == 'thumb' else jpeg[-1][0])
+
+    return {
+        'product': product,
+        'ready': ready,
+        'src': src,
+        'webp_srcset': _srcset(variants['webp']) if ready else '',
+        'jpeg_srcset': _srcset(variants['jpeg']) if ready else '',
+        'sizes': SIZES.get(size, SIZES['thumb']),
+        'css_class': css_class,
+        'style': style,
+        'placeholder': placeholder,
+        'loading': 'lazy' if size == 'thumb' else 'eager',
+    }
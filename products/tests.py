@@ -1,3 +1,194 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image
+
+from core.testing import QueryPlanTestMixin
+from .images import generate_image_variants, needs_image_variants
+from .models import Category, Product
+
+
+class ProductQueryPlanTests(QueryPlanTestMixin, TestCase):
+    """The storefront queries in products/views.py must use an index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Martabak Manis')
+        cls.product = Product.objects.create(
+            name='Martabak Coklat Keju',
+            description='Coklat dan keju',
+            price=35000,
+            stock=10,
+            category=cls.category,
+            image='products/coklat-keju.jpg',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_product_list(self):
+        self.assertViewNoFullTableScan(self.client, reverse('product_list'))
+
+    def test_product_list_by_category(self):
+        url = reverse('product_list_by_category', args=[self.category.slug])
+        self.assertViewNoFullTableScan(self.client, url)
+
+    def test_product_list_by_price(self):
+        url = reverse('product_list') + '?min_price=10000&max_price=50000&sort=price'
+        self.assertViewNoFullTableScan(self.client, url)
+
+    def test_product_detail(self):
+        url = reverse('product_detail', args=[self.product.slug])
+        self.assertViewNoFullTableScan(self.client, url)
+
+    async def test_catalogue_pages_under_asgi(self):
+        response = await self.async_client.get(reverse('product_list_by_category', args=[self.category.slug]))
+        self.assertContains(response, self.product.name)
+        response = await self.async_client.get(reverse('product_detail', args=[self.product.slug]))
+        self.assertContains(response, self.product.name)
+        response = await self.async_client.get(reverse('product_detail', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+
+class CatalogCacheTests(TestCase):
+    """product_list and product_detail come from cache until the catalogue changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Martabak Manis')
+        cls.product = Product.objects.create(
+            name='Martabak Coklat Keju',
+            description='Coklat dan keju',
+            price=35000,
+            stock=10,
+            category=cls.category,
+            image='products/coklat-keju.jpg',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_listing_is_cached(self):
+        url = reverse('product_list') + '?sort=price&min_price=1000'
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url + '&unused=1')
+        self.assertEqual(list(response.context['products']), [self.product])
+
+    def test_detail_is_cached(self):
+        url = reverse('product_detail', args=[self.product.slug])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).context['product'], self.product)
+
+    def test_edits_show_up_immediately(self):
+        list_url = reverse('product_list_by_category', args=[self.category.slug])
+        detail_url = reverse('product_detail', args=[self.product.slug])
+        self.client.get(list_url)
+        self.client.get(detail_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 40000
+            self.product.save()
+
+        self.assertEqual(self.client.get(list_url).context['products'][0].price, 40000)
+        self.assertEqual(self.client.get(detail_url).context['product'].price, 40000)
+
+    def test_unknown_category(self):
+        url = reverse('product_list_by_category', args=['tidak-ada'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ProductSearchTests(TestCase):
+    """Search goes through the FTS5 index, which follows product saves and deletes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Martabak Manis')
+        cls.pandan = Product.objects.create(
+            name='Martabak Pandan',
+            description='Martabak manis rasa pandan wangi',
+            price=30000,
+            stock=10,
+            category=cls.category,
+            image='products/pandan.jpg',
+        )
+        cls.keju = Product.objects.create(
+            name='Martabak Keju',
+            description='Taburan keju dan sedikit pandan',
+            price=35000,
+            stock=10,
+            category=cls.category,
+            image='products/keju.jpg',
+        )
+
+    def test_name_matches_rank_first(self):
+        response = self.client.get(reverse('product_search') + '?q=pandan')
+        self.assertEqual(list(response.context['products']), [self.pandan, self.keju])
+
+    def test_suggest_prefix(self):
+        response = self.client.get(reverse('search_suggest') + '?q=martabak ke')
+        self.assertEqual([r['slug'] for r in response.json()['results']], [self.keju.slug])
+
+    def test_index_follows_save_and_delete(self):
+        self.keju.name = 'Martabak Keju Susu'
+        self.keju.save()
+        response = self.client.get(reverse('search_suggest') + '?q=susu')
+        self.assertEqual([r['id'] for r in response.json()['results']], [self.keju.id])
+
+        self.keju.delete()
+        response = self.client.get(reverse('search_suggest') + '?q=susu')
+        self.assertEqual(response.json()['results'], [])
+
+    def test_operators_are_literal(self):
+        response = self.client.get(reverse('search_suggest') + '?q=" OR NEAR(')
+        self.assertEqual(response.status_code, 200)
+
+
+class ImageVariantTests(TestCase):
+    """Uploads get resized JPEG and WebP copies rendered through a srcset"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        upload = BytesIO()
+        Image.new('RGB', (1600, 1200), 'green').save(upload, 'JPEG')
+        self.product = Product.objects.create(
+            name='Martabak Pandan',
+            description='Martabak manis rasa pandan wangi',
+            price=30000,
+            stock=10,
+            category=Category.objects.create(name='Martabak Manis'),
+            image=SimpleUploadedFile('pandan.jpg', upload.getvalue()),
+        )
+
+    def test_generate_and_render(self):
+        self.assertTrue(needs_image_variants(self.product))
+        generate_image_variants(self.product.pk)
+        self.product.refresh_from_db()
+        self.assertFalse(needs_image_variants(self.product))
+        self.assertEqual([width for _, width in self.product.image_variants['webp']], [400, 1000])
+
+        html = Template("{% load product_images %}{% product_picture product %}").render(
+            Context({'product': self.product})
+        )
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('-400w.jpg 400w', html)
+
+    def test_falls_back_to_original(self):
+        html = Template("{% load product_images %}{% product_picture product %}").render(
+            Context({'product': self.product})
+        )
+        self.assertIn(f'src="{self.product.image.url}"', html)
+        self.assertNotIn('srcset', html.split('onerror')[0])
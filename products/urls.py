@@ -3,6 +3,8 @@ from . import views
 
 urlpatterns = [
     path('', views.product_list, name='product_list'),
+    path('search/', views.product_search, name='product_search'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     path('category/<slug:category_slug>/', views.product_list, name='product_list_by_category'),
     path('<slug:slug>/', views.product_detail, name='product_detail'),
 ]
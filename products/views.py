@@ -1,50 +1,43 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from .models import Product, Category
+from .catalog import aget_product, aget_product_listing, get_categories, normalize_filters
+from .search import search_products, suggest_products
 
-def product_list(request, category_slug=None):
-    category = None
-    categories = Category.objects.all()
-    products = Product.objects.filter(stock__gt=0)
-    
-    # Apply category filter if category_slug is provided
-    if category_slug:
-        category = get_object_or_404(Category, slug=category_slug)
-        products = products.filter(category=category)
-    
-    # Apply price filter if min_price or max_price is provided
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-    
-    if min_price:
-        try:
-            products = products.filter(price__gte=float(min_price))
-        except (ValueError, TypeError):
-            pass
-    
-    if max_price:
-        try:
-            products = products.filter(price__lte=float(max_price))
-        except (ValueError, TypeError):
-            pass
-    
-    # Apply sorting
-    sort_param = request.GET.get('sort')
-    if sort_param:
-        if sort_param.startswith('-'):
-            # Descending order
-            products = products.order_by(sort_param)
-        else:
-            # Ascending order
-            products = products.order_by(sort_param)
+# The catalogue pages are async: under ASGI the cache and database lookups
+# don't hold a worker thread. Templates are still rendered synchronously, as
+# the context processors (user, messages, site settings) may query.
+
+async def product_list(request, category_slug=None):
+    # Served from the catalogue cache; see products.catalog
+    listing = await aget_product_listing(normalize_filters(request.GET, category_slug))
+    if listing is None:
+        raise Http404('No Category matches the given query.')
     
+    return await sync_to_async(render)(request, 'products/product_list.html', listing)
+
+
+def product_search(request):
+    query = request.GET.get('q', '').strip()
     return render(request, 'products/product_list.html', {
-        'category': category,
-        'categories': categories,
-        'products': products
+        'categories': get_categories(),
+        'products': search_products(query) if query else [],
+        'query': query,
     })
 
 
-def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug, stock__gt=0)
-    return render(request, 'products/product_detail.html', {'product': product})
+def search_suggest(request):
+    """Type-ahead suggestions for the search box as JSON"""
+    results = suggest_products(request.GET.get('q', ''))
+    for result in results:
+        result['url'] = reverse('product_detail', args=[result['slug']])
+    return JsonResponse({'results': results})
+
+
+async def product_detail(request, slug):
+    product = await aget_product(slug)
+    if product is None:
+        raise Http404('No Product matches the given query.')
+    return await sync_to_async(render)(request, 'products/product_detail.html', {'product': product})
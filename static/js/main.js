@@ -113,4 +113,38 @@ $(document).ready(function() {
         cart = {};
         saveCart();
     };
-});
\ No newline at end of file
+
+    // Send the whole cart to the server in one request and apply the
+    // current prices and stock it answers with
+    window.syncCart = function(callback) {
+        $.ajax({
+            url: '/orders/cart/validate/',
+            type: 'POST',
+            contentType: 'application/json',
+            data: JSON.stringify(cart),
+            headers: { 'X-CSRFToken': Cookies.get('csrftoken') },
+            success: function(response) {
+                const synced = {};
+                response.items.forEach(function(item) {
+                    synced[item.id] = {
+                        id: item.id,
+                        name: item.name,
+                        price: parseFloat(item.price),
+                        image: cart[item.id] ? cart[item.id].image : '',
+                        quantity: item.quantity
+                    };
+                });
+                cart = synced;
+                saveCart();
+                
+                response.issues.forEach(function(issue) {
+                    showNotification(issue.message);
+                });
+                
+                if (callback) {
+                    callback(response);
+                }
+            }
+        });
+    };
+});